@@ -1,7 +1,7 @@
 {
     "name": "Toolshub",
     "depends": [
-        "base", "web", "website", "mail"
+        "base", "web", "website", "mail", "bus"
     ],
     "application": True,
     "installable": True,
@@ -79,11 +79,15 @@
     "data": [
         "security/ir.model.access.csv",
         "security/toolshub_security.xml",
+        "data/toolshub_cron.xml",
+        "data/toolshub_mail_templates.xml",
         "views/toolshub_tools_views.xml",
         "views/toolshub_tool_plans_views.xml",
         "views/toolshub_tool_plan_features_views.xml",
         "views/toolshub_tool_rent_listings_views.xml",
         "views/toolshub_rented_tools_views.xml",
+        "views/toolshub_stripe_events_views.xml",
+        "views/toolshub_request_profiles_views.xml",
         "views/toolshub_menus.xml",
         "views/toolshub_main_template.xml",
     ]
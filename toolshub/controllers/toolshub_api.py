@@ -1,79 +1,288 @@
-import logging
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta
 
-from odoo import http
+from odoo import fields, http
 from odoo.http import request
 
-_logger = logging.getLogger(__name__)
-_logger.setLevel(logging.DEBUG)
+from ..models.toolshub_rented_tools import PLATFORM_FEE_PERCENT
+from ..utils import metrics
+from ..utils.data_version import read_version
+from ..utils.log import get_logger
+from ..utils.metrics import instrumented
+
+_logger = get_logger(__name__)
+
+# Server-side sorts offered by the marketplace: sort key -> (field, direction).
+# Every sort is paired with ``id`` in the same direction so the ordering is total
+# and can be resumed with a keyset cursor.
+LISTING_SORTS = {
+    'newest': ('id', 'desc'),
+    'price_asc': ('price', 'asc'),
+    'price_desc': ('price', 'desc'),
+    'seats': ('available_users', 'desc'),
+    'popularity': ('subscribers_count', 'desc'),
+}
+DEFAULT_LISTING_SORT = 'newest'
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+# Type-ahead search answers
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+
+def _encode_cursor(value, record_id):
+    """Encode the (sort value, id) of the last row of a page into an opaque token"""
+    return base64.urlsafe_b64encode(json.dumps([value, record_id]).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """Decode a token produced by _encode_cursor, returns (sort value, id)"""
+    try:
+        value, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return value, int(record_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _keyset_domain(field, direction, cursor):
+    """
+    Domain selecting the rows strictly after the cursor for ``ORDER BY field direction, id direction``.
+    PostgreSQL puts NULLs first in descending order and last in ascending order.
+    """
+    value, last_id = _decode_cursor(cursor)
+    operator = '<' if direction == 'desc' else '>'
+    if field == 'id':
+        return [('id', operator, last_id)]
+    if value is None:
+        same_value = ['&', (field, '=', False), ('id', operator, last_id)]
+        if direction == 'desc':
+            return ['|', (field, '!=', False)] + same_value
+        return same_value
+    return ['|', (field, operator, value), '&', (field, '=', value), ('id', operator, last_id)]
+
+
+def _tool_name_domain(field, tool_name):
+    """Filter on the tools matching tool_name through their ids, field is the path to the tool Many2one"""
+    tool_ids = request.env['toolshub.tools'].sudo()._search_ids_by_name(tool_name.strip())
+    return [(field, 'in', tool_ids)]
+
+
+def _listing_visibility_domain(user_id, include_own):
+    """
+    Catalog domain of the marketplace: listings of other users are only shown while they can still be rented.
+    Without the user's own listings there is no OR, so the partial indexes on active listings apply.
+    """
+    rentable = [('is_active', '=', True), '|', ('unlimited_users', '=', True), ('available_users', '>', 0)]
+    if include_own:
+        return ['|', ('owner_id', '=', user_id), '&'] + rentable
+    return rentable + [('owner_id', '!=', user_id)]
+
+
+def _etag(scope, *params):
+    """ETag of a payload of scope built with params, clients send it back to get not_modified"""
+    raw = json.dumps([read_version(request.env.cr, scope), params], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _not_modified(etag):
+    return {
+        'success': True,
+        'data': {
+            'not_modified': True,
+            'etag': etag,
+        }
+    }
+
+
+# Delta sync: changes are looked up from this long before the client's token, so rows written by transactions
+# that were still running when the token was issued are not missed. Clients merge by id, repeats are harmless.
+SYNC_OVERLAP = timedelta(seconds=30)
+# Above this many changed rows the client is asked to reload the whole list instead
+MAX_DELTA_SIZE = 500
+
+# Owner stats period: default length and longest allowed, in days
+DEFAULT_STATS_DAYS = 30
+MAX_STATS_DAYS = 366
+
+
+def _sync_token():
+    """Token of the current transaction, changes committed from now on will be returned by the next delta"""
+    return base64.urlsafe_b64encode(request.env.cr.now().isoformat().encode()).decode()
+
+
+def _decode_sync_token(token):
+    """Datetime from which to look for changes for a token produced by _sync_token"""
+    try:
+        return datetime.fromisoformat(base64.urlsafe_b64decode(token.encode()).decode()) - SYNC_OVERLAP
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid sync token: {token}") from e
+
+
+def _delta(model, changed_domain, visible_domain, since, removed_model=None):
+    """
+    Records of model changed since the token, split into the ones the client should show (updated)
+    and the ids it should drop (removed): changed records that no longer match visible_domain plus
+    deleted ones. Returns None when the client should reload everything instead.
+    removed_model: model whose deletions are recorded, when model is a read model of it
+    """
+    Tombstone = request.env['toolshub.sync.tombstone'].sudo()
+    if Tombstone._is_expired(since):
+        return None
+
+    changed = model.search(changed_domain, limit=MAX_DELTA_SIZE + 1)
+    if len(changed) > MAX_DELTA_SIZE:
+        return None
+
+    updated = model.search(visible_domain + [('id', 'in', changed.ids)], order=model._order)
+    removed = (changed - updated).ids + Tombstone._removed_ids(removed_model or model._name, since, request.env.uid)
+    return updated, removed
+
+
+def _rentals_delta(RentedTools, scope_domain, visible_domain, token):
+    """
+    _delta for rentals in scope_domain. A rental also counts as changed when its listing changed,
+    since its payload embeds the listing.
+    """
+    since = _decode_sync_token(token)
+    changed_listings = request.env['toolshub.listing.catalog'].sudo()._search([('sync_date', '>=', since)])
+    changed_domain = scope_domain + ['|', ('write_date', '>=', since), ('rent_listing_id', 'in', changed_listings)]
+    return _delta(RentedTools, changed_domain, visible_domain, since)
+
+
+def _list_data(records_key, payloads, normalized=False, listing_key=None):
+    """
+    Records part of a list answer. When normalized, the listings only reference tool_id, plan_id
+    and owner_id, and the tools, plans and owners tables they use are added once to the answer.
+    listing_key: key of the listing inside each payload, for the rentals.
+    """
+    if not normalized:
+        return {records_key: payloads}
+
+    Catalog = request.env['toolshub.listing.catalog']
+    if not listing_key:
+        listings, tables = Catalog._normalize_payloads(payloads)
+        return {records_key: listings, 'normalized': True, **tables}
+
+    listings, tables = Catalog._normalize_payloads([payload[listing_key] for payload in payloads if payload[listing_key]])
+    compact_listings = iter(listings)
+    records = [
+        dict(payload, **{listing_key: next(compact_listings) if payload[listing_key] else None})
+        for payload in payloads
+    ]
+    return {records_key: records, 'normalized': True, **tables}
+
+
+def _delta_response(list_data, removed):
+    return {
+        'success': True,
+        'data': {
+            'delta': True,
+            **list_data,
+            'removed': removed,
+            'sync_token': _sync_token(),
+        }
+    }
+
+
+def _reset_response():
+    return {
+        'success': True,
+        'data': {
+            'reset': True,
+        }
+    }
+
+
+def _page_size(limit):
+    """Clamp the requested page size to [1, MAX_PAGE_SIZE]"""
+    try:
+        limit = int(limit or DEFAULT_PAGE_SIZE)
+    except (ValueError, TypeError):
+        limit = DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
 
 
 class ToolshubAPI(http.Controller):
     @http.route(['/toolshub/api/getRentListings'], type='json', auth='user', methods=['POST'])
-    def get_rent_listings(self, filters):
+    @instrumented
+    def get_rent_listings(self, filters, sort=None, cursor=None, limit=None, etag=None, since=None, normalized=False):
         """
-        Get rent listings with optional filters
+        Get one page of rent listings with optional filters
+        sort: one of LISTING_SORTS, cursor: next_cursor of the previous page, limit: page size
+        etag: etag of the page the client already has, answered with not_modified when nothing changed
+        since: sync_token of a previous answer, only the listings changed or removed since are returned
+        normalized: listings reference their tool, plan and owner, sent once in the tools, plans and owners tables
         """
-        _logger.info("HIT /toolshub/api/getRentListing, Getting Rent Listings")
+        _logger.debug("HIT /toolshub/api/getRentListing, Getting Rent Listings")
         user = request.env.user
 
         try:
-            domain = []
+            sort = sort if sort in LISTING_SORTS else DEFAULT_LISTING_SORT
+            sort_field, sort_direction = LISTING_SORTS[sort]
+            limit = _page_size(limit)
+
+            current_etag = _etag('listings', user.id, filters, sort, cursor, limit, bool(normalized))
+            if etag and etag == current_etag:
+                return _not_modified(current_etag)
+
+            domain = _listing_visibility_domain(user.id, bool(filters and filters.get('my_listings')))
             
             # Apply filters if provided
             if filters:
                 if filters.get('tool_name'):
-                    domain.append(('tool_id.name', 'ilike',filters['tool_name'].strip() ))
+                    domain += _tool_name_domain('tool_id', filters['tool_name'])
                 if filters.get('min_price'):
                     domain.append(('price', '>=', float(filters['min_price'])))
                 if filters.get('max_price'):
                     domain.append(('price', '<=', float(filters['max_price'])))
-                if not filters.get('my_listings'):
-                    domain.append(('owner_id', '!=', user.id))
-            
-            # Query listings
-            RentListing = request.env['toolshub.tool.rent.listings'].sudo()
             
-            # Get listing
-            listings = RentListing.search(domain, order='id desc')
+            # Query the denormalized catalog, its ids are the listing ids
+            Catalog = request.env['toolshub.listing.catalog'].sudo()
+
+            if since:
+                since = _decode_sync_token(since)
+                delta = _delta(Catalog, [('sync_date', '>=', since)], domain, since,
+                               removed_model='toolshub.tool.rent.listings')
+                if delta is None:
+                    return _reset_response()
+                changed, removed = delta
+                return _delta_response(_list_data('listings', changed._get_listing_payloads(), normalized), removed)
+
+            # Resume after the last row of the previous page
+            if cursor:
+                domain += _keyset_domain(sort_field, sort_direction, cursor)
+            
+            # Get one page, plus one row to know if there is a next page
+            # NULLs spelled out as PostgreSQL places them, _keyset_domain and keysetCompare rely on it
+            nulls = 'nulls first' if sort_direction == 'desc' else 'nulls last'
+            order = 'id desc' if sort_field == 'id' else f'{sort_field} {sort_direction} {nulls}, id {sort_direction}'
+            listings = Catalog.search(domain, order=order, limit=limit + 1)
+            has_more = len(listings) > limit
+            listings = listings[:limit]
+
+            next_cursor = None
+            if has_more:
+                last = listings[-1]
+                next_cursor = _encode_cursor(last[sort_field] if sort_field != 'id' else last.id, last.id)
             
-            _logger.debug(f"Total Count of Rent Listings {len(listings)}")
-            _logger.debug(f"Rent Listings {listings}")
+            _logger.debug("Total Count of Rent Listings %s", len(listings))
+            _logger.debug("Rent Listings %s", listings)
             
             # Format data
-            listings_data = []
-            for listing in listings:
-
-                plan_features = []
-                for feature in listing.plan_id.feature_ids:
-                    plan_features.append({'id': feature.id,'name': feature.name})
-
-                listings_data.append({
-                    'id': listing.id,
-                    'tool_id': listing.tool_id.id if listing.tool_id else None,
-                    'tool_name': listing.tool_id.name if listing.tool_id else '',
-                    'tool_img_url': listing.tool_id.image_url,
-                    'plan_id': listing.plan_id.id if listing.plan_id else None,
-                    'plan_name': listing.plan_id.name if listing.plan_id else '',
-                    'plan_features': plan_features,
-                    'unlimited_access': listing.plan_id.is_unlimited,
-                    'duration_years': listing.plan_id.duration_years,
-                    'duration_months': listing.plan_id.duration_months,
-                    'duration_days': listing.plan_id.duration_days,
-                    'is_active': listing.is_active,
-                    'price': listing.price,
-                    'currency_symbol': listing.currency_id.symbol if listing.currency_id else '$',
-                    'subscribers_count': listing.subscribers_count,
-                    'unlimited_users': listing.unlimited_users,
-                    'available_users': listing.available_users if not listing.unlimited_users else None,
-                    'owner_id': listing.owner_id.id if listing.owner_id else None,
-                    'owner_name': listing.owner_id.name if listing.owner_id else '',
-                    'owner_connect_account_id': listing.owner_id.stripe_connect_account_id
-                })
+            listings_data = listings._get_listing_payloads()
             
             return {
                 'success': True,
                 "data": {
-                    'listings': listings_data,
+                    **_list_data('listings', listings_data, normalized),
+                    'sort': sort,
+                    'next_cursor': next_cursor,
+                    'has_more': has_more,
+                    'etag': current_etag,
+                    'sync_token': _sync_token(),
                 }
             }
             
@@ -87,13 +296,61 @@ class ToolshubAPI(http.Controller):
                 }
             }
 
+    @http.route(['/toolshub/api/search'], type='json', auth='user', methods=['POST'])
+    @instrumented
+    def search(self, query, limit=None, normalized=False):
+        """
+        Ranked full text search of the rent listings on tool name, plan name and feature names
+        query: words typed so far, each matches as a prefix, limit: most listings returned
+        Every listing comes with its rank and highlights: the tool name, plan name and matching
+        features as segments of {'text', 'match'}, keyed by listing id
+        """
+        _logger.debug("HIT /toolshub/api/search, Searching Rent Listings")
+
+        try:
+            try:
+                limit = max(1, min(int(limit or DEFAULT_SEARCH_LIMIT), MAX_SEARCH_LIMIT))
+            except (ValueError, TypeError):
+                limit = DEFAULT_SEARCH_LIMIT
+
+            Catalog = request.env['toolshub.listing.catalog'].sudo()
+            results = Catalog._search_listings(query, request.env.user, limit)
+            listings = Catalog.browse([result['id'] for result in results])
+
+            _logger.debug("Search %r matched %s listings", query, len(results))
+
+            return {
+                'success': True,
+                'data': {
+                    **_list_data('listings', listings._get_listing_payloads(), normalized),
+                    'ranks': {result['id']: result['rank'] for result in results},
+                    'highlights': {result['id']: result['highlights'] for result in results},
+                }
+            }
+
+        except Exception as e:
+            _logger.error(str(e))
+            return {
+                'success': False,
+                'data': {
+                    'message': "Failed to search Rent Listings",
+                    'error': str(e)
+                }
+            }
+
     @http.route(['/toolshub/api/getTools'], type='json', auth='user', methods=['POST'])
-    def get_tools(self, filters=None, limit=None, offset=0):
+    @instrumented
+    def get_tools(self, filters=None, limit=None, offset=0, etag=None):
         """
         Get tools with optional filters
+        etag: etag of the tools the client already has, answered with not_modified when nothing changed
         """
-        _logger.info("HIT /toolshub/api/getTools, Getting Tools")
+        _logger.debug("HIT /toolshub/api/getTools, Getting Tools")
         try:
+            current_etag = _etag('tools', filters, limit, offset)
+            if etag and etag == current_etag:
+                return _not_modified(current_etag)
+
             domain = []
             
             # Apply filters if provided
@@ -104,14 +361,11 @@ class ToolshubAPI(http.Controller):
                 
                 # Filter by URL (exact match)
                 if filters.get('url'):
-                    domain.append(('url', '=', filters['url']))
+                    domain.append(('image_url', '=', filters['url']))
                 
-                # Search filter (searches in name and url)
+                # Search filter (searches in name, trigram indexed)
                 if filters.get('search'):
-                    search_term = filters['search']
-                    domain.append('|')
-                    domain.append(('name', 'ilike', search_term))
-                    domain.append(('url', 'ilike', search_term))
+                    domain.append(('name', 'ilike', filters['search']))
                 
                 # Filter by IDs (useful for getting specific tools)
                 if filters.get('ids'):
@@ -130,8 +384,8 @@ class ToolshubAPI(http.Controller):
             # Get tools with pagination
             tools = Tool.search(domain, limit=limit, offset=offset, order='name asc')
             
-            _logger.debug(f"Total Count of Tools {total_count}")
-            _logger.debug(f"Tools {tools}")
+            _logger.debug("Total Count of Tools %s", total_count)
+            _logger.debug("Tools %s", tools)
             
             # Format data
             tools_data = []
@@ -164,6 +418,7 @@ class ToolshubAPI(http.Controller):
                 'success': True,
                 'data': {
                     'tools': tools_data,
+                    'etag': current_etag,
                 }
             }
             
@@ -178,12 +433,13 @@ class ToolshubAPI(http.Controller):
             }
 
     @http.route(['/toolshub/api/getPlans'], type='json', auth='user', methods=['POST'])
+    @instrumented
     def get_plans(self, filters=None, limit=None, offset=0):
         """
         Get tool plans with optional filters
         """
 
-        _logger.info("HIT /toolshub/api/getPlans, Getting Plans")
+        _logger.debug("HIT /toolshub/api/getPlans, Getting Plans")
         try:
             domain = []
             
@@ -239,8 +495,8 @@ class ToolshubAPI(http.Controller):
             # Get plans with pagination
             plans = Plan.search(domain, limit=limit, offset=offset, order='tool_id asc, price asc')
             
-            _logger.debug(f"Total Count of Tools: {total_count}")
-            _logger.debug(f"Plans: {plans}")
+            _logger.debug("Total Count of Tools: %s", total_count)
+            _logger.debug("Plans: %s", plans)
             
             # Format data
             plans_data = []
@@ -291,6 +547,7 @@ class ToolshubAPI(http.Controller):
             }
 
     @http.route('/toolshub/api/createRentListing', type='json', auth='user', methods=['POST'])
+    @instrumented
     def create_rent_listing(self, **kwargs):
         """
         Create a new rental listing
@@ -301,7 +558,7 @@ class ToolshubAPI(http.Controller):
         missing_fields = [field for field in required_fields if field not in kwargs]
         
         if missing_fields:
-            _logger.error("Missing Arguments while creating rent listing", missing_fields)
+            _logger.error("Missing Arguments while creating rent listing: %s", missing_fields)
             return {
                 'success': False,
                 'data': {
@@ -355,7 +612,7 @@ class ToolshubAPI(http.Controller):
         # Check if tool exists
         tool = request.env['toolshub.tools'].browse(tool_id)
         if not tool.exists():
-            _logger.error(f"Tool Not found Tool ID = {tool_id}")
+            _logger.error("Tool Not found Tool ID = %s", tool_id)
             return {
                 'success': False,
                 'data': {
@@ -366,7 +623,7 @@ class ToolshubAPI(http.Controller):
         # Check if plan exists and belongs to the tool
         plan = request.env['toolshub.tool.plans'].browse(plan_id)
         if not plan.exists():
-            _logger.error(f"Plan Not found Tool ID = {plan_id}")
+            _logger.error("Plan Not found Tool ID = %s", plan_id)
             return {
                 'success': False,
                 'data': {
@@ -375,7 +632,7 @@ class ToolshubAPI(http.Controller):
             }
         
         if plan.tool_id.id != tool_id:
-            _logger.error(f"Invalid Plan for Selected Tool Tool ID = {tool_id}, Plan ID = {plan_id}")
+            _logger.error("Invalid Plan for Selected Tool Tool ID = %s, Plan ID = %s", tool_id, plan_id)
             return {
                 'success': False,
                 'data': {
@@ -397,7 +654,7 @@ class ToolshubAPI(http.Controller):
         rental_listing = request.env['toolshub.tool.rent.listings'].create(vals)
         
         # If we reach here, record was created successfully
-        _logger.debug(f"Rental listing created successfully: ID {rental_listing.id}")
+        _logger.debug("Rental listing created successfully: ID %s", rental_listing.id)
         _logger.info("Rent Listing Created Successfully")
         
         # Read the created record to return complete data
@@ -411,6 +668,7 @@ class ToolshubAPI(http.Controller):
         }
 
     @http.route('/toolshub/api/getUserStripeAccount', type='json', auth='user', methods=['POST'])
+    @instrumented
     def get_user_stripe_account(self, **kwargs):
         """
         Get user's Stripe Connect account ID
@@ -429,7 +687,7 @@ class ToolshubAPI(http.Controller):
             }
             
         except Exception as e:
-            _logger.error(f"Error getting user stripe account: {str(e)}")
+            _logger.error("Error getting user stripe account: %s", e)
             return {
                 'success': False,
                 'data': {
@@ -439,12 +697,13 @@ class ToolshubAPI(http.Controller):
             }
 
     @http.route('/toolshub/api/toggleListingActive', type='json', auth='user', methods=['POST'])
+    @instrumented
     def toggle_listing_active(self, **kwargs):
         """
         Toggle is_active status of a rental listing
         Expected params: listing_id
         """
-        _logger.info("HIT /toolshub/api/toggleListingActive, Toggling Listing Active Status")
+        _logger.debug("HIT /toolshub/api/toggleListingActive, Toggling Listing Active Status")
         
         # Validate required fields
         listing_id = kwargs.get('listing_id')
@@ -461,7 +720,7 @@ class ToolshubAPI(http.Controller):
         try:
             listing_id = int(listing_id)
         except (ValueError, TypeError) as e:
-            _logger.error(f"Invalid listing_id format: {str(e)}")
+            _logger.error("Invalid listing_id format: %s", e)
             return {
                 'success': False,
                 'data': {
@@ -476,7 +735,7 @@ class ToolshubAPI(http.Controller):
             listing = RentListing.browse(listing_id)
             
             if not listing.exists():
-                _logger.error(f"Listing not found with ID = {listing_id}")
+                _logger.error("Listing not found with ID = %s", listing_id)
                 return {
                     'success': False,
                     'data': {
@@ -486,7 +745,7 @@ class ToolshubAPI(http.Controller):
             
             # Check if current user is the owner
             if listing.owner_id.id != request.env.user.id:
-                _logger.error(f"User {request.env.user.id} attempted to toggle listing {listing_id} owned by {listing.owner_id.id}")
+                _logger.error("User %s attempted to toggle listing %s owned by %s", request.env.user.id, listing_id, listing.owner_id.id)
                 return {
                     'success': False,
                     'data': {
@@ -498,8 +757,8 @@ class ToolshubAPI(http.Controller):
             new_status = not listing.is_active
             listing.write({'is_active': new_status})
             
-            _logger.debug(f"Listing {listing_id} is_active toggled to {new_status}")
-            _logger.info(f"Listing Active Status Toggled Successfully for Listing ID {listing_id}")
+            _logger.debug("Listing %s is_active toggled to %s", listing_id, new_status)
+            _logger.info("Listing Active Status Toggled Successfully for Listing ID %s", listing_id)
             
             return {
                 'success': True,
@@ -511,7 +770,7 @@ class ToolshubAPI(http.Controller):
             }
             
         except Exception as e:
-            _logger.error(f"Error toggling listing active status: {str(e)}")
+            _logger.error("Error toggling listing active status: %s", e)
             return {
                 'success': False,
                 'data': {
@@ -520,119 +779,15 @@ class ToolshubAPI(http.Controller):
                 }
             }
 
-    @http.route('/toolshub/api/createRentRecord', type='json', auth='user', methods=['POST'])
-    def create_rent_record(self, listing_id, **kwargs):
-        """
-        Create a rental record in toolshub.rented.tools
-        Required params: listing_id
-        """
-        _logger.info(f"Creating rent record for listing ID: {listing_id}")
-        
-        # Validate listing_id
-        if not listing_id:
-            _logger.error("Missing listing_id parameter")
-            return {
-                'success': False,
-                'data': {
-                    'message': "listing_id parameter is required",
-                }
-            }
-        
-        try:
-            listing_id = int(listing_id)
-        except (ValueError, TypeError) as e:
-            _logger.error(f"Invalid listing_id format: {str(e)}")
-            return {
-                'success': False,
-                'data': {
-                    'message': f'Invalid listing_id format: {str(e)}',
-                    'error': str(e)
-                }
-            }
-        
-        try:
-            # Get the listing
-            RentListing = request.env['toolshub.tool.rent.listings'].sudo()
-            listing = RentListing.browse(listing_id)
-            
-            if not listing.exists():
-                _logger.error(f"Listing not found with ID = {listing_id}")
-                return {
-                    'success': False,
-                    'data': {
-                        'message': 'Listing not found'
-                    }
-                }
-            
-            # Check if listing is active
-            if not listing.is_active:
-                _logger.error(f"Attempted to rent inactive listing ID = {listing_id}")
-                return {
-                    'success': False,
-                    'data': {
-                        'message': 'This listing is no longer active'
-                    }
-                }
-            
-            if (not listing.unlimited_users) and listing.available_users <= 0:
-                _logger.error(f"Attempted to rent fully rented listing listing ID = {listing_id}")
-                return {
-                    'success': False,
-                    'data': {
-                        'message': 'This listing has no available users'
-                    }
-                }
-            
-            # Get current user (lender)
-            current_user = request.env.user
-            
-            # Prevent renting own listing
-            if listing.owner_id.id == current_user.id:
-                _logger.error(f"User {current_user.id} attempted to rent their own listing {listing_id}")
-                return {
-                    'success': False,
-                    'data': {
-                        'message': 'You cannot rent your own listing'
-                    }
-                }
-            
-            RentedTools = request.env['toolshub.rented.tools'].sudo()
-            
-            # Prepare values for creation
-            vals = {
-                'rent_listing_id': listing_id,
-                'lender_id': current_user.id,
-            }
-            
-            # Create the rental record
-            rented_record = RentedTools.create(vals)
-            
-            _logger.debug(f"Rental record created successfully: ID {rented_record.id}")
-            _logger.info(f"Rent Record Created Successfully for Listing ID {listing_id}, User ID {current_user.id}")
-            
-            return {
-                'success': True,
-                'data': {
-                    'message': 'Rental record created successfully',
-                }
-            }
-            
-        except Exception as e:
-            _logger.error(f"Error creating rent record: {str(e)}")
-            return {
-                'success': False,
-                'data': {
-                    'message': 'Failed to create rental record',
-                    'error': str(e)
-                }
-            }
-
     @http.route('/toolshub/api/getRentedTools', type='json', auth='user', methods=['POST'])
-    def get_rented_tools(self, filters):
+    @instrumented
+    def get_rented_tools(self, filters, since=None, normalized=False):
         """
         Get all rented tools for the current user
+        since: sync_token of a previous answer, only the rentals changed or removed since are returned
+        normalized: listings reference their tool, plan and owner, sent once in the tools, plans and owners tables
         """
-        _logger.info("HIT /toolshub/api/getRentedTools, Getting Rented Tools")
+        _logger.debug("HIT /toolshub/api/getRentedTools, Getting Rented Tools")
         
         try:
             # Get current user
@@ -645,68 +800,36 @@ class ToolshubAPI(http.Controller):
             # Apply filters if provided
             if filters:
                 if filters.get('tool_name'):
-                    domain.append(('rent_listing_id.tool_id.name', 'ilike',filters['tool_name'].strip() ))
+                    domain += _tool_name_domain('rent_listing_id.tool_id', filters['tool_name'])
                 if filters.get('min_price'):
                     domain.append(('rent_listing_id.price', '>=', float(filters['min_price'])))
                 if filters.get('max_price'):
                     domain.append(('rent_listing_id.price', '<=', float(filters['max_price'])))
+
+            if since:
+                delta = _rentals_delta(RentedTools, [('lender_id', '=', current_user.id)], domain, since)
+                if delta is None:
+                    return _reset_response()
+                changed, removed = delta
+                return _delta_response(_list_data('rented_tools', changed._get_rented_tool_payloads(), normalized, 'listing'), removed)
             
             rented_tools = RentedTools.search(domain, order='id desc')
             
-            _logger.debug(f"Found {len(rented_tools)} rented tools for user {current_user.id}")
+            _logger.debug("Found %s rented tools for user %s", len(rented_tools), current_user.id)
             
             # Format data
-            rented_tools_data = []
-            for rented_tool in rented_tools:
-                listing = rented_tool.rent_listing_id
-
-                plan_features = []
-                for feature in listing.plan_id.feature_ids:
-                    plan_features.append({'id': feature.id,'name': feature.name})
-            
-                # Build listing object
-                listing_data = {
-                    'id': listing.id,
-                    'tool_id': listing.tool_id.id if listing.tool_id else None,
-                    'tool_name': listing.tool_id.name if listing.tool_id else '',
-                    'tool_img_url': listing.tool_id.image_url,
-                    'plan_id': listing.plan_id.id if listing.plan_id else None,
-                    'plan_name': listing.plan_id.name if listing.plan_id else '',
-                    'plan_features': plan_features,
-                    'unlimited_access': listing.plan_id.is_unlimited,
-                    'duration_years': listing.plan_id.duration_years,
-                    'duration_months': listing.plan_id.duration_months,
-                    'duration_days': listing.plan_id.duration_days,
-                    'is_active': listing.is_active,
-                    'price': listing.price,
-                    'currency_symbol': listing.currency_id.symbol if listing.currency_id else '$',
-                    'subscribers_count': listing.subscribers_count,
-                    'unlimited_users': listing.unlimited_users,
-                    'available_users': listing.available_users if not listing.unlimited_users else None,
-                    'owner_id': listing.owner_id.id if listing.owner_id else None,
-                    'owner_name': listing.owner_id.name if listing.owner_id else '',
-                    'owner_connect_account_id': listing.owner_id.stripe_connect_account_id
-                }
-            
-                rented_tools_data.append({
-                    'id': rented_tool.id,
-                    'remaining_usage': rented_tool.remaining_usage,
-                    'listing': listing_data,
-                    'lender_id': rented_tool.lender_id.id if rented_tool.lender_id else None,
-                    'is_active': rented_tool.is_active,
-                    'login': rented_tool.login,
-                    'password': rented_tool.password
-                })
+            rented_tools_data = rented_tools._get_rented_tool_payloads()
             
             return {
             'success': True,
             'data': {
-                'rented_tools': rented_tools_data
+                **_list_data('rented_tools', rented_tools_data, normalized, 'listing'),
+                'sync_token': _sync_token(),
             }
             }
             
         except Exception as e:
-            _logger.error(f"Error getting rented tools: {str(e)}")
+            _logger.error("Error getting rented tools: %s", e)
             return {
             'success': False,
             'data': {
@@ -716,11 +839,14 @@ class ToolshubAPI(http.Controller):
         }
 
     @http.route('/toolshub/api/getRentedOutTools', type='json', auth='user', methods=['POST'])
-    def get_rented_out_tools(self, filters):
+    @instrumented
+    def get_rented_out_tools(self, filters, since=None, normalized=False):
         """
         Get all tools that the current user has rented out to others
+        since: sync_token of a previous answer, only the rentals changed or removed since are returned
+        normalized: listings reference their tool, plan and owner, sent once in the tools, plans and owners tables
         """
-        _logger.info("HIT /toolshub/api/getRentedOutTools, Getting Rented Out Tools")
+        _logger.debug("HIT /toolshub/api/getRentedOutTools, Getting Rented Out Tools")
         
         try:
             # Get current user
@@ -733,69 +859,36 @@ class ToolshubAPI(http.Controller):
             # Apply filters if provided
             if filters:
                 if filters.get('tool_name'):
-                    domain.append(('rent_listing_id.tool_id.name', 'ilike',filters['tool_name'].strip() ))
+                    domain += _tool_name_domain('rent_listing_id.tool_id', filters['tool_name'])
                 if filters.get('min_price'):
                     domain.append(('rent_listing_id.price', '>=', float(filters['min_price'])))
                 if filters.get('max_price'):
                     domain.append(('rent_listing_id.price', '<=', float(filters['max_price'])))
+
+            if since:
+                delta = _rentals_delta(RentedTools, [('rent_listing_id.owner_id', '=', current_user.id)], domain, since)
+                if delta is None:
+                    return _reset_response()
+                changed, removed = delta
+                return _delta_response(_list_data('rented_out_tools', changed._get_rented_tool_payloads(), normalized, 'listing'), removed)
             
             rented_out_tools = RentedTools.search(domain, order='id desc')
             
-            _logger.debug(f"Found {len(rented_out_tools)} rented out tools for user {current_user.id}")
+            _logger.debug("Found %s rented out tools for user %s", len(rented_out_tools), current_user.id)
             
             # Format data
-            rented_out_tools_data = []
-            for rented_tool in rented_out_tools:
-                listing = rented_tool.rent_listing_id
-
-                plan_features = []
-                for feature in listing.plan_id.feature_ids:
-                    plan_features.append({'id': feature.id,'name': feature.name})
-            
-                # Build listing object
-                listing_data = {
-                    'id': listing.id,
-                    'tool_id': listing.tool_id.id if listing.tool_id else None,
-                    'tool_name': listing.tool_id.name if listing.tool_id else '',
-                    'tool_img_url': listing.tool_id.image_url,
-                    'plan_id': listing.plan_id.id if listing.plan_id else None,
-                    'plan_name': listing.plan_id.name if listing.plan_id else '',
-                    'plan_features': plan_features,
-                    'unlimited_access': listing.plan_id.is_unlimited,
-                    'duration_years': listing.plan_id.duration_years,
-                    'duration_months': listing.plan_id.duration_months,
-                    'duration_days': listing.plan_id.duration_days,
-                    'is_active': listing.is_active,
-                    'price': listing.price,
-                    'currency_symbol': listing.currency_id.symbol if listing.currency_id else '$',
-                    'subscribers_count': listing.subscribers_count,
-                    'unlimited_users': listing.unlimited_users,
-                    'available_users': listing.available_users if not listing.unlimited_users else None,
-                    'owner_id': listing.owner_id.id if listing.owner_id else None,
-                    'owner_name': listing.owner_id.name if listing.owner_id else '',
-                    'owner_connect_account_id': listing.owner_id.stripe_connect_account_id
-                }
-            
-                rented_out_tools_data.append({
-                    'id': rented_tool.id,
-                    'remaining_usage': rented_tool.remaining_usage,
-                    'listing': listing_data,
-                    'lender_id': rented_tool.lender_id.id if rented_tool.lender_id else None,
-                    'lender_name': rented_tool.lender_id.name if rented_tool.lender_id else '',
-                    'is_active': rented_tool.is_active,
-                    'login': rented_tool.login,
-                    'password': rented_tool.password
-                })
+            rented_out_tools_data = rented_out_tools._get_rented_tool_payloads()
             
             return {
                 'success': True,
                 'data': {
-                    'rented_out_tools': rented_out_tools_data
+                    **_list_data('rented_out_tools', rented_out_tools_data, normalized, 'listing'),
+                    'sync_token': _sync_token(),
                 }
             }
             
         except Exception as e:
-            _logger.error(f"Error getting rented out tools: {str(e)}")
+            _logger.error("Error getting rented out tools: %s", e)
             return {
                 'success': False,
                 'data': {
@@ -805,12 +898,13 @@ class ToolshubAPI(http.Controller):
             }
 
     @http.route('/toolshub/api/updateRentedToolCredentials', type='json', auth='user', methods=['POST'])
+    @instrumented
     def update_rented_tool_credentials(self, rented_tool_id, login, password, **kwargs):
         """
         Update login and password for a rented tool
         Expected params: rented_tool_id, login, password
         """
-        _logger.info("HIT /toolshub/api/updateRentedToolCredentials, Updating Rented Tool Credentials")
+        _logger.debug("HIT /toolshub/api/updateRentedToolCredentials, Updating Rented Tool Credentials")
         
         # Validate required fields
         # rented_tool_id = kwargs.get('rented_tool_id')
@@ -838,7 +932,7 @@ class ToolshubAPI(http.Controller):
         try:
             rented_tool_id = int(rented_tool_id)
         except (ValueError, TypeError) as e:
-            _logger.error(f"Invalid rented_tool_id format: {str(e)}")
+            _logger.error("Invalid rented_tool_id format: %s", e)
             return {
                 'success': False,
                 'data': {
@@ -853,7 +947,7 @@ class ToolshubAPI(http.Controller):
             rented_tool = RentedTools.browse(rented_tool_id)
             
             if not rented_tool.exists():
-                _logger.error(f"Rented tool not found with ID = {rented_tool_id}")
+                _logger.error("Rented tool not found with ID = %s", rented_tool_id)
                 return {
                     'success': False,
                     'data': {
@@ -864,7 +958,7 @@ class ToolshubAPI(http.Controller):
             # Check if current user is the owner of the listing
             current_user = request.env.user
             if rented_tool.rent_listing_id.owner_id.id != current_user.id:
-                _logger.error(f"User {current_user.id} attempted to update credentials for rented tool {rented_tool_id} owned by {rented_tool.rent_listing_id.owner_id.id}")
+                _logger.error("User %s attempted to update credentials for rented tool %s owned by %s", current_user.id, rented_tool_id, rented_tool.rent_listing_id.owner_id.id)
                 return {
                     'success': False,
                     'data': {
@@ -878,8 +972,8 @@ class ToolshubAPI(http.Controller):
                 'password': password
             })
             
-            _logger.debug(f"Credentials updated for rented tool ID {rented_tool_id}")
-            _logger.info(f"Rented Tool Credentials Updated Successfully for ID {rented_tool_id}")
+            _logger.debug("Credentials updated for rented tool ID %s", rented_tool_id)
+            _logger.info("Rented Tool Credentials Updated Successfully for ID %s", rented_tool_id)
             
             return {
                 'success': True,
@@ -891,7 +985,7 @@ class ToolshubAPI(http.Controller):
             }
             
         except Exception as e:
-            _logger.error(f"Error updating rented tool credentials: {str(e)}")
+            _logger.error("Error updating rented tool credentials: %s", e)
             return {
                 'success': False,
                 'data': {
@@ -900,3 +994,156 @@ class ToolshubAPI(http.Controller):
                 }
             }
 
+
+    @http.route('/toolshub/api/getOwnerStats', type='json', auth='user', methods=['POST'])
+    @instrumented
+    def get_owner_stats(self, date_from=None, date_to=None):
+        """
+        Earnings and seat usage of the current user's listings, read from the daily rollups only
+        date_from, date_to: ISO dates (UTC), both included, default the last 30 days
+        Returns the totals, the revenue per currency, one point per day and one line per tool and currency
+        """
+        _logger.debug("HIT /toolshub/api/getOwnerStats, Getting Owner Stats")
+
+        try:
+            date_to = fields.Date.to_date(date_to) if date_to else request.env.cr.now().date()
+            date_from = fields.Date.to_date(date_from) if date_from else date_to - timedelta(days=DEFAULT_STATS_DAYS - 1)
+        except ValueError as e:
+            _logger.error("Invalid owner stats dates: %s", e)
+            return {
+                'success': False,
+                'data': {
+                    'message': 'Invalid dates',
+                    'error': str(e)
+                }
+            }
+        if date_from > date_to or (date_to - date_from).days >= MAX_STATS_DAYS:
+            return {
+                'success': False,
+                'data': {
+                    'message': f'The period must be between 1 and {MAX_STATS_DAYS} days',
+                }
+            }
+
+        try:
+            # Amounts are never added across currencies: revenue is grouped by currency all the way to the page.
+            # Rollups of listings without a currency are in the company currency
+            params = {'owner_id': request.env.uid, 'date_from': date_from, 'date_to': date_to,
+                      'company_currency_id': request.env.company.currency_id.id}
+
+            # Seats are a daily snapshot: the active seats of the period are those of its last rolled day
+            request.env.cr.execute("""
+                SELECT date, COALESCE(currency_id, %(company_currency_id)s),
+                       SUM(new_rentals), SUM(active_seats), SUM(expired_seats),
+                       SUM(gross_revenue)::float, SUM(platform_fee)::float
+                FROM toolshub_owner_stats_daily
+                WHERE owner_id = %(owner_id)s AND date BETWEEN %(date_from)s AND %(date_to)s
+                GROUP BY 1, 2
+                ORDER BY 1, 2
+            """, params)
+            days = {}
+            currency_totals = {}
+            for day, currency_id, new_rentals, active_seats, expired_seats, gross_revenue, platform_fee in request.env.cr.fetchall():
+                point = days.setdefault(day, {
+                    'date': fields.Date.to_string(day),
+                    'new_rentals': 0,
+                    'active_seats': 0,
+                    'expired_seats': 0,
+                    'revenue': {},
+                })
+                point['new_rentals'] += new_rentals
+                point['active_seats'] += active_seats
+                point['expired_seats'] += expired_seats
+                point['revenue'][currency_id] = {
+                    'gross_revenue': gross_revenue,
+                    'platform_fee': platform_fee,
+                    'net_revenue': round(gross_revenue - platform_fee, 2),
+                }
+                totals = currency_totals.setdefault(currency_id, [0.0, 0.0])
+                totals[0] += gross_revenue
+                totals[1] += platform_fee
+            days = list(days.values())
+            last_day = days[-1]['date'] if days else None
+
+            request.env.cr.execute("""
+                SELECT s.tool_id, t.name, COALESCE(s.currency_id, %(company_currency_id)s), SUM(s.new_rentals),
+                       SUM(s.active_seats) FILTER (WHERE s.date = %(last_day)s), SUM(s.expired_seats),
+                       SUM(s.gross_revenue)::float, SUM(s.platform_fee)::float
+                FROM toolshub_owner_stats_daily s
+                JOIN toolshub_tools t ON t.id = s.tool_id
+                WHERE s.owner_id = %(owner_id)s AND s.date BETWEEN %(date_from)s AND %(date_to)s
+                GROUP BY 1, 2, 3
+                ORDER BY SUM(s.gross_revenue) DESC, s.tool_id, 3
+            """, dict(params, last_day=last_day))
+            tools = [{
+                'tool_id': tool_id,
+                'tool_name': tool_name or '',
+                'currency_id': currency_id,
+                'new_rentals': new_rentals,
+                'active_seats': active_seats or 0,
+                'expired_seats': expired_seats,
+                'gross_revenue': gross_revenue,
+                'platform_fee': platform_fee,
+                'net_revenue': round(gross_revenue - platform_fee, 2),
+            } for tool_id, tool_name, currency_id, new_rentals, active_seats, expired_seats, gross_revenue, platform_fee in request.env.cr.fetchall()]
+
+            symbols = {currency.id: currency.symbol for currency in request.env['res.currency'].sudo().browse(list(currency_totals))}
+            currencies = sorted(({
+                'currency_id': currency_id,
+                'currency_symbol': symbols.get(currency_id) or '$',
+                'gross_revenue': round(gross_revenue, 2),
+                'platform_fee': round(platform_fee, 2),
+                'net_revenue': round(gross_revenue - platform_fee, 2),
+            } for currency_id, (gross_revenue, platform_fee) in currency_totals.items()),
+                key=lambda currency: (-currency['gross_revenue'], currency['currency_id']))
+            _logger.debug("Owner stats of user %s: %s days, %s tools, %s currencies",
+                          request.env.uid, len(days), len(tools), len(currencies))
+
+            return {
+                'success': True,
+                'data': {
+                    'date_from': fields.Date.to_string(date_from),
+                    'date_to': fields.Date.to_string(date_to),
+                    'platform_fee_percent': PLATFORM_FEE_PERCENT,
+                    'totals': {
+                        'new_rentals': sum(day['new_rentals'] for day in days),
+                        'active_seats': days[-1]['active_seats'] if days else 0,
+                        'expired_seats': sum(day['expired_seats'] for day in days),
+                    },
+                    # Revenue totals, one per currency, largest gross first
+                    'currencies': currencies,
+                    'days': days,
+                    'tools': tools,
+                }
+            }
+
+        except Exception as e:
+            _logger.error("Error getting owner stats: %s", e)
+            return {
+                'success': False,
+                'data': {
+                    'message': 'Failed to load your stats',
+                    'error': str(e)
+                }
+            }
+
+    @http.route('/toolshub/api/metrics', type='http', auth='public', methods=['GET'], save_session=False)
+    def get_metrics(self, **kwargs):
+        """
+        Request histograms of the Toolshub routes (wall time, SQL queries and time, rows, response size)
+        in the Prometheus text format. Histograms are kept per worker and labelled with its pid.
+        Open to system administrators, and to scrapers sending the toolshub_metrics_token system parameter
+        as "Authorization: Bearer <token>".
+        """
+        token = request.env['ir.config_parameter'].sudo().get_param('toolshub_metrics_token')
+        authorization = request.httprequest.headers.get('Authorization', '')
+        allowed = request.env.user.has_group('base.group_system') or (
+            token and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode())
+        )
+        if not allowed:
+            _logger.warning("Refused /toolshub/api/metrics to an unauthorized client")
+            return request.make_response("Forbidden", status=403)
+
+        return request.make_response(metrics.render_prometheus(), headers=[
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+        ])
@@ -1,24 +1,23 @@
-import logging
-import secrets
-from datetime import datetime, timedelta
-
 from odoo import http
 from odoo.http import request
 
-_logger = logging.getLogger(__name__)
-_logger.setLevel(logging.DEBUG)
+from ..utils.log import get_logger
+from ..utils.metrics import instrumented
+
+_logger = get_logger(__name__)
 
 
 class ToolshubAuth(http.Controller):
     
     @http.route('/toolshub/api/signup', type='json', auth='public', methods=['POST'], csrf=False)
+    @instrumented
     def signup(self, **kwargs):
         """
         Signup with email verification - creates INACTIVE user
         Expected params: name, email, password
         """
-        _logger.info("HIT /toolshub/api/signup, Creating New User")
-        _logger.debug(f"Request kwargs: {kwargs}")
+        _logger.debug("HIT /toolshub/api/signup, Creating New User")
+        _logger.debug("Signup params: %s", sorted(kwargs))
         
         name = kwargs.get('username')
         email = kwargs.get('email')
@@ -41,7 +40,7 @@ class ToolshubAuth(http.Controller):
             ], limit=1)
             
             if existing_user:
-                _logger.error(f"Email already registered: {email}")
+                _logger.error("Email already registered: %s", email)
                 return {
                     'success': False,
                     'data': {
@@ -49,17 +48,13 @@ class ToolshubAuth(http.Controller):
                     }
                 }
             
-            # Generate unique activation token (never expires)
-            activation_token = secrets.token_urlsafe(32)
-            _logger.debug(f"Generated activation token for {email}")
-            
             # Create partner
             partner = request.env['res.partner'].sudo().create({
                 'name': name,
                 'email': email,
                 'is_company': False,
             })
-            _logger.debug(f"Partner created: ID {partner.id}")
+            _logger.debug("Partner created: ID %s", partner.id)
             
             # Create INACTIVE user with activation token stored
             user = request.env['res.users'].sudo().create({
@@ -70,14 +65,12 @@ class ToolshubAuth(http.Controller):
                 'groups_id': [(6, 0, [request.env.ref('base.group_portal').id])],
             })
             
-            _logger.debug(f"Created inactive user: {email} (ID: {user.id})")
-            _logger.info(f"User Created Successfully: {email}")
+            _logger.debug("Created inactive user: %s (ID: %s)", email, user.id)
+            _logger.info("User Created Successfully: %s", email)
             
-            # Store activation token with user ID (no expiry)
-            request.env['ir.config_parameter'].sudo().set_param(
-                f'activation_token_{activation_token}',
-                f'{user.id}|{email}'
-            )
+            # Generate activation token, only its hash is stored
+            activation_token = request.env['toolshub.activation.token'].sudo()._issue(user)
+            _logger.debug("Generated activation token for %s", email)
             
             # Send activation email
             self._send_activation_email(user, activation_token)
@@ -90,7 +83,7 @@ class ToolshubAuth(http.Controller):
             }
             
         except Exception as e:
-            _logger.error(f"Signup error: {str(e)}")
+            _logger.error("Signup error: %s", e)
             return {
                 'success': False,
                 'data': {
@@ -100,137 +93,78 @@ class ToolshubAuth(http.Controller):
             }
     
     def _send_activation_email(self, user, token):
-        """Send activation email with link"""
-        _logger.info(f"Sending activation email to {user.login}")
+        """Queue the activation email, it is sent by the Toolshub mail cron outside of the signup request"""
+        _logger.info("Queueing activation email to %s", user.login)
         
         try:
             base_url = request.env['ir.config_parameter'].sudo().get_param('web.base.url')
             activation_link = f"{base_url}/toolshub/activate?token={token}"
+            expiry_hours = int(request.env['toolshub.activation.token']._token_lifetime().total_seconds() // 3600)
+            
+            body_html = request.env['ir.qweb'].sudo()._render('toolshub.activation_email', {
+                'name': user.name,
+                'activation_link': activation_link,
+                'expiry_hours': expiry_hours,
+            })
             
-            mail_values = {
+            request.env['mail.mail']._toolshub_enqueue({
                 'subject': 'Activate Your Toolshub Account',
                 'email_from': request.env.company.email or 'noreply@toolshub.com',
                 'email_to': user.login,
-                'body_html': f"""
-                    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-                        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 10px 10px 0 0;">
-                            <h1 style="color: white; margin: 0; text-align: center;">Welcome to Toolshub!</h1>
-                        </div>
-                        
-                        <div style="background: #f8f9fa; padding: 30px; border-radius: 0 0 10px 10px;">
-                            <h2 style="color: #333;">Hi {user.name},</h2>
-                            
-                            <p style="color: #666; font-size: 16px; line-height: 1.6;">
-                                Thank you for signing up! You're almost ready to start renting and listing tools.
-                            </p>
-                            
-                            <p style="color: #666; font-size: 16px; line-height: 1.6;">
-                                Please click the button below to activate your account:
-                            </p>
-                            
-                            <div style="text-align: center; margin: 40px 0;">
-                                <a href="{activation_link}" 
-                                   style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                                          color: white;
-                                          padding: 15px 40px;
-                                          text-decoration: none;
-                                          border-radius: 30px;
-                                          font-weight: bold;
-                                          font-size: 16px;
-                                          display: inline-block;
-                                          box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);">
-                                    Activate My Account
-                                </a>
-                            </div>
-                            
-                            <p style="color: #999; font-size: 14px;">
-                                Or copy and paste this link into your browser:
-                            </p>
-                            <p style="color: #667eea; word-break: break-all; font-size: 14px; background: white; padding: 10px; border-radius: 5px;">
-                                {activation_link}
-                            </p>
-                            
-                            <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd;">
-                                <p style="color: #999; font-size: 13px;">
-                                    💡 This activation link does not expire
-                                </p>
-                                <p style="color: #999; font-size: 13px;">
-                                    If you didn't create this account, please ignore this email.
-                                </p>
-                            </div>
-                            
-                            <p style="color: #666; margin-top: 30px;">
-                                Best regards,<br>
-                                <strong>The Toolshub Team</strong>
-                            </p>
-                        </div>
-                    </div>
-                """,
-            }
-            
-            mail = request.env['mail.mail'].sudo().create(mail_values)
-            mail.send()
+                'body_html': body_html,
+            })
             
-            _logger.debug(f"Activation email sent successfully to {user.login}")
+            _logger.debug("Activation email queued for %s", user.login)
             
         except Exception as e:
-            _logger.error(f"Error sending activation email: {str(e)}")
+            _logger.error("Error queueing activation email: %s", e)
     
     @http.route('/toolshub/activate', type='http', auth='public', methods=['GET'], website=True)
+    @instrumented
     def activate_account(self, token=None, **kwargs):
         """Activate user account via email link"""
-        _logger.info("HIT /toolshub/activate, Activating User Account")
-        _logger.debug(f"Activation token: {token}")
+        _logger.debug("HIT /toolshub/activate, Activating User Account")
         
         try:
             if not token:
                 _logger.error("Missing activation token")
                 return request.redirect('/toolshub?token_error=missing')
             
-            # Get stored token data
-            token_data = request.env['ir.config_parameter'].sudo().get_param(
-                f'activation_token_{token}'
-            )
+            status, user = request.env['toolshub.activation.token'].sudo()._consume(token)
             
-            if not token_data:
-                _logger.error(f"Invalid token: {token}")
+            if status == 'invalid':
+                _logger.error("Invalid activation token")
                 return request.redirect('/toolshub?token_error=invalid')
             
-            # Parse token data (no expiry field)
-            parts = token_data.split('|')
-            if len(parts) != 2:
-                _logger.error(f"Malformed token data: {token}")
-                return request.redirect('/toolshub?token_error=invalid')
-            
-            user_id, email = parts
-            user_id = int(user_id)
-            
-            _logger.debug(f"Token data: user_id={user_id}, email={email}")
-            
-            # Get the user (search inactive users)
-            user = request.env['res.users'].with_context(active_test=False).sudo().browse(user_id)
+            # A replayed link never touches the user, an administrator may have deactivated it since
+            if status == 'used':
+                _logger.warning("Activation token of user %s already used", user.id)
+                return request.redirect('/toolshub?token_info=already')
             
             if not user.exists():
-                _logger.error(f"User not found: ID {user_id}")
+                _logger.error("User not found for activation token")
                 return request.redirect('/toolshub?token_error=user_not_found')
             
+            user = user.with_context(active_test=False)
+            email = user.login
+            _logger.debug("Token data: user_id=%s, email=%s, status=%s", user.id, email, status)
+            
             if user.active:
-                _logger.warning(f"User {email} already activated")
+                _logger.warning("User %s already activated", email)
                 return request.redirect('/toolshub?token_info=already')
             
-            # Activate user
-            user.write({'active': True})
+            if status == 'expired':
+                _logger.error("Expired activation token for %s", email)
+                return request.redirect('/toolshub?token_error=expired')
             
-            # Delete used token (one-time use)
-            request.env['ir.config_parameter'].sudo().search([
-                ('key', '=', f'activation_token_{token}')
-            ]).unlink()
+            # Activate user, the token was marked used by _consume (one-time use)
+            user.write({'active': True})
             
-            _logger.info(f"User Activated Successfully: {email} (ID: {user_id})")
+            _logger.info("User Activated Successfully: %s (ID: %s)", email, user.id)
             
             # Redirect to login with success message
             return request.redirect('/toolshub?token_info=activated')
             
         except Exception as e:
-            _logger.error(f"Activation error: {str(e)}")
+            _logger.error("Activation error: %s", e)
             return request.redirect('/toolshub?token_error=failed')
\ No newline at end of file
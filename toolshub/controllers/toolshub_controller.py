@@ -1,15 +1,26 @@
-import logging
-
 from odoo import http
-from odoo.http import request, route
+from odoo.http import request
+
+from ..utils.log import get_logger
+from ..utils.metrics import instrumented
 
-_logger = logging.getLogger(__name__)
+_logger = get_logger(__name__)
 
 class ToolshubController(http.Controller):
     @http.route(['/toolshub'], type='http', auth='public', website=True)
+    @instrumented
     def show_homepage(self):
         """
         Renders the Main Toolshub App
         """
-        _logger.info("Main Controller Hit, Rendering Toolshub App")
+        _logger.debug("Main Controller Hit, Rendering Toolshub App")
         return request.render('toolshub.main_app')
+
+    @http.route(['/toolshub/benchmark/grid'], type='http', auth='user', website=True)
+    @instrumented
+    def show_grid_benchmark(self):
+        """
+        Renders the listing grid benchmark, synthetic listings only (?count=10000&frames=600)
+        """
+        _logger.debug("Grid Benchmark Hit, Rendering Benchmark Page")
+        return request.render('toolshub.grid_benchmark')
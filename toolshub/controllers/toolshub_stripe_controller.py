@@ -1,25 +1,64 @@
-import logging
+import json
 
 import stripe
 from odoo import http
 from odoo.http import request
 
-_logger = logging.getLogger(__name__)
+from ..models.toolshub_rented_tools import platform_fee_cents
+from ..utils.log import get_logger
+from ..utils.metrics import instrumented
+from ..utils.stripe_client import get_stripe_client
+
+_logger = get_logger(__name__)
 
 class StripePaymentController(http.Controller):
+
+    @http.route('/toolshub/stripe/webhook', type='http', auth='public', methods=['POST'], csrf=False, save_session=False)
+    @instrumented
+    def stripe_webhook(self, **kwargs):
+        """
+        Receive Stripe events. The signature is verified and the raw event stored,
+        the work itself is done by the Stripe events cron so Stripe gets its answer immediately.
+        """
+        payload = request.httprequest.get_data(as_text=True)
+        signature = request.httprequest.headers.get('Stripe-Signature', '')
+        secret = request.env['ir.config_parameter'].sudo().get_param('stripe_webhook_secret', '')
+        if not secret:
+            # An empty key would let anyone sign a forged event
+            _logger.error("Rejected Stripe webhook: the stripe_webhook_secret parameter is not set")
+            return request.make_json_response({'received': False}, status=503)
+
+        try:
+            stripe.WebhookSignature.verify_header(payload, signature, secret)
+            event = json.loads(payload)
+            event_id, event_type = event['id'], event['type']
+        except stripe._error.SignatureVerificationError as e:
+            _logger.warning("Rejected Stripe webhook with invalid signature: %s", e)
+            return request.make_json_response({'received': False}, status=400)
+        except (ValueError, KeyError, TypeError) as e:
+            _logger.warning("Rejected malformed Stripe webhook: %s", e)
+            return request.make_json_response({'received': False}, status=400)
+
+        created = request.env['toolshub.stripe.event'].sudo()._ingest(event_id, event_type, payload)
+        _logger.debug("Stripe event %s (%s) received, new: %s", event_id, event_type, created)
+        return request.make_json_response({'received': True})
     
     @http.route('/toolshub/processRentPayment', type='json', auth='user', methods=['POST'])
+    @instrumented
     def process_rent_payment(self, **kwargs ):
         """
-        Process a rental payment with Stripe Connect
+        Process a rental payment with Stripe Connect.
+        Price, seller and availability are read from the database, the listing sent by the client only provides its id.
+        Repeat clicks reuse the open checkout session of the user for the listing, and every new session
+        is created with an idempotency key so retried requests never create a second one on Stripe.
         """
-        _logger.info("HIT /toolshub/processRentPayment, Processing Rent Payment")
-        _logger.debug(f"Request kwargs: {kwargs}")
+        _logger.debug("HIT /toolshub/processRentPayment, Processing Rent Payment")
+        _logger.debug("Request params: %s", sorted(kwargs))
         
-        listing = kwargs.get('listing')
-        _logger.debug(f"Got Listing {listing}")
+        listing_data = kwargs.get('listing')
+        _logger.debug("Got Listing %s", listing_data)
 
-        if not listing:
+        if not listing_data or not listing_data.get('id'):
             _logger.error("No Rent Listing Selected")
             return {
                 'success': False,
@@ -28,9 +67,20 @@ class StripePaymentController(http.Controller):
                     'error': '/processRentPayment called without providing listing'
                 }
             }
+
+        listing_record = request.env['toolshub.tool.rent.listings'].sudo().browse(int(listing_data['id'])).exists()
+        if not listing_record or not listing_record.is_active:
+            _logger.error("Attempted to rent missing or inactive listing ID = %s", listing_data['id'])
+            return {
+                'success': False,
+                'data': {
+                    'message': 'This listing is not available'
+                }
+            }
+        listing = listing_record._get_listing_payloads()[0]
         
         if (not listing['unlimited_users']) and listing['available_users'] <= 0:
-            _logger.error(f"Attempted to rent fully rented listing listing ID = {listing.id}")
+            _logger.error("Attempted to rent fully rented listing listing ID = %s", listing['id'])
             return {
                 'success': False,
                 'data': {
@@ -38,52 +88,71 @@ class StripePaymentController(http.Controller):
                 }
             }
 
-        # Initialize Stripe
-        stripe.api_key = request.env['ir.config_parameter'].sudo().get_param('stripe_api_key', '')
-        
+        CheckoutSession = request.env['toolshub.checkout.session'].sudo()
+        user_id = request.env.user.id
+
+        open_session = CheckoutSession._find_open(user_id, listing['id'])
+        if open_session:
+            _logger.info("Reusing open Checkout Session")
+            return {
+                'success': True,
+                'data': {
+                    'checkout_url': open_session.checkout_url,
+                    'session_id': open_session.stripe_session_id,
+                }
+            }
+
         _logger.debug("Creating Checkout Session")
         try:
             SELLER_STRIPE_ACCOUNT = listing['owner_connect_account_id']
-            RENTAL_AMOUNT = listing['price'] * 100
-            PLATFORM_FEE_PERCENT = 5  # Platform takes 5%
-            PLATFORM_FEE = int(RENTAL_AMOUNT * PLATFORM_FEE_PERCENT / 100)
+            # Stripe expects an integer amount in cents
+            RENTAL_AMOUNT = int(round(listing['price'] * 100))
+            PLATFORM_FEE = platform_fee_cents(RENTAL_AMOUNT)
             
-            _logger.info(f"Seller Account: {SELLER_STRIPE_ACCOUNT}, Amount: {RENTAL_AMOUNT}, Platform Fee: {PLATFORM_FEE}")
+            _logger.info("Seller Account: %s, Amount: %s, Platform Fee: %s", SELLER_STRIPE_ACCOUNT, RENTAL_AMOUNT, PLATFORM_FEE)
+
+            attempt = CheckoutSession._next_attempt(user_id, listing['id'])
+            idempotency_key = CheckoutSession._idempotency_key(user_id, listing['id'], attempt)
             
             # Create Stripe Checkout Session
-            session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=[{
-                    'price_data': {
-                        'currency': 'usd',
-                        'product_data': {
-                            'name': 'Tool Rental',
-                            'description': f"{listing['tool_name']} - {listing['plan_name']}",
+            session = get_stripe_client(request.env).checkout.sessions.create(
+                params={
+                    'payment_method_types': ['card'],
+                    'line_items': [{
+                        'price_data': {
+                            'currency': 'usd',
+                            'product_data': {
+                                'name': 'Tool Rental',
+                                'description': f"{listing['tool_name']} - {listing['plan_name']}",
+                            },
+                            'unit_amount': RENTAL_AMOUNT,
+                        },
+                        'quantity': 1,
+                    }],
+                    'mode': 'payment',
+                    'success_url': request.httprequest.host_url + f'toolshub?paymentStatus=success&listingId={listing["id"]}',
+                    'cancel_url': request.httprequest.host_url + f'toolshub?paymentStatus=cancelled',
+                    'payment_intent_data': {
+                        'application_fee_amount': PLATFORM_FEE,
+                        'transfer_data': {
+                            'destination': SELLER_STRIPE_ACCOUNT,
                         },
-                        'unit_amount': RENTAL_AMOUNT,
                     },
-                    'quantity': 1,
-                }],
-                mode='payment',
-                success_url= request.httprequest.host_url + f'toolshub?paymentStatus=success&listingId={listing["id"]}',
-                cancel_url= request.httprequest.host_url + f'toolshub?paymentStatus=cancelled',
-                payment_intent_data={
-                    'application_fee_amount': PLATFORM_FEE,
-                    'transfer_data': {
-                        'destination': SELLER_STRIPE_ACCOUNT,
+                    'metadata': {
+                        'listing_id': str(listing['id']),
+                        'tool_name': listing['tool_name'],
+                        'plan_name': listing['plan_name'],
+                        'user_id': str(user_id),
+                        'user_email': request.env.user.email or '',
+                        'seller_account': SELLER_STRIPE_ACCOUNT,
                     },
                 },
-                metadata={
-                    'tool_name': listing['tool_name'],
-                    'plan_name': listing['plan_name'],
-                    'user_id': str(request.env.user.id),
-                    'user_email': request.env.user.email,
-                    'seller_account': SELLER_STRIPE_ACCOUNT,
-                }
+                options={'idempotency_key': idempotency_key},
             )
+            CheckoutSession._record(user_id, listing['id'], attempt, idempotency_key, session)
 
             _logger.info("Checkout Session Created Successfully")
-            _logger.debug(f"Session ID: {session.id}")
+            _logger.debug("Session ID: %s", session.id)
             
             return {
                 'success': True,
@@ -94,7 +163,7 @@ class StripePaymentController(http.Controller):
             }
             
         except stripe._error.StripeError as e:
-            _logger.error(f"Stripe error: {str(e)}")
+            _logger.error("Stripe error: %s", e)
             return {
                 'success': False,
                 'data': {
@@ -103,7 +172,7 @@ class StripePaymentController(http.Controller):
                 }
             }
         except Exception as e:
-            _logger.error(f"Unexpected error: {str(e)}")
+            _logger.error("Unexpected error: %s", e)
             return {
                 'success': False,
                 'data': {
@@ -113,11 +182,12 @@ class StripePaymentController(http.Controller):
             }
     
     @http.route('/toolshub/validateConnectAccount', type='json', auth='user', methods=['POST'])
+    @instrumented
     def validate_connect_account(self, **kwargs):
-        _logger.info("HIT /toolshub/validateConnectAccount, Validating Connect Account")
+        _logger.debug("HIT /toolshub/validateConnectAccount, Validating Connect Account")
         
         connect_id = kwargs.get("connect_id")
-        _logger.debug(f"Connect ID: {connect_id}")
+        _logger.debug("Connect ID: %s", connect_id)
         
         if not connect_id:
             _logger.error("No Connect Account ID Provided")
@@ -129,14 +199,11 @@ class StripePaymentController(http.Controller):
             }
 
         try:
-            # Initialize Stripe
-            stripe.api_key = request.env['ir.config_parameter'].sudo().get_param('stripe_api_key', '')
-
-            _logger.debug(f"Retrieving Stripe Account: {connect_id}")
-            stripe.Account.retrieve(connect_id)
+            _logger.debug("Retrieving Stripe Account: %s", connect_id)
+            get_stripe_client(request.env).accounts.retrieve(connect_id)
 
             user = request.env.user
-            _logger.debug(f"Updating user {user.id} with Connect Account ID")
+            _logger.debug("Updating user %s with Connect Account ID", user.id)
             user.write({
                 "stripe_connect_account_id": connect_id
             })
@@ -150,7 +217,7 @@ class StripePaymentController(http.Controller):
             }
         
         except stripe._error.StripeError as e:
-            _logger.error(f"Stripe error: {str(e)}")
+            _logger.error("Stripe error: %s", e)
             return {
                 "success": False, 
                 "data": {
@@ -159,7 +226,7 @@ class StripePaymentController(http.Controller):
                 }
             }
         except Exception as e:
-            _logger.error(f"Unexpected error: {str(e)}")
+            _logger.error("Unexpected error: %s", e)
             return {
                 "success": False, 
                 "data": {
@@ -169,53 +236,53 @@ class StripePaymentController(http.Controller):
             }
 
     @http.route('/toolshub/createConnectAccount', type='json', auth='user', methods=['POST'], csrf=False)
+    @instrumented
     def create_stripe_connect_account(self, **kwargs):
         """Create Stripe Connect account and redirect user to onboarding"""
-        _logger.info("HIT /toolshub/createConnectAccount, Creating Stripe Connect Account")
+        _logger.debug("HIT /toolshub/createConnectAccount, Creating Stripe Connect Account")
         
         try:
-            # Set your Stripe API key
-            stripe.api_key = request.env['ir.config_parameter'].sudo().get_param('stripe_api_key', '')
+            client = get_stripe_client(request.env)
             
             current_user = request.env.user
-            _logger.debug(f"Current user: {current_user.id} - {current_user.email}")
+            _logger.debug("Current user: %s - %s", current_user.id, current_user.email)
             
             # Check if user already has an account
             if current_user.stripe_connect_account_id:
                 account_id = current_user.stripe_connect_account_id
-                _logger.debug(f"User already has Connect Account: {account_id}")
+                _logger.debug("User already has Connect Account: %s", account_id)
             else:
                 _logger.debug("Creating new Stripe Connect Account")
                 # Create a new Connected Account
-                account = stripe.Account.create(
-                    type='express',
-                    country='US',
-                    email=current_user.email,
-                    capabilities={
+                account = client.accounts.create(params={
+                    'type': 'express',
+                    'country': 'US',
+                    'email': current_user.email,
+                    'capabilities': {
                         'card_payments': {'requested': True},
                         'transfers': {'requested': True},
-                    }
-                )
+                    },
+                })
                 account_id = account.id
-                _logger.debug(f"Created Connect Account: {account_id}")
+                _logger.debug("Created Connect Account: %s", account_id)
                 
                 # Save account ID to user
                 current_user.sudo().write({
                     'stripe_connect_account_id': account_id
                 })
-                _logger.debug(f"Saved Connect Account ID to user {current_user.id}")
+                _logger.debug("Saved Connect Account ID to user %s", current_user.id)
             
             # Generate onboarding link
-            _logger.debug(f"Generating onboarding link for account: {account_id}")
-            account_link = stripe.AccountLink.create(
-                account=account_id,
-                refresh_url=request.httprequest.host_url + 'toolshub',
-                return_url=request.httprequest.host_url + 'toolshub?connectAccountStatus=success',
-                type='account_onboarding',
-            )
+            _logger.debug("Generating onboarding link for account: %s", account_id)
+            account_link = client.account_links.create(params={
+                'account': account_id,
+                'refresh_url': request.httprequest.host_url + 'toolshub',
+                'return_url': request.httprequest.host_url + 'toolshub?connectAccountStatus=success',
+                'type': 'account_onboarding',
+            })
             
             _logger.info("Stripe Connect Account Created and Onboarding Link Generated Successfully")
-            _logger.debug(f"Onboarding URL: {account_link.url}")
+            _logger.debug("Onboarding URL: %s", account_link.url)
             
             # Return onboarding link to frontend
             return {
@@ -226,7 +293,7 @@ class StripePaymentController(http.Controller):
             }
             
         except stripe._error.StripeError as e:
-            _logger.error(f"Stripe Connect Error: {str(e)}")
+            _logger.error("Stripe Connect Error: %s", e)
             return {
                 'success': False,
                 'data': {
@@ -235,7 +302,7 @@ class StripePaymentController(http.Controller):
                 }
             }
         except Exception as e:
-            _logger.error(f"Unexpected error: {str(e)}")
+            _logger.error("Unexpected error: %s", e)
             return {
                 'success': False,
                 'data': {
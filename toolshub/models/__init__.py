@@ -3,4 +3,17 @@ from . import toolshub_tool_plans
 from . import toolshub_tool_plan_features
 from . import toolshub_tool_rent_listings
 from . import toolshub_rented_tools
-from . import toolshub_res_users
\ No newline at end of file
+from . import toolshub_res_users
+from . import toolshub_res_partner
+from . import toolshub_res_currency
+from . import toolshub_stripe_events
+from . import toolshub_checkout_sessions
+from . import toolshub_activation_tokens
+from . import toolshub_mail_mail
+from . import toolshub_expiry_recompute
+from . import toolshub_request_profiles
+from . import toolshub_owner_stats
+from . import toolshub_listing_catalog
+from . import toolshub_sync_tombstones
+from . import toolshub_ir_websocket
+from . import toolshub_ir_http
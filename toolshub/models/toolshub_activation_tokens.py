@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import secrets
+from datetime import timedelta
+
+from odoo import fields, models, api
+from odoo.tools import sql
+
+_logger = logging.getLogger(__name__)
+
+# Hours an activation link stays valid, overridable with the toolshub_activation_token_hours parameter
+DEFAULT_TOKEN_HOURS = 48
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class ToolshubActivationToken(models.Model):
+    _name = "toolshub.activation.token"
+    _description = "Account Activation Tokens"
+    _order = "id desc"
+
+    # Fields
+    user_id = fields.Many2one("res.users", string="User", required=True, ondelete="cascade", readonly=True, index=True)
+    # Only the SHA-256 of the token is stored, the token itself only exists in the activation email
+    token_hash = fields.Char("Token Hash", required=True, readonly=True, copy=False)
+    expires_at = fields.Datetime("Expires At", required=True, readonly=True)
+    used_date = fields.Datetime("Used On", readonly=True)
+
+
+    # SQL Constraints
+    _sql_constraints = [
+        ('unique_token_hash', 'unique(token_hash)', 'Activation token must be unique.'),
+    ]
+
+    def init(self):
+        # The purge cron scans tokens by expiry
+        sql.create_index(self.env.cr, 'toolshub_activation_token_expires_at_idx', self._table, ['expires_at'])
+
+    @api.model
+    def _token_lifetime(self):
+        hours = self.env['ir.config_parameter'].sudo().get_param('toolshub_activation_token_hours', DEFAULT_TOKEN_HOURS)
+        return timedelta(hours=int(hours))
+
+    @api.model
+    def _issue(self, user):
+        """Create an activation token for user and return the plain token to put in the activation link"""
+        token = secrets.token_urlsafe(32)
+        self.create({
+            'user_id': user.id,
+            'token_hash': hash_token(token),
+            'expires_at': fields.Datetime.now() + self._token_lifetime(),
+        })
+        return token
+
+    @api.model
+    def _consume(self, token):
+        """
+        Mark the token as used and return (status, user).
+        status is one of 'invalid', 'expired', 'used' or 'valid'.
+        """
+        record = self.search([('token_hash', '=', hash_token(token))], limit=1)
+        if not record:
+            return 'invalid', self.env['res.users']
+        if record.used_date:
+            return 'used', record.user_id
+        if record.expires_at < fields.Datetime.now():
+            return 'expired', record.user_id
+        record.used_date = fields.Datetime.now()
+        return 'valid', record.user_id
+
+    @api.model
+    def _cron_purge_tokens(self, batch_size=1000, max_batches=50):
+        """
+        Delete expired and used tokens, together with the users that signed up but never activated.
+        Works in committed batches so a large backlog does not hold locks for long.
+        Tokens of inactive users are kept: they are what selects the users to purge, and what tells
+        a deactivated user apart from a signup. They go with their user through ondelete cascade.
+        """
+        now = fields.Datetime.now()
+        Users = self.env['res.users'].with_context(active_test=False)
+        users_removed = tokens_removed = 0
+
+        for __ in range(max_batches):
+            # Signups whose every token expired unused and that never logged in
+            self.env.cr.execute("""
+                SELECT u.id, u.partner_id
+                FROM toolshub_activation_token t
+                JOIN res_users u ON u.id = t.user_id
+                WHERE t.expires_at < %(now)s
+                  AND t.used_date IS NULL
+                  AND NOT u.active
+                  AND NOT EXISTS (
+                      SELECT 1 FROM toolshub_activation_token other
+                      WHERE other.user_id = u.id AND (other.expires_at >= %(now)s OR other.used_date IS NOT NULL)
+                  )
+                  AND NOT EXISTS (SELECT 1 FROM res_users_log l WHERE l.create_uid = u.id)
+                GROUP BY u.id
+                LIMIT %(limit)s
+            """, {'now': now, 'limit': batch_size})
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+
+            # Tokens go with the users through ondelete cascade
+            Users.browse([user_id for user_id, __ in rows]).unlink()
+            self.env['res.partner'].browse([partner_id for __, partner_id in rows]).exists().unlink()
+            users_removed += len(rows)
+            self.env.cr.commit()
+
+        for __ in range(max_batches):
+            self.env.cr.execute("""
+                DELETE FROM toolshub_activation_token
+                WHERE id IN (
+                    SELECT t.id FROM toolshub_activation_token t
+                    JOIN res_users u ON u.id = t.user_id
+                    WHERE (t.expires_at < %s OR t.used_date IS NOT NULL) AND u.active
+                    LIMIT %s
+                )
+            """, [now, batch_size])
+            deleted = self.env.cr.rowcount
+            tokens_removed += deleted
+            self.env.cr.commit()
+            if deleted < batch_size:
+                break
+
+        _logger.info("Purged %s activation tokens and %s never activated users", tokens_removed, users_removed)
+        self.env['ir.cron']._notify_progress(done=users_removed + tokens_removed, remaining=0)
+        return users_removed, tokens_removed
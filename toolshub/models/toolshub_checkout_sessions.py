@@ -0,0 +1,88 @@
+import hashlib
+from datetime import datetime, timedelta
+
+from odoo import fields, models, api
+from odoo.tools import sql
+
+
+class ToolshubCheckoutSession(models.Model):
+    _name = "toolshub.checkout.session"
+    _description = "Stripe Checkout Sessions created for rentals"
+    _order = "id desc"
+    _rec_name = "stripe_session_id"
+
+    # Fields
+    user_id = fields.Many2one("res.users", string="User", required=True, ondelete="cascade", readonly=True)
+    listing_id = fields.Many2one("toolshub.tool.rent.listings", string="Rent Listing", required=True, ondelete="cascade", readonly=True)
+    attempt = fields.Integer("Attempt", default=1, readonly=True)
+    idempotency_key = fields.Char("Idempotency Key", required=True, readonly=True)
+    stripe_session_id = fields.Char("Stripe Session ID", required=True, readonly=True)
+    checkout_url = fields.Char("Checkout URL", readonly=True)
+    expires_at = fields.Datetime("Expires At", readonly=True)
+    state = fields.Selection(
+        [('open', 'Open'), ('completed', 'Completed'), ('expired', 'Expired'), ('refunded', 'Refunded')],
+        string="State", default='open', required=True, readonly=True,
+    )
+
+
+    # SQL Constraints
+    _sql_constraints = [
+        ('unique_idempotency_key', 'unique(idempotency_key)', 'Idempotency key must be unique.'),
+        ('unique_stripe_session_id', 'unique(stripe_session_id)', 'Stripe session must be unique.'),
+    ]
+
+    def init(self):
+        # Repeat clicks look for the open session of a (user, listing) pair
+        sql.create_index(self.env.cr, 'toolshub_checkout_session_open_idx', self._table,
+                         ['user_id', 'listing_id', 'id DESC'], where="state = 'open'")
+
+    @api.model
+    def _idempotency_key(self, user_id, listing_id, attempt):
+        """Deterministic Stripe idempotency key of one checkout attempt of user on listing"""
+        digest = hashlib.sha256(f"{self.env.cr.dbname}:{user_id}:{listing_id}:{attempt}".encode()).hexdigest()
+        return f"toolshub-checkout-{digest[:40]}"
+
+    @api.model
+    def _find_open(self, user_id, listing_id):
+        """Open session of user for listing that is still usable for a few minutes, if any"""
+        return self.search([
+            ('user_id', '=', user_id),
+            ('listing_id', '=', listing_id),
+            ('state', '=', 'open'),
+            ('expires_at', '>', fields.Datetime.now() + timedelta(minutes=5)),
+        ], limit=1)
+
+    @api.model
+    def _next_attempt(self, user_id, listing_id):
+        """Attempt number of the next session, sessions that completed or expired are never reused"""
+        last = self.search([('user_id', '=', user_id), ('listing_id', '=', listing_id)], order='attempt desc', limit=1)
+        if last and last.state == 'open':
+            # Open but about to expire: Stripe would return the same session for the same key
+            return last.attempt + 1
+        return (last.attempt or 0) + 1
+
+    @api.model
+    def _record(self, user_id, listing_id, attempt, idempotency_key, session):
+        """Store the session returned by Stripe, a concurrent request may already have stored it"""
+        self.env.cr.execute("""
+            INSERT INTO toolshub_checkout_session
+                (user_id, listing_id, attempt, idempotency_key, stripe_session_id, checkout_url, expires_at, state,
+                 create_uid, create_date, write_uid, write_date)
+            VALUES (%(user_id)s, %(listing_id)s, %(attempt)s, %(key)s, %(session_id)s, %(url)s, %(expires_at)s, 'open',
+                    %(uid)s, (now() at time zone 'UTC'), %(uid)s, (now() at time zone 'UTC'))
+            ON CONFLICT DO NOTHING
+        """, {
+            'user_id': user_id,
+            'listing_id': listing_id,
+            'attempt': attempt,
+            'key': idempotency_key,
+            'session_id': session.id,
+            'url': session.url,
+            'expires_at': datetime.utcfromtimestamp(session.expires_at) if getattr(session, 'expires_at', None) else None,
+            'uid': self.env.uid,
+        })
+
+    @api.model
+    def _set_state(self, stripe_session_id, state):
+        """Called from the Stripe webhook events"""
+        self.search([('stripe_session_id', '=', stripe_session_id)]).write({'state': state})
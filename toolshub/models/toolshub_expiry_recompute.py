@@ -0,0 +1,148 @@
+import logging
+from collections import Counter
+
+from odoo import fields, models, api
+
+_logger = logging.getLogger(__name__)
+
+
+class ToolshubExpiryRecompute(models.Model):
+    """
+    Background recompute of the rentals' expiry date after the durations of a plan changed, expired rentals
+    that a longer duration brings back are reactivated.
+    The rentals are updated by rental id in committed batches; last_rental_id is the cursor,
+    so a job interrupted by a restart resumes after the last batch it committed.
+    """
+    _name = "toolshub.expiry.recompute"
+    _description = "Deferred Rental Expiry Recompute"
+    _order = "id"
+
+    # Fields
+    plan_id = fields.Many2one("toolshub.tool.plans", string="Plan", required=True, ondelete="cascade", readonly=True, index=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+    ], string="State", default='pending', required=True, readonly=True)
+    last_rental_id = fields.Integer("Last Rental Processed", default=0, readonly=True)
+    rentals_done = fields.Integer("Rentals Processed", default=0, readonly=True)
+    rentals_total = fields.Integer("Rentals To Process", readonly=True)
+    done_date = fields.Datetime("Done On", readonly=True)
+
+
+    # Scheduling
+    @api.model
+    def _schedule(self, plans):
+        """Queue a recompute of the rentals of plans, restarting the pending job of a plan from the beginning"""
+        if not plans:
+            return
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT l.plan_id, COUNT(rt.id)
+            FROM toolshub_rented_tools rt
+            JOIN toolshub_tool_rent_listings l ON l.id = rt.rent_listing_id
+            WHERE l.plan_id = ANY(%s)
+            GROUP BY l.plan_id
+        """, [plans.ids])
+        rentals_counts = dict(self.env.cr.fetchall())
+
+        pending_jobs = self.search([('plan_id', 'in', plans.ids), ('state', '=', 'pending')])
+        pending_by_plan = {job.plan_id.id: job for job in pending_jobs}
+        new_jobs = []
+        for plan in plans:
+            if not rentals_counts.get(plan.id):
+                continue
+            values = {'last_rental_id': 0, 'rentals_done': 0, 'rentals_total': rentals_counts[plan.id]}
+            if plan.id in pending_by_plan:
+                pending_by_plan[plan.id].write(values)
+            else:
+                new_jobs.append(dict(values, plan_id=plan.id))
+        self.create(new_jobs)
+
+        if rentals_counts:
+            self.env.ref('toolshub.ir_cron_recompute_rental_expiry')._trigger()
+
+
+    # Processing
+    @api.model
+    def _cron_recompute(self, batch_size=5000, max_batches=50):
+        """Work through the pending jobs, oldest first, one committed batch of rentals at a time"""
+        done = 0
+        for __ in range(max_batches):
+            job = self.search([('state', '=', 'pending')], limit=1)
+            if not job:
+                break
+            done += job._process_batch(batch_size)
+            # Keep the progress of this batch
+            self.env.cr.commit()
+
+        pending_jobs = self.search([('state', '=', 'pending')])
+        remaining = sum(max(job.rentals_total - job.rentals_done, 0) for job in pending_jobs)
+        _logger.info("Recomputed the expiry date of %s rentals, %s remaining", done, remaining)
+        self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
+        if done:
+            # Rentals whose new expiry date already passed are deactivated by the expiry cron
+            self.env.ref('toolshub.ir_cron_expire_rented_tools')._trigger()
+        return done
+
+    def _process_batch(self, batch_size):
+        """
+        Recompute the expiry date of the next batch_size rentals of the job's plan in SQL, returns the rentals processed.
+        Rentals the expiry cron deactivated that a longer duration brings back take their seat again, as long as
+        their limited listing has one left. Rentals deactivated before their expiry date are left inactive.
+        """
+        self.ensure_one()
+        self.env.flush_all()
+
+        # Same formula as toolshub.rented.tools._compute_expiry_date, rows already up to date are not rewritten
+        self.env.cr.execute("""
+            WITH batch AS (
+                SELECT rt.id, rt.rent_listing_id, rt.is_active, rt.expiry_date AS old_expiry,
+                       CASE WHEN p.total_duration_days > 0
+                            THEN rt.rented_date + p.total_duration_days * interval '1 day'
+                       END AS new_expiry
+                FROM toolshub_rented_tools rt
+                JOIN toolshub_tool_rent_listings l ON l.id = rt.rent_listing_id
+                JOIN toolshub_tool_plans p ON p.id = l.plan_id
+                WHERE l.plan_id = %(plan_id)s AND rt.id > %(last_id)s
+                ORDER BY rt.id
+                LIMIT %(limit)s
+            ), revived AS (
+                SELECT candidate.id
+                FROM (
+                    SELECT b.id, b.rent_listing_id,
+                           row_number() OVER (PARTITION BY b.rent_listing_id ORDER BY b.id) AS seat
+                    FROM batch b
+                    WHERE NOT b.is_active AND b.old_expiry <= %(now)s
+                      AND (b.new_expiry IS NULL OR b.new_expiry > %(now)s)
+                ) candidate
+                JOIN toolshub_tool_rent_listings l ON l.id = candidate.rent_listing_id
+                WHERE l.unlimited_users OR candidate.seat <= l.available_users
+            ), updated AS (
+                UPDATE toolshub_rented_tools rt
+                SET expiry_date = batch.new_expiry,
+                    is_active = rt.is_active OR revived.id IS NOT NULL,
+                    write_date = (now() at time zone 'UTC'),
+                    write_uid = %(uid)s
+                FROM batch
+                LEFT JOIN revived ON revived.id = batch.id
+                WHERE rt.id = batch.id AND rt.expiry_date IS DISTINCT FROM batch.new_expiry
+                RETURNING rt.id, rt.rent_listing_id, revived.id IS NOT NULL AS revived
+            )
+            SELECT (SELECT MAX(id) FROM batch), (SELECT COUNT(*) FROM batch), (SELECT COUNT(*) FROM updated),
+                   (SELECT array_agg(rent_listing_id) FROM updated WHERE revived)
+        """, {
+            'plan_id': self.plan_id.id, 'last_id': self.last_rental_id, 'limit': batch_size,
+            'uid': self.env.uid, 'now': fields.Datetime.now(),
+        })
+        last_id, processed, updated, revived_listing_ids = self.env.cr.fetchone()
+
+        if updated:
+            self.env['toolshub.rented.tools'].invalidate_model(['expiry_date', 'is_active', 'write_date', 'write_uid'])
+        if revived_listing_ids:
+            # The revived rentals take their seat back, within the seats left checked above
+            self.env['toolshub.tool.rent.listings']._apply_subscriber_deltas(Counter(revived_listing_ids))
+        if not processed:
+            self.write({'state': 'done', 'done_date': fields.Datetime.now()})
+            return 0
+        self.write({'last_rental_id': last_id, 'rentals_done': self.rentals_done + processed})
+        return processed
@@ -0,0 +1,53 @@
+import logging
+import threading
+import time
+
+from odoo import models
+from odoo.http import request
+
+from ..utils import metrics
+
+# One summary line per Toolshub request, silence it with --log-handler=odoo.addons.toolshub.requests:WARNING
+_request_logger = logging.getLogger('odoo.addons.toolshub.requests')
+
+
+class IrHttp(models.AbstractModel):
+    # Extending the dispatch to complete the Toolshub request metrics
+    _inherit = 'ir.http'
+
+    @classmethod
+    def _post_dispatch(cls, response):
+        super()._post_dispatch(response)
+        measures = getattr(request, 'toolshub_metrics', None)
+        if not measures:
+            return
+
+        # After super(), lazy pages are rendered and JSON answers serialized
+        thread = threading.current_thread()
+        total = time.perf_counter() - measures['started']
+        queries = getattr(thread, 'query_count', 0) - measures['queries_before']
+        sql_time = getattr(thread, 'query_time', 0.0) - measures['sql_time_before']
+        size = response.content_length
+        if size is None and not response.direct_passthrough:
+            size = len(response.get_data())
+        metrics.observe(measures['route'], {
+            'toolshub_request_duration_seconds': total,
+            'toolshub_handler_duration_seconds': measures['handler'],
+            'toolshub_sql_queries': queries,
+            'toolshub_sql_duration_seconds': sql_time,
+            'toolshub_rows_serialized': measures['rows'],
+            'toolshub_response_bytes': size or 0,
+        }, measures['status'])
+
+        _request_logger.info(
+            "%s %s status=%s uid=%s duration_ms=%.1f handler_ms=%.1f sql_queries=%s sql_ms=%.1f rows=%s bytes=%s",
+            request.httprequest.method, measures['route'], response.status_code, request.env.uid,
+            total * 1000, measures['handler'] * 1000, queries, sql_time * 1000, measures['rows'], size or 0,
+        )
+
+        if request.session.debug:
+            response.headers['Server-Timing'] = ", ".join([
+                f'sql;dur={sql_time * 1000:.1f};desc="{queries} queries"',
+                f"handler;dur={measures['handler'] * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ])
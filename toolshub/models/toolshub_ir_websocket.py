@@ -0,0 +1,15 @@
+from odoo import models
+
+from .toolshub_listing_catalog import MARKETPLACE_CHANNEL
+
+
+class IrWebsocket(models.AbstractModel):
+    # Extending the bus subscriptions
+    _inherit = 'ir.websocket'
+
+    def _build_bus_channel_list(self, channels):
+        # Only logged in users get the marketplace availability updates, whatever the client asked for
+        channels = [channel for channel in channels if channel != MARKETPLACE_CHANNEL]
+        if self.env.uid and not self.env.user._is_public():
+            channels.append(MARKETPLACE_CHANNEL)
+        return super()._build_bus_channel_list(channels)
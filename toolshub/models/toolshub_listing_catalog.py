@@ -0,0 +1,345 @@
+import logging
+import re
+
+from odoo import fields, models, api
+from odoo.tools import sql
+
+from ..utils.data_version import bump_version, create_sequences
+
+_logger = logging.getLogger(__name__)
+
+# Keys of a listing payload moved to the shared tool / plan / owner tables of normalized answers
+_TOOL_KEYS = {'tool_name': 'name', 'tool_img_url': 'image_url'}
+_PLAN_KEYS = {
+    'plan_name': 'name', 'plan_features': 'features', 'unlimited_access': 'unlimited_access',
+    'duration_years': 'duration_years', 'duration_months': 'duration_months', 'duration_days': 'duration_days',
+}
+_OWNER_KEYS = {'owner_name': 'name', 'owner_connect_account_id': 'connect_account_id'}
+
+# Bus channel every logged in marketplace user listens to, see ir.websocket
+MARKETPLACE_CHANNEL = 'toolshub_marketplace'
+
+# Text search configuration: no stemming, so prefixes typed so far match the words they start
+SEARCH_CONFIG = 'simple'
+# Most words of a search query used
+MAX_SEARCH_TERMS = 8
+# Delimiters of the matches in ts_headline output, split into segments by _highlight_segments
+_MATCH_START = '\x02'
+_MATCH_STOP = '\x03'
+
+# Columns copied from the listing and its tool, plan, features, owner and currency, in insert order
+_CATALOG_COLUMNS = [
+    'id', 'listing_id', 'tool_id', 'tool_name', 'tool_img_url',
+    'plan_id', 'plan_name', 'plan_features', 'unlimited_access',
+    'duration_years', 'duration_months', 'duration_days',
+    'is_active', 'price', 'currency_symbol',
+    'subscribers_count', 'unlimited_users', 'available_users',
+    'owner_id', 'owner_name', 'owner_connect_account_id',
+]
+
+
+class ToolshubListingCatalog(models.Model):
+    """
+    Denormalized read model of the marketplace: one flat row per rent listing, with the same id as the listing.
+    Rows are rebuilt with a single upsert by _refresh whenever a listing or something it displays changes,
+    so browsing the marketplace is one indexed scan of this table instead of a join over five models.
+    """
+    _name = "toolshub.listing.catalog"
+    _description = "Marketplace Listing Catalog"
+    _order = "id desc"
+    _log_access = False
+
+    # Fields
+    listing_id = fields.Many2one("toolshub.tool.rent.listings", string="Rent Listing", required=True, ondelete="cascade", readonly=True)
+    tool_id = fields.Many2one("toolshub.tools", string="Tool", readonly=True)
+    tool_name = fields.Char("Tool Name", readonly=True)
+    tool_img_url = fields.Char("Tool Image URL", readonly=True)
+    plan_id = fields.Many2one("toolshub.tool.plans", string="Plan", readonly=True)
+    plan_name = fields.Char("Plan Name", readonly=True)
+    plan_features = fields.Json("Plan Features", readonly=True)
+    unlimited_access = fields.Boolean("Unlimited Access", readonly=True)
+    duration_years = fields.Integer("Years", readonly=True)
+    duration_months = fields.Integer("Months", readonly=True)
+    duration_days = fields.Integer("Days", readonly=True)
+    is_active = fields.Boolean("Is Active", readonly=True)
+    price = fields.Float("Price Per User", readonly=True)
+    currency_symbol = fields.Char("Currency Symbol", readonly=True)
+    subscribers_count = fields.Integer("Total Subscribers", readonly=True)
+    unlimited_users = fields.Boolean("Unlimited Users", readonly=True)
+    available_users = fields.Integer("Available Users", readonly=True)
+    owner_id = fields.Many2one("res.users", string="Owner", readonly=True)
+    owner_name = fields.Char("Owner Name", readonly=True)
+    owner_connect_account_id = fields.Char("Owner Stripe Account", readonly=True)
+    # Last time the row was refreshed, delta sync returns the rows refreshed after the client's token
+    sync_date = fields.Datetime("Synced On", readonly=True)
+    # search_vector (tsvector) is not an ORM field: tool name (weight A), plan name (B) and feature names (C),
+    # written by _refresh and only read by _search_listings
+
+
+    # SQL Constraints
+    _sql_constraints = [
+        ('unique_listing_id', 'unique(listing_id)', 'A listing can only appear once in the catalog.'),
+    ]
+
+    def init(self):
+        create_sequences(self.env.cr)
+        if not sql.column_exists(self.env.cr, self._table, 'search_vector'):
+            sql.create_column(self.env.cr, self._table, 'search_vector', 'tsvector')
+        sql.create_index(self.env.cr, 'toolshub_listing_catalog_search_vector_idx', self._table,
+                         ['search_vector'], method='gin')
+
+        # Same access paths as the marketplace sorts and "my listings"
+        sql.create_index(self.env.cr, 'toolshub_listing_catalog_owner_id_idx', self._table, ['owner_id', 'id DESC'])
+        sql.create_index(self.env.cr, 'toolshub_listing_catalog_active_id_idx', self._table,
+                         ['id DESC'], where='is_active')
+        sql.create_index(self.env.cr, 'toolshub_listing_catalog_active_price_idx', self._table,
+                         ['price', 'id'], where='is_active')
+        sql.create_index(self.env.cr, 'toolshub_listing_catalog_active_seats_idx', self._table,
+                         ['available_users DESC', 'id DESC'], where='is_active')
+        sql.create_index(self.env.cr, 'toolshub_listing_catalog_active_popularity_idx', self._table,
+                         ['subscribers_count DESC', 'id DESC'], where='is_active')
+        sql.create_index(self.env.cr, 'toolshub_listing_catalog_tool_id_idx', self._table, ['tool_id'])
+        sql.create_index(self.env.cr, 'toolshub_listing_catalog_sync_date_idx', self._table, ['sync_date'])
+
+        # Full rebuild on install/update, also repairs any drift
+        self._refresh()
+
+
+    # Refresh
+    @api.model
+    def _refresh(self, listing_ids=None, cr=None):
+        """
+        Rebuild the catalog rows of listing_ids (every listing when None) with one upsert.
+        cr lets the seat allocation refresh its rows inside its own transaction.
+        """
+        if listing_ids is not None:
+            listing_ids = list(set(listing_ids))
+            if not listing_ids:
+                return
+        if cr is None:
+            self.env.flush_all()
+            cr = self.env.cr
+
+        where = "" if listing_ids is None else "WHERE l.id = ANY(%(ids)s)"
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in _CATALOG_COLUMNS if column != 'id')
+        cr.execute(f"""
+            INSERT INTO toolshub_listing_catalog ({", ".join(_CATALOG_COLUMNS)}, sync_date, search_vector)
+            SELECT l.id, l.id, l.tool_id, t.name, t.image_url,
+                   l.plan_id, p.name, COALESCE(pf.features, '[]'::jsonb),
+                   p.is_unlimited,
+                   p.duration_years, p.duration_months, p.duration_days,
+                   l.is_active, l.price::float, c.symbol,
+                   l.subscribers_count, l.unlimited_users, l.available_users,
+                   l.owner_id, op.name, o.stripe_connect_account_id,
+                   (now() at time zone 'UTC'),
+                   setweight(to_tsvector(%(config)s, COALESCE(t.name, '')), 'A')
+                   || setweight(to_tsvector(%(config)s, COALESCE(p.name, '')), 'B')
+                   || setweight(to_tsvector(%(config)s, COALESCE(pf.names, '')), 'C')
+            FROM toolshub_tool_rent_listings l
+            JOIN toolshub_tools t ON t.id = l.tool_id
+            JOIN toolshub_tool_plans p ON p.id = l.plan_id
+            JOIN res_users o ON o.id = l.owner_id
+            JOIN res_partner op ON op.id = o.partner_id
+            LEFT JOIN res_currency c ON c.id = l.currency_id
+            LEFT JOIN LATERAL (
+                SELECT jsonb_agg(jsonb_build_object('id', f.id, 'name', f.name) ORDER BY f.id) AS features,
+                       string_agg(f.name, ' ') AS names
+                FROM toolshub_tool_plan_features f
+                WHERE f.plan_id = l.plan_id
+            ) pf ON TRUE
+            {where}
+            ON CONFLICT (id) DO UPDATE SET {updates}, sync_date = EXCLUDED.sync_date,
+                                           search_vector = EXCLUDED.search_vector
+            RETURNING id, available_users, unlimited_users, is_active, subscribers_count
+        """, {'ids': listing_ids, 'config': SEARCH_CONFIG})
+        _logger.debug("Refreshed %s catalog rows", cr.rowcount)
+        rows = cr.fetchall()
+        bump_version(self.env(cr=cr), 'listings')
+        if listing_ids is not None:
+            self._publish_availability(rows, cr)
+
+        if cr is self.env.cr:
+            if listing_ids is None:
+                self.invalidate_model()
+            else:
+                self.browse(listing_ids).invalidate_recordset()
+
+    @api.model
+    def _refresh_counters(self, listing_ids, cr=None):
+        """
+        Copy only the seat counters of listing_ids, for the hot paths that only move subscribers:
+        renting a seat, expiring rentals and the counter deltas.
+        """
+        listing_ids = list(set(listing_ids))
+        if not listing_ids:
+            return
+        cr = cr or self.env.cr
+        cr.execute("""
+            UPDATE toolshub_listing_catalog cat
+            SET subscribers_count = l.subscribers_count,
+                available_users = l.available_users,
+                is_active = l.is_active,
+                sync_date = (now() at time zone 'UTC')
+            FROM toolshub_tool_rent_listings l
+            WHERE cat.id = l.id AND l.id = ANY(%s)
+            RETURNING cat.id, cat.available_users, cat.unlimited_users, cat.is_active, cat.subscribers_count
+        """, [listing_ids])
+        self._publish_availability(cr.fetchall(), cr)
+        bump_version(self.env(cr=cr), 'listings')
+        if cr is self.env.cr:
+            self.browse(listing_ids).invalidate_recordset(['subscribers_count', 'available_users', 'is_active', 'sync_date'])
+
+    @api.model
+    def _publish_availability(self, rows, cr):
+        """
+        Push the seat counters of the refreshed rows to the marketplace, in one bus message.
+        Sent on commit of cr, so a rolled back rental never shows up on the cards.
+        """
+        if not rows:
+            return
+        self.env(cr=cr)['bus.bus'].sudo()._sendone(MARKETPLACE_CHANNEL, 'toolshub/availability', {
+            'listings': [{
+                'id': listing_id,
+                'available_users': available_users if not unlimited_users else None,
+                'is_active': bool(is_active),
+                'subscribers_count': subscribers_count or 0,
+            } for listing_id, available_users, unlimited_users, is_active, subscribers_count in rows],
+        })
+
+    @api.model
+    def _refresh_where(self, column, ids):
+        """Refresh the listings whose column (tool_id, plan_id, owner_id or currency_id) is in ids"""
+        if not ids:
+            return
+        self.env.flush_all()
+        self.env.cr.execute(
+            f"SELECT id FROM toolshub_tool_rent_listings WHERE {column} = ANY(%s)", [list(ids)]
+        )
+        self._refresh([listing_id for (listing_id,) in self.env.cr.fetchall()])
+
+
+    # Search
+    @api.model
+    def _search_listings(self, text, user, limit):
+        """
+        Full text search of the listings user can see, on tool name, plan name and feature names.
+        Every word of text matches as a prefix, so partial words typed so far already match.
+        Returns up to limit dicts {'id', 'rank', 'highlights'}, best ranked first, where highlights
+        holds the tool name, plan name and matching features split into {'text', 'match'} segments.
+        Every match found by the GIN index is ranked, headlines are only built for the returned rows.
+        """
+        terms = re.findall(r'[^\W_]+', text or '')[:MAX_SEARCH_TERMS]
+        if not terms:
+            return []
+        self.env.flush_all()
+        self.env.cr.execute("""
+            WITH query AS (
+                SELECT to_tsquery(%(config)s, %(tsquery)s) AS q
+            ), ranked AS (
+                SELECT cat.id, ts_rank_cd(cat.search_vector, query.q) AS rank
+                FROM toolshub_listing_catalog cat, query
+                WHERE cat.search_vector @@ query.q
+                  AND (cat.owner_id = %(uid)s
+                       OR (cat.is_active AND (cat.unlimited_users OR cat.available_users > 0)))
+                ORDER BY rank DESC, cat.id DESC
+                LIMIT %(limit)s
+            )
+            SELECT ranked.id, ranked.rank,
+                   ts_headline(%(config)s, COALESCE(cat.tool_name, ''), query.q, %(options)s),
+                   ts_headline(%(config)s, COALESCE(cat.plan_name, ''), query.q, %(options)s),
+                   ARRAY(
+                       SELECT ts_headline(%(config)s, feature->>'name', query.q, %(options)s)
+                       FROM jsonb_array_elements(cat.plan_features) feature
+                       WHERE to_tsvector(%(config)s, feature->>'name') @@ query.q
+                   )
+            FROM ranked
+            JOIN toolshub_listing_catalog cat ON cat.id = ranked.id, query
+            ORDER BY ranked.rank DESC, ranked.id DESC
+        """, {
+            'config': SEARCH_CONFIG,
+            'tsquery': " & ".join(f"{term.lower()}:*" for term in terms),
+            'uid': user.id,
+            'limit': limit,
+            'options': f"StartSel={_MATCH_START}, StopSel={_MATCH_STOP}, HighlightAll=true",
+        })
+        return [{
+            'id': listing_id,
+            'rank': rank,
+            'highlights': {
+                'tool_name': _highlight_segments(tool_name),
+                'plan_name': _highlight_segments(plan_name),
+                'features': [_highlight_segments(feature) for feature in features],
+            },
+        } for listing_id, rank, tool_name, plan_name, features in self.env.cr.fetchall()]
+
+
+    # Serialization
+    def _get_listing_payloads(self):
+        """API dicts of the catalog rows in self, in the order of self, read with a single query"""
+        if not self:
+            return []
+        self.env.cr.execute(f"""
+            SELECT {", ".join(_CATALOG_COLUMNS)}
+            FROM toolshub_listing_catalog
+            WHERE id = ANY(%s)
+        """, [list(self.ids)])
+
+        payloads = {}
+        for (listing_id, __, tool_id, tool_name, tool_img_url,
+             plan_id, plan_name, plan_features, unlimited_access,
+             duration_years, duration_months, duration_days,
+             is_active, price, currency_symbol,
+             subscribers_count, unlimited_users, available_users,
+             owner_id, owner_name, owner_connect_account_id) in self.env.cr.fetchall():
+            payloads[listing_id] = {
+                'id': listing_id,
+                'tool_id': tool_id,
+                'tool_name': tool_name or '',
+                'tool_img_url': tool_img_url,
+                'plan_id': plan_id,
+                'plan_name': plan_name or '',
+                'plan_features': plan_features or [],
+                'unlimited_access': bool(unlimited_access),
+                'duration_years': duration_years or 0,
+                'duration_months': duration_months or 0,
+                'duration_days': duration_days or 0,
+                'is_active': bool(is_active),
+                'price': price or 0.0,
+                'currency_symbol': currency_symbol or '$',
+                'subscribers_count': subscribers_count or 0,
+                'unlimited_users': bool(unlimited_users),
+                'available_users': (available_users or 0) if not unlimited_users else None,
+                'owner_id': owner_id,
+                'owner_name': owner_name or '',
+                'owner_connect_account_id': owner_connect_account_id or False,
+            }
+        return [payloads[listing_id] for listing_id in self.ids if listing_id in payloads]
+
+    @api.model
+    def _normalize_payloads(self, payloads):
+        """
+        Split listing payloads into compact listings that reference tool_id, plan_id and owner_id,
+        and the tables of the tools, plans and owners they use, each sent once.
+        Returns (listings, {'tools': {...}, 'plans': {...}, 'owners': {...}}), tables keyed by id.
+        """
+        tables = {'tools': {}, 'plans': {}, 'owners': {}}
+        listings = []
+        for payload in payloads:
+            listing = dict(payload)
+            for table, id_key, keys in (('tools', 'tool_id', _TOOL_KEYS),
+                                        ('plans', 'plan_id', _PLAN_KEYS),
+                                        ('owners', 'owner_id', _OWNER_KEYS)):
+                entry = {name: listing.pop(key) for key, name in keys.items()}
+                tables[table].setdefault(listing[id_key], dict(entry, id=listing[id_key]))
+            listings.append(listing)
+        return listings, tables
+
+
+def _highlight_segments(headline):
+    """Split ts_headline output into [{'text', 'match'}] segments, so the client never renders markup"""
+    segments = []
+    for index, text in enumerate(re.split(f'{_MATCH_START}|{_MATCH_STOP}', headline or '')):
+        if text:
+            # Odd parts sit between a start and a stop delimiter
+            segments.append({'text': text, 'match': index % 2 == 1})
+    return segments
@@ -0,0 +1,100 @@
+import logging
+from datetime import timedelta
+
+from odoo import fields, models, api
+from odoo.tools import sql
+
+_logger = logging.getLogger(__name__)
+
+# Sending limits, overridable with the toolshub_mail_rate_per_minute / toolshub_mail_max_attempts parameters
+DEFAULT_RATE_PER_MINUTE = 120
+DEFAULT_MAX_ATTEMPTS = 5
+# First retry after 1 minute, then 2, 4, 8... capped at 1 hour
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+
+class MailMail(models.Model):
+    _inherit = "mail.mail"
+
+    # Fields
+    toolshub_queued = fields.Boolean("Toolshub Queue", default=False, readonly=True,
+                                      help="Sent by the Toolshub mail queue cron instead of the standard mail scheduler")
+    toolshub_attempts = fields.Integer("Send Attempts", default=0, readonly=True)
+
+    def init(self):
+        # The queue cron only looks for toolshub mails waiting to be sent
+        sql.create_index(self.env.cr, 'mail_mail_toolshub_queue_idx', self._table,
+                         ['scheduled_date', 'id'], where="toolshub_queued AND state = 'outgoing'")
+
+    @api.model
+    def _toolshub_enqueue(self, values):
+        """
+        Queue a mail for the Toolshub mail cron instead of sending it inside the request.
+        The cron is triggered right away unless it already ran during the last minute,
+        in which case it runs when the rate limit window is over.
+        """
+        mail = self.sudo().create(dict(values, toolshub_queued=True, auto_delete=True))
+        cron = self.env.ref('toolshub.ir_cron_send_toolshub_mail').sudo()
+        now = fields.Datetime.now()
+        cron._trigger(max(now, (cron.lastcall or now) + timedelta(minutes=1)))
+        return mail
+
+    @api.model
+    def process_email_queue(self, *args, **kwargs):
+        # Toolshub mails are rate limited, keep the standard scheduler away from them
+        if not self.env.context.get('toolshub_mail_queue'):
+            filters = list(self.env.context.get('filters') or []) + [('toolshub_queued', '=', False)]
+            self = self.with_context(filters=filters)
+        return super().process_email_queue(*args, **kwargs)
+
+    @api.model
+    def _cron_send_toolshub_queue(self):
+        """
+        Send at most toolshub_mail_rate_per_minute queued mails. process_email_queue sends them grouped by
+        mail server over a single SMTP connection per group. Failed mails are put back in the queue with
+        an exponential backoff until they reach the maximum number of attempts.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        rate = int(ICP.get_param('toolshub_mail_rate_per_minute', DEFAULT_RATE_PER_MINUTE))
+        max_attempts = int(ICP.get_param('toolshub_mail_max_attempts', DEFAULT_MAX_ATTEMPTS))
+        now = fields.Datetime.now()
+
+        due_domain = [
+            ('toolshub_queued', '=', True),
+            ('state', '=', 'outgoing'),
+            '|', ('scheduled_date', '=', False), ('scheduled_date', '<=', now),
+        ]
+        batch = self.search(due_domain, order='id', limit=rate)
+        if batch:
+            # Count the attempt before sending, the sent mails are deleted by auto_delete
+            self.env.cr.execute("""
+                UPDATE mail_mail SET toolshub_attempts = toolshub_attempts + 1 WHERE id IN %s
+            """, [tuple(batch.ids)])
+            batch.invalidate_recordset(['toolshub_attempts'])
+            self.with_context(toolshub_mail_queue=True, filters=[('toolshub_queued', '=', True)]) \
+                .process_email_queue(batch.ids, batch_size=rate)
+
+        retried = self._toolshub_schedule_retries(max_attempts)
+
+        remaining = self.search_count(due_domain)
+        _logger.info("Sent %s queued Toolshub mails, %s retries scheduled, %s remaining", len(batch), retried, remaining)
+        self.env['ir.cron']._notify_progress(done=len(batch), remaining=remaining)
+        if remaining:
+            # Rate limit: the next batch goes out in the next window
+            self.env.ref('toolshub.ir_cron_send_toolshub_mail')._trigger(now + timedelta(minutes=1))
+        return len(batch)
+
+    @api.model
+    def _toolshub_schedule_retries(self, max_attempts):
+        """Put failed queued mails back in the queue with exponential backoff, returns the number rescheduled"""
+        failed = self.search([
+            ('toolshub_queued', '=', True),
+            ('state', '=', 'exception'),
+            ('toolshub_attempts', '<', max_attempts),
+        ])
+        now = fields.Datetime.now()
+        for mail in failed:
+            delay = min(RETRY_BASE_DELAY * (2 ** max(mail.toolshub_attempts - 1, 0)), RETRY_MAX_DELAY)
+            mail.write({'state': 'outgoing', 'scheduled_date': now + delay})
+        return len(failed)
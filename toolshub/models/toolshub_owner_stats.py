@@ -0,0 +1,142 @@
+import logging
+from datetime import datetime, time, timedelta
+
+from odoo import fields, models, api
+from odoo.tools import sql
+
+from .toolshub_rented_tools import PLATFORM_FEE_PERCENT
+
+_logger = logging.getLogger(__name__)
+
+# Last complete day (UTC) rolled up, the days after it are rolled again on every run
+ROLLED_UNTIL_PARAM = 'toolshub_owner_stats_rolled_until'
+
+
+class ToolshubOwnerStatsDaily(models.Model):
+    """
+    Daily rollup of the rentals of each listing and currency, for the owners' dashboard.
+    Filled incrementally by _cron_rollup, so the dashboard reads a few rows per listing and day
+    whatever the size of the rental history.
+    """
+    _name = "toolshub.owner.stats.daily"
+    _description = "Owner Daily Rental Statistics"
+    _order = "date desc, listing_id"
+    _log_access = False
+
+    # Fields
+    date = fields.Date("Date", required=True, readonly=True)
+    owner_id = fields.Many2one("res.users", string="Owner", required=True, ondelete="cascade", readonly=True)
+    listing_id = fields.Many2one("toolshub.tool.rent.listings", string="Rent Listing", required=True, ondelete="cascade", readonly=True)
+    tool_id = fields.Many2one("toolshub.tools", string="Tool", readonly=True)
+    plan_id = fields.Many2one("toolshub.tool.plans", string="Plan", readonly=True)
+    currency_id = fields.Many2one("res.currency", string="Currency", readonly=True)
+    new_rentals = fields.Integer("New Rentals", readonly=True)
+    # Seats still rented at the end of the day
+    active_seats = fields.Integer("Active Seats", readonly=True)
+    expired_seats = fields.Integer("Expired Seats", readonly=True)
+    gross_revenue = fields.Monetary("Gross Revenue", currency_field="currency_id", readonly=True)
+    platform_fee = fields.Monetary("Platform Fee", currency_field="currency_id", readonly=True)
+
+
+    # SQL Constraints
+    _sql_constraints = [
+        ('unique_date_listing', 'unique(date, listing_id, currency_id)', 'A listing can only have one rollup per day and currency.'),
+    ]
+
+    def init(self):
+        # The dashboard reads the rollups of one owner over a date range
+        sql.create_index(self.env.cr, 'toolshub_owner_stats_daily_owner_date_idx', self._table, ['owner_id', 'date'])
+
+
+    # Rollup
+    @api.model
+    def _cron_rollup(self, max_days=31):
+        """
+        Roll up the days since the last complete day rolled, oldest first, one committed day at a time.
+        The last complete day is rolled again to pick up the rentals committed after its last run,
+        and today is rolled on every run so the dashboard follows the day's rentals.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        today = self.env.cr.now().date()
+        rolled_until = ICP.get_param(ROLLED_UNTIL_PARAM)
+        if rolled_until:
+            start = fields.Date.to_date(rolled_until)
+        else:
+            self.env.cr.execute("SELECT MIN(rented_date) FROM toolshub_rented_tools")
+            first_rental = self.env.cr.fetchone()[0]
+            start = first_rental.date() if first_rental else today
+
+        days = [start + timedelta(days=offset) for offset in range((today - start).days + 1)]
+        for day in days[:max_days]:
+            self._rollup_day(day)
+            if day < today:
+                ICP.set_param(ROLLED_UNTIL_PARAM, fields.Date.to_string(day))
+            # Keep the progress of this day
+            self.env.cr.commit()
+
+        remaining = max(len(days) - max_days, 0)
+        _logger.info("Rolled up %s days of owner stats, %s remaining", min(len(days), max_days), remaining)
+        self.env['ir.cron']._notify_progress(done=min(len(days), max_days), remaining=remaining)
+        return remaining
+
+    @api.model
+    def _rollup_reset(self):
+        """Drop every rollup, the next runs of the cron rebuild them from the first rental"""
+        self.env.cr.execute("DELETE FROM toolshub_owner_stats_daily")
+        self.env['ir.config_parameter'].sudo().set_param(ROLLED_UNTIL_PARAM, False)
+        self.invalidate_model()
+        self.env.ref('toolshub.ir_cron_rollup_owner_stats')._trigger()
+
+    @api.model
+    def _rollup_day(self, day):
+        """
+        Replace the rollups of day (UTC) from the rentals rented or expired that day only, both read through
+        their date index: the active seats are those of the previous day's rollups moved by the day's deltas.
+        Today is only counted until now, rentals expiring later today are still active.
+        Rentals deleted or deactivated by hand before their expiry are not deducted, _rollup_reset rebuilds
+        the history when that matters.
+        """
+        self.env.flush_all()
+        day_start = datetime.combine(day, time.min)
+        day_end = day_start + timedelta(days=1)
+        until = min(day_end, self.env.cr.now())
+
+        self.env.cr.execute("DELETE FROM toolshub_owner_stats_daily WHERE date = %s", [day])
+        self.env.cr.execute("""
+            WITH moves AS (
+                -- Rentals of the day, still active at its end unless they already expired
+                SELECT rt.rent_listing_id AS listing_id, COALESCE(rt.currency_id, l.currency_id) AS currency_id,
+                       1 AS new_rentals,
+                       CASE WHEN rt.expiry_date >= %(until)s OR (rt.expiry_date IS NULL AND rt.is_active)
+                            THEN 1 ELSE 0 END AS seats,
+                       CASE WHEN rt.expiry_date < %(until)s THEN 1 ELSE 0 END AS expired,
+                       rt.price AS gross
+                FROM toolshub_rented_tools rt
+                JOIN toolshub_tool_rent_listings l ON l.id = rt.rent_listing_id
+                WHERE rt.rented_date >= %(start)s AND rt.rented_date < %(end)s
+                UNION ALL
+                -- Earlier rentals expired during the day
+                SELECT rt.rent_listing_id, COALESCE(rt.currency_id, l.currency_id), 0, -1, 1, NULL
+                FROM toolshub_rented_tools rt
+                JOIN toolshub_tool_rent_listings l ON l.id = rt.rent_listing_id
+                WHERE rt.expiry_date >= %(start)s AND rt.expiry_date < %(until)s AND rt.rented_date < %(start)s
+                UNION ALL
+                -- Seats still rented at the end of the previous day
+                SELECT listing_id, currency_id, 0, active_seats, 0, NULL
+                FROM toolshub_owner_stats_daily
+                WHERE date = %(previous)s AND active_seats > 0
+            )
+            INSERT INTO toolshub_owner_stats_daily (date, owner_id, listing_id, tool_id, plan_id, currency_id,
+                                                    new_rentals, active_seats, expired_seats, gross_revenue, platform_fee)
+            SELECT %(day)s, l.owner_id, l.id, l.tool_id, l.plan_id, m.currency_id,
+                   SUM(m.new_rentals), GREATEST(SUM(m.seats), 0), SUM(m.expired),
+                   COALESCE(SUM(m.gross), 0),
+                   COALESCE(SUM(floor(round(m.gross * 100) * %(fee_percent)s / 100) / 100), 0)
+            FROM moves m
+            JOIN toolshub_tool_rent_listings l ON l.id = m.listing_id
+            GROUP BY l.owner_id, l.id, l.tool_id, l.plan_id, m.currency_id
+        """, {
+            'day': day, 'previous': day - timedelta(days=1), 'start': day_start, 'end': day_end, 'until': until,
+            'fee_percent': PLATFORM_FEE_PERCENT,
+        })
+        self.invalidate_model()
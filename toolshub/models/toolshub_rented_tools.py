@@ -1,5 +1,55 @@
+import logging
+from collections import Counter
+
 from odoo import fields, models, api
-from datetime import datetime, timedelta
+from odoo.tools import sql
+from datetime import timedelta
+
+_logger = logging.getLogger(__name__)
+
+# Share of each rental kept by the platform as the Stripe application fee, the rest goes to the owner
+PLATFORM_FEE_PERCENT = 5
+
+
+def platform_fee_cents(amount_cents):
+    """Platform fee of a payment of amount_cents, rounded down to the cent like the Stripe application fee"""
+    return int(amount_cents * PLATFORM_FEE_PERCENT / 100)
+
+
+def format_remaining_usage(is_unlimited, expiry_date, now):
+    """Human readable time left on a rental, shared by the compute and the API serializer"""
+    # If unlimited access
+    if is_unlimited:
+        return "Unlimited Access"
+
+    # If no expiry date, can't calculate
+    if not expiry_date:
+        return "N/A"
+
+    # If already expired
+    if now >= expiry_date:
+        return "Expired"
+
+    # Calculate difference
+    days = (expiry_date - now).days
+    remaining_usage = ""
+
+    # Format remaining time
+    if days >= 365:
+        years = days // 365
+        days = days % 365
+        remaining_usage += f"{years} year(s) "
+
+    if days >= 30:
+        months = days // 30
+        days = days % 30
+        remaining_usage += f"{months} month(s) "
+
+    if days > 0:
+        remaining_usage += f"{days} day(s)"
+
+    return remaining_usage
+
 
 class ToolshubRentedTools(models.Model):
     _name = "toolshub.rented.tools"
@@ -8,10 +58,15 @@ class ToolshubRentedTools(models.Model):
     # Fields
     rent_listing_id = fields.Many2one("toolshub.tool.rent.listings", string="Rent Listing", readonly=True, required=True)
     lender_id = fields.Many2one("res.users", string="Lender", required=True, ondelete="cascade", readonly=True)
-    is_active = fields.Boolean("Is Active", compute="_compute_is_active", store=True, default=True)
+    # Flipped to False by the expiry cron once expiry_date has passed
+    is_active = fields.Boolean("Is Active", default=True, readonly=True)
     
     login = fields.Char("Login")
     password = fields.Char("Password")
+    stripe_session_id = fields.Char("Stripe Checkout Session", readonly=True, copy=False)
+    # Price of the listing when it was rented, later price changes do not alter past earnings
+    currency_id = fields.Many2one(string="Currency", comodel_name="res.currency", readonly=True)
+    price = fields.Monetary(string="Price Paid", currency_field="currency_id", readonly=True)
 
     rented_date = fields.Datetime(
         string="Rented Date",
@@ -36,101 +91,195 @@ class ToolshubRentedTools(models.Model):
     )
 
 
+    # SQL Constraints
+    _sql_constraints = [
+        ('unique_stripe_session_id', 'unique(stripe_session_id)', 'A checkout session can only create one rental.'),
+    ]
+
+    def init(self):
+        # "Rented by me" and "Rented out" list rentals newest first per lender / per listing
+        sql.create_index(self.env.cr, 'toolshub_rented_tools_lender_id_idx', self._table, ['lender_id', 'id DESC'])
+        sql.create_index(self.env.cr, 'toolshub_rented_tools_rent_listing_id_idx', self._table, ['rent_listing_id', 'id DESC'])
+        # Only rentals that can still expire are looked up by expiry date
+        sql.create_index(self.env.cr, 'toolshub_rented_tools_active_expiry_idx', self._table,
+                         ['expiry_date'], where='is_active AND expiry_date IS NOT NULL')
+        # Owner stats rollups walk the rentals rented and expired during the day, active or not
+        sql.create_index(self.env.cr, 'toolshub_rented_tools_rented_date_idx', self._table, ['rented_date'])
+        sql.create_index(self.env.cr, 'toolshub_rented_tools_expiry_date_idx', self._table,
+                         ['expiry_date'], where='expiry_date IS NOT NULL')
+
+        # Rentals made before the price snapshot existed take the current price of their listing
+        self.env.cr.execute("""
+            UPDATE toolshub_rented_tools rt
+            SET price = l.price, currency_id = l.currency_id
+            FROM toolshub_tool_rent_listings l
+            WHERE l.id = rt.rent_listing_id AND rt.price IS NULL
+        """)
+
+
     # Compute expiry date based on listing duration
-    @api.depends('rent_listing_id', 'rent_listing_id.plan_id.is_unlimited', 
-                 'rent_listing_id.plan_id.duration_years', 
-                 'rent_listing_id.plan_id.duration_months', 
-                 'rent_listing_id.plan_id.duration_days',
-                 'rented_date')
+    # Changes of the plan durations are not dependencies on purpose: they can touch every rental of a
+    # popular plan, so the plan schedules a toolshub.expiry.recompute job instead
+    @api.depends('rent_listing_id', 'rent_listing_id.plan_id', 'rented_date')
     def _compute_expiry_date(self):
         for record in self:
-            plan = record.rent_listing_id.plan_id
-            
-            # If unlimited access, no expiry date
-            if plan.is_unlimited:
-                record.expiry_date = False
-                continue
-            
-            # Calculate expiry date from rented_date + duration
-            rented_dt = record.rented_date or fields.Datetime.now()
-            
-            years = plan.duration_years or 0
-            months = plan.duration_months or 0
-            days = plan.duration_days or 0
-            
-            # Calculate total days (approximate: 1 year = 365 days, 1 month = 30 days)
-            total_days = (years * 365) + (months * 30) + days
-            
+            # total_duration_days is 0 for unlimited access, no expiry date
+            total_days = record.rent_listing_id.plan_id.total_duration_days
+
             if total_days > 0:
+                # Calculate expiry date from rented_date + duration
+                rented_dt = record.rented_date or fields.Datetime.now()
                 record.expiry_date = rented_dt + timedelta(days=total_days)
+            else:
+                record.expiry_date = False
     
     # Compute remaining usage
     @api.depends('rent_listing_id', 'rent_listing_id.plan_id.is_unlimited', 
                  'expiry_date', 'rented_date')
     def _compute_remaining_usage(self):
+        now = fields.Datetime.now()
         for record in self:
-            
-            plan = record.rent_listing_id.plan_id
-            
-            # If unlimited access, return -1
-            if plan.is_unlimited:
-                record.remaining_usage = "Unlimited Access"
-                continue
-            
-            # If no expiry date, can't calculate
-            if not record.expiry_date:
-                record.remaining_usage = "N/A"
-                continue
-            
-            # Calculate remaining time
-            now = fields.Datetime.now()
-            
-            # If already expired
-            if now >= record.expiry_date:
-                record.remaining_usage = "Expired"
-                continue
-            
-            # Calculate difference
-            delta = record.expiry_date - now
-            
-            days = delta.days
-            record.remaining_usage = ""
-            
-            usage_string = ""
-            # Format remaining time
-            if days >= 365:
-                years = days // 365
-                days = days % 365
-                record.remaining_usage += f"{years} year(s) "
-
-            if days >= 30:
-                months = days // 30
-                days = days % 30
-                record.remaining_usage += f"{months} month(s) "
-                
-            if days > 0:
-                record.remaining_usage += f"{days} day(s)"
+            record.remaining_usage = format_remaining_usage(
+                record.rent_listing_id.plan_id.is_unlimited, record.expiry_date, now
+            )
 
     
-    # Compute is_active based on expiry
-    @api.depends('rent_listing_id', 'rent_listing_id.plan_id.is_unlimited', 
-                 'expiry_date')
-    def _compute_is_active(self):
-        for record in self:
-            
-            plan = record.rent_listing_id.plan_id
-            
-            # If unlimited access, always active (unless payment failed)
-            if plan.is_unlimited:
-                record.is_active = True
-                continue
-            
-            # If no expiry date, can't determine
-            if not record.expiry_date:
-                record.is_active = True
-                continue
-            
-            # Active if current time is before expiry
-            now = fields.Datetime.now()
-            record.is_active = now < record.expiry_date
+    # Subscriber counters of the listings follow the active rentals
+    @api.model_create_multi
+    def create(self, vals_list):
+        listing_ids = {vals['rent_listing_id'] for vals in vals_list if 'price' not in vals and vals.get('rent_listing_id')}
+        listings = self.env['toolshub.tool.rent.listings'].sudo().browse(listing_ids)
+        prices = {listing.id: (listing.price, listing.currency_id.id) for listing in listings}
+        for vals in vals_list:
+            if 'price' not in vals and vals.get('rent_listing_id'):
+                vals['price'], vals['currency_id'] = prices[vals['rent_listing_id']]
+        rentals = super().create(vals_list)
+        if not self.env.context.get('toolshub_seat_taken'):
+            rentals.filtered('is_active')._shift_listing_subscribers(1)
+        return rentals
+
+    def write(self, vals):
+        if 'is_active' not in vals:
+            return super().write(vals)
+        changed = self.filtered(lambda rental: rental.is_active != bool(vals['is_active']))
+        res = super().write(vals)
+        changed._shift_listing_subscribers(1 if vals['is_active'] else -1)
+        return res
+
+    def unlink(self):
+        deltas = Counter(rental.rent_listing_id.id for rental in self if rental.is_active)
+        # Only the lender and the owner of the listing have the rental in their lists
+        self.env['toolshub.sync.tombstone']._record(self._name, self.ids, audience={
+            rental.id: [rental.lender_id.id, rental.rent_listing_id.owner_id.id] for rental in self
+        })
+        res = super().unlink()
+        self.env['toolshub.tool.rent.listings']._apply_subscriber_deltas(
+            {listing_id: -seats for listing_id, seats in deltas.items()}
+        )
+        return res
+
+    def _shift_listing_subscribers(self, sign):
+        deltas = Counter()
+        for rental in self:
+            deltas[rental.rent_listing_id.id] += sign
+        self.env['toolshub.tool.rent.listings']._apply_subscriber_deltas(deltas)
+
+
+    # Expiry
+    @api.model
+    def _cron_expire_rentals(self, batch_size=1000, max_batches=50):
+        """
+        Deactivate the rentals whose expiry date has passed and free their seat on the listing.
+        Works in committed batches so row locks are short and an interrupted run resumes where it stopped.
+        """
+        now = fields.Datetime.now()
+        done = 0
+        for __ in range(max_batches):
+            expired_count = self._expire_batch(now, batch_size)
+            if not expired_count:
+                break
+            done += expired_count
+            # Release the locks of this batch and keep its progress
+            self.env.cr.commit()
+
+        remaining = self.search_count([
+            ('is_active', '=', True), ('expiry_date', '!=', False), ('expiry_date', '<=', now),
+        ])
+        _logger.info("Expired %s rented tools, %s remaining", done, remaining)
+        self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
+        return done
+
+    @api.model
+    def _expire_batch(self, now, batch_size):
+        """Deactivate one batch of expired rentals in SQL, returns the number of rentals expired"""
+        self.env.flush_all()
+
+        # Rows locked by a concurrent transaction are skipped and picked up by the next batch
+        self.env.cr.execute("""
+            WITH expired AS (
+                SELECT id
+                FROM toolshub_rented_tools
+                WHERE is_active AND expiry_date IS NOT NULL AND expiry_date <= %(now)s
+                ORDER BY expiry_date
+                LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE toolshub_rented_tools rt
+            SET is_active = FALSE, write_date = %(now)s, write_uid = %(uid)s
+            FROM expired
+            WHERE rt.id = expired.id
+            RETURNING rt.rent_listing_id
+        """, {'now': now, 'limit': batch_size, 'uid': self.env.uid})
+        freed = Counter(listing_id for (listing_id,) in self.env.cr.fetchall())
+        if not freed:
+            return 0
+
+        # Give the seats back to their listings
+        self.env['toolshub.tool.rent.listings']._apply_subscriber_deltas(
+            {listing_id: -seats for listing_id, seats in freed.items()}
+        )
+        self.invalidate_model(['is_active', 'write_date', 'write_uid'])
+        return sum(freed.values())
+
+
+    # Serialization
+    def _get_rented_tool_payloads(self):
+        """
+        Build the API dict of every rented tool in self, with its listing payload,
+        using a constant number of queries. Returns the dicts in the order of self.
+        """
+        if not self:
+            return []
+        self.env.flush_all()
+
+        self.env.cr.execute("""
+            SELECT rt.id, rt.rent_listing_id, rt.lender_id, lp.name,
+                   rt.is_active, rt.login, rt.password, rt.expiry_date, p.is_unlimited
+            FROM toolshub_rented_tools rt
+            JOIN toolshub_tool_rent_listings l ON l.id = rt.rent_listing_id
+            JOIN toolshub_tool_plans p ON p.id = l.plan_id
+            JOIN res_users lu ON lu.id = rt.lender_id
+            JOIN res_partner lp ON lp.id = lu.partner_id
+            WHERE rt.id = ANY(%s)
+        """, [list(self.ids)])
+        rows = self.env.cr.fetchall()
+
+        listing_ids = list(dict.fromkeys(row[1] for row in rows))
+        listings = self.env['toolshub.tool.rent.listings'].browse(listing_ids)
+        listing_payloads = {payload['id']: payload for payload in listings._get_listing_payloads()}
 
+        now = fields.Datetime.now()
+        payloads = {}
+        for (rented_tool_id, listing_id, lender_id, lender_name,
+             is_active, login, password, expiry_date, is_unlimited) in rows:
+            payloads[rented_tool_id] = {
+                'id': rented_tool_id,
+                'remaining_usage': format_remaining_usage(is_unlimited, expiry_date, now),
+                'listing': listing_payloads.get(listing_id),
+                'lender_id': lender_id,
+                'lender_name': lender_name or '',
+                'is_active': bool(is_active),
+                'login': login or False,
+                'password': password or False,
+            }
+        return [payloads[rented_tool_id] for rented_tool_id in self.ids if rented_tool_id in payloads]
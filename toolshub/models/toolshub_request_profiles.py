@@ -0,0 +1,38 @@
+import logging
+from datetime import timedelta
+
+from odoo import fields, models, api
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 7
+
+
+class ToolshubRequestProfile(models.Model):
+    """Profile of one Toolshub request, see utils/profiling.py"""
+    _name = "toolshub.request.profile"
+    _description = "Toolshub Request Profile"
+    _order = "id desc"
+
+    # Fields
+    route = fields.Char("Route", required=True, readonly=True)
+    user_id = fields.Many2one("res.users", string="User", ondelete="cascade", readonly=True)
+    duration = fields.Float("Duration (ms)", readonly=True)
+    query_count = fields.Integer("SQL Queries", readonly=True)
+    sql_duration = fields.Float("SQL Time (ms)", readonly=True)
+    # cProfile stats, open with python -m pstats or snakeviz
+    pstats = fields.Binary("cProfile Stats", attachment=True, readonly=True)
+    pstats_filename = fields.Char("cProfile Stats Filename", readonly=True)
+    # Sampled stacks in the collapsed format, open with speedscope or flamegraph.pl
+    flamegraph = fields.Binary("Collapsed Stacks", attachment=True, readonly=True)
+    flamegraph_filename = fields.Char("Collapsed Stacks Filename", readonly=True)
+    sql_log = fields.Text("SQL Log", readonly=True)
+
+    @api.model
+    def _cron_purge_profiles(self):
+        """Delete the profiles older than toolshub_profile_retention_days"""
+        days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'toolshub_profile_retention_days', DEFAULT_RETENTION_DAYS))
+        old_profiles = self.search([('create_date', '<', fields.Datetime.now() - timedelta(days=days))])
+        old_profiles.unlink()
+        _logger.info("Purged %s request profiles", len(old_profiles))
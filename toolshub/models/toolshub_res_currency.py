@@ -0,0 +1,15 @@
+from odoo import models
+
+from ..utils.data_version import bump_version
+
+class ResCurrency(models.Model):
+    # Extending Currencies Table
+    _inherit = 'res.currency'
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Currency symbols are copied into the marketplace catalog
+        if 'symbol' in vals:
+            bump_version(self.env, 'tools')
+            self.env['toolshub.listing.catalog']._refresh_where('currency_id', self.ids)
+        return res
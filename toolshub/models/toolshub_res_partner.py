@@ -0,0 +1,13 @@
+from odoo import models
+
+class ResPartner(models.Model):
+    # Extending Partners Table
+    _inherit = 'res.partner'
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Owner names in the marketplace catalog are their partner's name
+        if 'name' in vals:
+            owners = self.env['res.users'].sudo().with_context(active_test=False).search([('partner_id', 'in', self.ids)])
+            self.env['toolshub.listing.catalog']._refresh_where('owner_id', owners.ids)
+        return res
@@ -4,4 +4,15 @@ class ResUsers(models.Model):
     # Extending Users Table
     _inherit = 'res.users'
 
-    stripe_connect_account_id = fields.Char("Stripe Connect Account ID")
+    stripe_connect_account_id = fields.Char("Stripe Connect Account ID", index=True)
+    # Updated from Stripe account.updated webhooks
+    stripe_charges_enabled = fields.Boolean("Stripe Charges Enabled", readonly=True)
+    # Every Toolshub request of the user is profiled, see toolshub.request.profile
+    toolshub_profile_requests = fields.Boolean("Profile Toolshub Requests", groups="base.group_system")
+
+    def write(self, vals):
+        res = super().write(vals)
+        # The Stripe account is copied into the marketplace catalog, the name follows through res.partner
+        if 'stripe_connect_account_id' in vals:
+            self.env['toolshub.listing.catalog']._refresh_where('owner_id', self.ids)
+        return res
@@ -0,0 +1,178 @@
+import json
+import logging
+
+import stripe
+from psycopg2 import OperationalError
+
+from odoo import fields, models, api
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
+from odoo.tools import sql
+
+from ..utils.stripe_client import get_stripe_client
+
+_logger = logging.getLogger(__name__)
+
+
+class ToolshubStripeEvent(models.Model):
+    _name = "toolshub.stripe.event"
+    _description = "Stripe Webhook Events"
+    _order = "id desc"
+    _rec_name = "stripe_event_id"
+
+    # Fields
+    stripe_event_id = fields.Char("Stripe Event ID", required=True, readonly=True)
+    event_type = fields.Char("Event Type", required=True, readonly=True)
+    payload = fields.Text("Payload", readonly=True)
+    state = fields.Selection(
+        [('pending', 'Pending'), ('done', 'Done'), ('ignored', 'Ignored'), ('failed', 'Failed'),
+         ('refunded', 'Refunded'), ('manual', 'Needs Review')],
+        string="State", default='pending', required=True, readonly=True,
+    )
+    received_date = fields.Datetime("Received", default=fields.Datetime.now, readonly=True)
+    processed_date = fields.Datetime("Processed", readonly=True)
+    error = fields.Text("Error", readonly=True)
+
+
+    # SQL Constraints
+    _sql_constraints = [
+        ('unique_stripe_event_id', 'unique(stripe_event_id)', 'A Stripe event can only be stored once.'),
+    ]
+
+    def init(self):
+        # The worker only ever looks for pending events, oldest first
+        sql.create_index(self.env.cr, 'toolshub_stripe_event_pending_idx', self._table, ['id'], where="state = 'pending'")
+
+    # Event types handled by the worker, everything else is stored and marked ignored
+    _EVENT_HANDLERS = {
+        'checkout.session.completed': '_handle_checkout_session_completed',
+        'checkout.session.expired': '_handle_checkout_session_expired',
+        'account.updated': '_handle_account_updated',
+    }
+
+
+    # Ingestion
+    @api.model
+    def _ingest(self, stripe_event_id, event_type, payload):
+        """
+        Append a raw event, ignoring Stripe retries of an event already stored.
+        A single INSERT so the webhook can acknowledge right away. Returns True if the event is new.
+        """
+        self.env.cr.execute("""
+            INSERT INTO toolshub_stripe_event
+                (stripe_event_id, event_type, payload, state, received_date,
+                 create_uid, create_date, write_uid, write_date)
+            VALUES (%(event_id)s, %(event_type)s, %(payload)s, 'pending', (now() at time zone 'UTC'),
+                    %(uid)s, (now() at time zone 'UTC'), %(uid)s, (now() at time zone 'UTC'))
+            ON CONFLICT (stripe_event_id) DO NOTHING
+            RETURNING id
+        """, {'event_id': stripe_event_id, 'event_type': event_type, 'payload': payload, 'uid': self.env.uid})
+        created = bool(self.env.cr.fetchone())
+
+        if created and event_type in self._EVENT_HANDLERS:
+            self.env.ref('toolshub.ir_cron_process_stripe_events')._trigger()
+        return created
+
+
+    # Processing
+    @api.model
+    def _cron_process_events(self, batch_size=200, max_batches=25):
+        """Process pending events in committed batches, oldest first"""
+        done = 0
+        for __ in range(max_batches):
+            self.env.cr.execute("""
+                SELECT id FROM toolshub_stripe_event
+                WHERE state = 'pending'
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, [batch_size])
+            events = self.browse([event_id for (event_id,) in self.env.cr.fetchall()])
+            if not events:
+                break
+
+            events._process()
+            done += len(events)
+            self.env.cr.commit()
+
+        remaining = self.search_count([('state', '=', 'pending')])
+        _logger.info("Processed %s Stripe events, %s remaining", done, remaining)
+        self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
+        return done
+
+    def _process(self):
+        now = fields.Datetime.now()
+        for event in self:
+            handler = self._EVENT_HANDLERS.get(event.event_type)
+            if not handler:
+                event.write({'state': 'ignored', 'processed_date': now})
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    data_object = json.loads(event.payload)['data']['object']
+                    # Handlers return (state, note) when the event ends otherwise than done
+                    state, note = getattr(event, handler)(data_object) or ('done', False)
+                event.write({'state': state, 'processed_date': now, 'error': note})
+            except Exception as e:
+                if isinstance(e, OperationalError) and e.pgcode in PG_CONCURRENCY_ERRORS_TO_RETRY:
+                    # A concurrent update of the same rows (seats are taken on their own cursor and never
+                    # fail this way): the batch rolls back, its events stay pending for the next run
+                    _logger.info("Concurrent update while processing Stripe event %s, retrying later",
+                                 event.stripe_event_id)
+                    raise
+                _logger.exception("Failed to process Stripe event %s", event.stripe_event_id)
+                event.write({'state': 'failed', 'processed_date': now, 'error': str(e)})
+
+    def _handle_checkout_session_completed(self, session):
+        """Create the rental paid by a checkout session created by processRentPayment"""
+        if session.get('payment_status') != 'paid':
+            return
+        metadata = session.get('metadata') or {}
+        if not metadata.get('listing_id') or not metadata.get('user_id'):
+            raise ValueError(f"Checkout session {session.get('id')} has no listing_id/user_id metadata")
+
+        listing = self.env['toolshub.tool.rent.listings'].sudo().browse(int(metadata['listing_id']))
+        user = self.env['res.users'].sudo().browse(int(metadata['user_id']))
+        if not listing.exists() or not user.exists():
+            raise ValueError(f"Checkout session {session.get('id')} references a missing listing or user")
+
+        rental = listing._rent_seat(user, stripe_session_id=session['id'])
+        if not rental:
+            return self._refund_unfulfilled(session, f"Listing {listing.id} has no available users left")
+        self.env['toolshub.checkout.session'].sudo()._set_state(session['id'], 'completed')
+
+    def _refund_unfulfilled(self, session, reason):
+        """
+        Refund a paid checkout session that can not become a rental, the transfer to the owner
+        and the platform fee included. When Stripe refuses, the event is left for an administrator.
+        """
+        try:
+            get_stripe_client(self.env).refunds.create(
+                params={
+                    'payment_intent': session['payment_intent'],
+                    'reverse_transfer': True,
+                    'refund_application_fee': True,
+                    'metadata': {'checkout_session_id': session['id']},
+                },
+                options={'idempotency_key': f"toolshub-refund-{session['id']}"},
+            )
+        except (stripe._error.StripeError, KeyError) as e:
+            _logger.error("Could not refund checkout session %s (%s): %s", session.get('id'), reason, e)
+            return 'manual', f"{reason}, the refund failed and must be done by hand: {e}"
+
+        _logger.warning("Refunded checkout session %s: %s", session['id'], reason)
+        self.env['toolshub.checkout.session'].sudo()._set_state(session['id'], 'refunded')
+        return 'refunded', reason
+
+    def _handle_checkout_session_expired(self, session):
+        """The next rent attempt of this user on the listing gets a fresh session"""
+        self.env['toolshub.checkout.session'].sudo()._set_state(session['id'], 'expired')
+
+    def _handle_account_updated(self, account):
+        """Keep the charges_enabled flag of the Connect account owner in sync"""
+        users = self.env['res.users'].sudo().search([('stripe_connect_account_id', '=', account['id'])])
+        users.write({'stripe_charges_enabled': bool(account.get('charges_enabled'))})
+
+    def action_retry(self):
+        """Process failed and needs review events again, a refund is retried with the same idempotency key"""
+        self.write({'state': 'pending', 'error': False})
+        self.env.ref('toolshub.ir_cron_process_stripe_events')._trigger()
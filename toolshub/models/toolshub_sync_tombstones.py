@@ -0,0 +1,68 @@
+import logging
+from datetime import timedelta
+
+from odoo import fields, models, api
+from odoo.tools import sql
+
+_logger = logging.getLogger(__name__)
+
+# Delta sync tokens older than this are answered with a full reload, see the list endpoints
+TOMBSTONE_RETENTION = timedelta(days=7)
+
+
+class ToolshubSyncTombstone(models.Model):
+    """Ids of deleted records, so delta sync clients learn about deletions that left no row behind"""
+    _name = "toolshub.sync.tombstone"
+    _description = "Deleted Records for Delta Sync"
+    _order = "id desc"
+    _log_access = False
+
+    # Fields
+    res_model = fields.Char("Model", required=True, readonly=True)
+    res_id = fields.Integer("Record ID", required=True, readonly=True)
+    # Only this user learns about the deletion, everybody when empty
+    user_id = fields.Integer("User ID", readonly=True)
+    removed_date = fields.Datetime("Removed On", required=True, readonly=True)
+
+    def init(self):
+        sql.create_index(self.env.cr, 'toolshub_sync_tombstone_model_date_idx', self._table, ['res_model', 'removed_date'])
+
+    @api.model
+    def _record(self, res_model, res_ids, audience=None):
+        """
+        Remember that res_ids of res_model were deleted in this transaction.
+        audience: {res_id: user ids} when only those users may learn about the deletion
+        """
+        if not res_ids:
+            return
+        if audience is None:
+            rows = [(res_id, None) for res_id in res_ids]
+        else:
+            rows = [(res_id, user_id) for res_id in res_ids for user_id in set(audience.get(res_id, ()))]
+        if not rows:
+            return
+        self.env.cr.execute("""
+            INSERT INTO toolshub_sync_tombstone (res_model, res_id, user_id, removed_date)
+            SELECT %s, res_id, user_id, (now() at time zone 'UTC')
+            FROM unnest(%s::int[], %s::int[]) AS removed(res_id, user_id)
+        """, [res_model, [res_id for res_id, __ in rows], [user_id for __, user_id in rows]])
+
+    @api.model
+    def _removed_ids(self, res_model, since, user_id=None):
+        """Ids of res_model deleted since, among the deletions user_id may learn about"""
+        self.env.cr.execute("""
+            SELECT DISTINCT res_id FROM toolshub_sync_tombstone
+            WHERE res_model = %s AND removed_date >= %s AND (user_id IS NULL OR user_id = %s)
+        """, [res_model, since, user_id])
+        return [res_id for (res_id,) in self.env.cr.fetchall()]
+
+    @api.model
+    def _is_expired(self, since):
+        """True when since is older than the tombstones still kept, the client must reload everything"""
+        return since < fields.Datetime.now() - TOMBSTONE_RETENTION
+
+    @api.model
+    def _cron_purge_tombstones(self):
+        self.env.cr.execute("DELETE FROM toolshub_sync_tombstone WHERE removed_date < %s",
+                            [fields.Datetime.now() - TOMBSTONE_RETENTION])
+        _logger.info("Purged %s delta sync tombstones", self.env.cr.rowcount)
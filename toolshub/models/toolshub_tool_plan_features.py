@@ -1,4 +1,4 @@
-from odoo import fields, models
+from odoo import fields, models, api
 
 class ToolshubToolPlanFeatures(models.Model):
     _name = "toolshub.tool.plan.features"
@@ -6,7 +6,7 @@ class ToolshubToolPlanFeatures(models.Model):
 
     # Fields
     name = fields.Char(string="Name", required=True)
-    plan_id = fields.Many2one(string="Plan", comodel_name="toolshub.tool.plans", ondelete="cascade", required=True)
+    plan_id = fields.Many2one(string="Plan", comodel_name="toolshub.tool.plans", ondelete="cascade", required=True, index=True)
 
 
     # SQL Constraints
@@ -14,4 +14,24 @@ class ToolshubToolPlanFeatures(models.Model):
         ("unique_name", "unique(name, plan_id, plan_id.tool_id)", "Name, Tool and the Plan of the feature should be unique."),
         ('name_not_null', 'CHECK(name IS NOT NULL)', 'Name cannot be null or empty.'),
         ('plain_id_not_null', 'CHECK(plan_id IS NOT NULL)', 'Plan must be set when creating Feature.'),
-    ]
\ No newline at end of file
+    ]
+
+
+    # Features are shown in the marketplace catalog of every listing of their plan
+    @api.model_create_multi
+    def create(self, vals_list):
+        features = super().create(vals_list)
+        self.env['toolshub.listing.catalog']._refresh_where('plan_id', features.plan_id.ids)
+        return features
+
+    def write(self, vals):
+        plan_ids = set(self.plan_id.ids)
+        res = super().write(vals)
+        self.env['toolshub.listing.catalog']._refresh_where('plan_id', plan_ids | set(self.plan_id.ids))
+        return res
+
+    def unlink(self):
+        plan_ids = self.plan_id.ids
+        res = super().unlink()
+        self.env['toolshub.listing.catalog']._refresh_where('plan_id', plan_ids)
+        return res
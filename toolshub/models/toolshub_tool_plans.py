@@ -1,4 +1,7 @@
 from odoo import fields, models, api
+from odoo.tools import sql
+
+from ..utils.data_version import bump_version
 
 class ToolshubToolPlans(models.Model):
     _name = "toolshub.tool.plans"
@@ -18,6 +21,8 @@ class ToolshubToolPlans(models.Model):
     duration_months = fields.Integer(string="Months", default=0)
     duration_days = fields.Integer(string="Days", default=0)
     is_unlimited = fields.Boolean(string="Unlimited Access", default=True)
+    # Precomputed for the rentals' expiry date (1 year = 365 days, 1 month = 30 days), 0 for unlimited access
+    total_duration_days = fields.Integer(string="Total Duration (Days)", compute="_compute_total_duration_days", store=True)
 
     # Features
     feature_ids = fields.One2many(comodel_name="toolshub.tool.plan.features", inverse_name="plan_id")
@@ -35,6 +40,45 @@ class ToolshubToolPlans(models.Model):
         ('tool_id_not_null', 'CHECK(tool_id IS NOT NULL)', 'Tool must be set.'),
     ]
 
+    def init(self):
+        # Plans are looked up per tool and listed by tool then price
+        sql.create_index(self.env.cr, 'toolshub_tool_plans_tool_id_price_idx', self._table, ['tool_id', 'price'])
+
+    # Plan columns copied into the marketplace catalog, total_users through the listings' available_users
+    _CATALOG_FIELDS = {'name', 'is_unlimited', 'duration_years', 'duration_months', 'duration_days', 'total_users', 'unlimited_users'}
+
+    # Plan columns the rentals' expiry date is derived from, recomputed by a background job
+    _DURATION_FIELDS = {'is_unlimited', 'duration_years', 'duration_months', 'duration_days'}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        plans = super().create(vals_list)
+        bump_version(self.env, 'tools')
+        return plans
+
+    def write(self, vals):
+        res = super().write(vals)
+        bump_version(self.env, 'tools')
+        if self._CATALOG_FIELDS & vals.keys():
+            self.env['toolshub.listing.catalog']._refresh_where('plan_id', self.ids)
+        if self._DURATION_FIELDS & vals.keys():
+            self.env['toolshub.expiry.recompute'].sudo()._schedule(self)
+        return res
+
+    def unlink(self):
+        # Listings of the plans go with them
+        bump_version(self.env, 'tools', 'listings')
+        return super().unlink()
+
+    # Computing Total Duration
+    @api.depends('is_unlimited', 'duration_years', 'duration_months', 'duration_days')
+    def _compute_total_duration_days(self):
+        for record in self:
+            if record.is_unlimited:
+                record.total_duration_days = 0
+            else:
+                record.total_duration_days = (record.duration_years * 365) + (record.duration_months * 30) + record.duration_days
+
     # Python Constraints
     @api.constrains('unlimited_users', 'total_users')
     def _check_total_users(self):
@@ -45,21 +89,29 @@ class ToolshubToolPlans(models.Model):
     # Total Users should be greater than or equal to subscribers
     @api.constrains('total_users', 'unlimited_users')
     def _check_total_users_vs_subscribers(self):
-        for record in self:
-            if not record.unlimited_users:
-                # Count all rented tools for listings using this plan
-                self.env.cr.execute("""
-                    SELECT COUNT(rt.id)
-                    FROM toolshub_rented_tools rt
-                    JOIN toolshub_tool_rent_listing rl ON rt.rent_listing_id = rl.id
-                    WHERE rl.plan_id = %s
-                """, [record.id])
-                subscribers_count = self.env.cr.fetchone()[0] or 0
-
-                if subscribers_count > record.total_users:
-                    raise models.ValidationError(
-                        f"Total users ({record.total_users}) cannot be less than current subscribers ({subscribers_count})."
-                    )
+        limited_plans = self.filtered(lambda plan: not plan.unlimited_users)
+        if not limited_plans:
+            return
+
+        # Count the active rentals of the listings using each plan, for all the plans in one query,
+        # expired rentals free their seat like they do in the listings' subscribers_count
+        self.env['toolshub.rented.tools'].flush_model(['rent_listing_id', 'is_active'])
+        self.env['toolshub.tool.rent.listings'].flush_model(['plan_id'])
+        self.env.cr.execute("""
+            SELECT rl.plan_id, COUNT(rt.id)
+            FROM toolshub_rented_tools rt
+            JOIN toolshub_tool_rent_listings rl ON rt.rent_listing_id = rl.id
+            WHERE rl.plan_id = ANY(%s) AND rt.is_active
+            GROUP BY rl.plan_id
+        """, [limited_plans.ids])
+        subscribers_counts = dict(self.env.cr.fetchall())
+
+        for record in limited_plans:
+            subscribers_count = subscribers_counts.get(record.id, 0)
+            if subscribers_count > record.total_users:
+                raise models.ValidationError(
+                    f"Total users ({record.total_users}) cannot be less than current subscribers ({subscribers_count})."
+                )
 
 
     # Toggling unlimited_users
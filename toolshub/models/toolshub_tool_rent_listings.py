@@ -1,15 +1,21 @@
-from odoo import models, fields, api
+from contextlib import contextmanager
+
+from odoo import models, fields, api, modules
 from odoo.exceptions import ValidationError
+from odoo.tools import sql
+
+from ..utils.data_version import bump_version
 
 class ToolshubToolRentListings(models.Model):
     _name = "toolshub.tool.rent.listings"
     _description = "Listing for Rentable Tools"
 
     # Fields
-    tool_id = fields.Many2one("toolshub.tools", string="Tool", required=True)
-    plan_id = fields.Many2one("toolshub.tool.plans", string="Plan", required=True, domain="[('tool_id', '=', tool_id)]")
+    tool_id = fields.Many2one("toolshub.tools", string="Tool", required=True, index=True)
+    plan_id = fields.Many2one("toolshub.tool.plans", string="Plan", required=True, index=True, domain="[('tool_id', '=', tool_id)]")
     rented_tools_ids = fields.One2many("toolshub.rented.tools", "rent_listing_id", string="Rented Tools")
-    subscribers_count = fields.Integer("Total Subscribers", compute="_compute_subscribers_count", store=True)
+    # Maintained incrementally by the rentals (see _apply_subscriber_deltas), repaired by _recount_subscribers
+    subscribers_count = fields.Integer("Total Subscribers", default=0, readonly=True)
 
     total_users = fields.Integer("Total Users")
     unlimited_users = fields.Boolean("Unlimited Users")
@@ -33,6 +39,31 @@ class ToolshubToolRentListings(models.Model):
         
     ]
 
+    def init(self):
+        # The rented-out join and the catalog refreshes filter on owner_id
+        sql.create_index(self.env.cr, 'toolshub_tool_rent_listings_owner_id_idx', self._table, ['owner_id', 'id DESC'])
+        # The marketplace sorts page through toolshub.listing.catalog, which has its own indexes
+        sql.drop_index(self.env.cr, 'toolshub_tool_rent_listings_active_price_idx', self._table)
+        sql.drop_index(self.env.cr, 'toolshub_tool_rent_listings_active_popularity_idx', self._table)
+
+    # Keeping the marketplace catalog in sync
+    @api.model_create_multi
+    def create(self, vals_list):
+        listings = super().create(vals_list)
+        self.env['toolshub.listing.catalog']._refresh(listings.ids)
+        return listings
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['toolshub.listing.catalog']._refresh(self.ids)
+        return res
+
+    def unlink(self):
+        # The catalog rows go with the listings through ondelete cascade
+        self.env['toolshub.sync.tombstone']._record(self._name, self.ids)
+        bump_version(self.env, 'listings')
+        return super().unlink()
+
     # Python Constraints
     @api.constrains("unlimited_users")
     def _check_unlimited_users(self):
@@ -57,18 +88,16 @@ class ToolshubToolRentListings(models.Model):
 
 
     # Computing Available Users
-    @api.depends('subscribers_count', "plan_id.total_users", "unlimited_users")
+    @api.depends('subscribers_count', "total_users", "unlimited_users")
     def _compute_available_users(self):
-        if not self.unlimited_users:
-            for record in self:
-                record.available_users = record.total_users - record.subscribers_count
-                record.is_active = record.is_active and (record.available_users > 0)
-
-    # Calculating subscribers
-    @api.depends('rented_tools_ids')
-    def _compute_subscribers_count(self):
         for record in self:
-            record.subscribers_count = len(record.rented_tools_ids)
+            if record.unlimited_users:
+                # Seats are not counted for unlimited listings
+                record.available_users = 0
+                continue
+            record.available_users = record.total_users - record.subscribers_count
+            if record.available_users <= 0:
+                record.is_active = False
 
     
     # Toggling unlimited_users
@@ -80,4 +109,159 @@ class ToolshubToolRentListings(models.Model):
     def _check_is_active(self):
         for record in self:
             if record.is_active and not record.unlimited_users and record.available_users <= 0:
-                raise ValidationError("Listing can only be active if available users is greater than 0.")
\ No newline at end of file
+                raise ValidationError("Listing can only be active if available users is greater than 0.")
+
+
+    # Subscriber counters
+    @api.model
+    def _apply_subscriber_deltas(self, deltas):
+        """
+        Shift subscribers_count, and the available_users of limited listings, by a delta per listing id.
+        One UPDATE for all listings, so adding or removing a rental costs O(1) instead of a recount.
+        Like _rent_seat, a positive delta only applies while the limited listing has the seats for it,
+        otherwise a ValidationError is raised: rentals created from the backend cannot oversell either.
+        """
+        deltas = {listing_id: delta for listing_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        self.flush_model()
+
+        listing_ids = sorted(deltas)
+        self.env.cr.execute("""
+            UPDATE toolshub_tool_rent_listings l
+            SET subscribers_count = GREATEST(l.subscribers_count + d.delta, 0),
+                available_users = CASE WHEN l.unlimited_users THEN l.available_users
+                                       ELSE l.total_users - GREATEST(l.subscribers_count + d.delta, 0) END,
+                is_active = l.is_active AND (l.unlimited_users OR l.total_users - GREATEST(l.subscribers_count + d.delta, 0) > 0),
+                write_date = (now() at time zone 'UTC'), write_uid = %s
+            FROM unnest(%s::int[], %s::int[]) AS d(listing_id, delta)
+            WHERE l.id = d.listing_id
+              AND (d.delta < 0 OR l.unlimited_users OR l.subscribers_count + d.delta <= l.total_users)
+            RETURNING l.id
+        """, [self.env.uid, listing_ids, [deltas[listing_id] for listing_id in listing_ids]])
+        oversold = set(listing_ids) - {listing_id for (listing_id,) in self.env.cr.fetchall()}
+        if oversold:
+            raise ValidationError(f"Not enough available users left on rent listing(s) {sorted(oversold)}.")
+        self.browse(listing_ids).invalidate_recordset(
+            ['subscribers_count', 'available_users', 'is_active', 'write_date', 'write_uid']
+        )
+        self.env['toolshub.listing.catalog']._refresh_counters(listing_ids)
+
+    @api.model
+    def _recount_subscribers(self):
+        """
+        Repair command: recount the active rentals of every listing with one aggregate query
+        and fix the listings whose counters drifted. Returns the number of listings fixed.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("""
+            UPDATE toolshub_tool_rent_listings l
+            SET subscribers_count = counts.subscribers,
+                available_users = CASE WHEN l.unlimited_users THEN l.available_users
+                                       ELSE l.total_users - counts.subscribers END,
+                write_date = (now() at time zone 'UTC'), write_uid = %s
+            FROM (
+                SELECT listing.id AS listing_id, COUNT(rt.id) AS subscribers
+                FROM toolshub_tool_rent_listings listing
+                LEFT JOIN toolshub_rented_tools rt ON rt.rent_listing_id = listing.id AND rt.is_active
+                GROUP BY listing.id
+            ) counts
+            WHERE l.id = counts.listing_id
+              AND (l.subscribers_count IS DISTINCT FROM counts.subscribers
+                   OR (NOT l.unlimited_users AND l.available_users IS DISTINCT FROM l.total_users - counts.subscribers))
+            RETURNING l.id
+        """, [self.env.uid])
+        fixed_ids = [listing_id for (listing_id,) in self.env.cr.fetchall()]
+        self.invalidate_model(['subscribers_count', 'available_users', 'write_date', 'write_uid'])
+        self.env['toolshub.listing.catalog']._refresh_counters(fixed_ids)
+        return len(fixed_ids)
+
+    def action_recount_subscribers(self):
+        fixed = self._recount_subscribers()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': "Subscribers Recounted",
+                'message': f"{fixed} listing(s) had their counters fixed.",
+                'type': 'success',
+            },
+        }
+
+    # Seat allocation
+    @contextmanager
+    def _seat_cursor(self):
+        """
+        READ COMMITTED cursor of its own the seat is taken and committed in. Concurrent renters then
+        queue on the listing's row lock and re-check the seats left, instead of failing to serialize
+        like the REPEATABLE READ transactions of the requests and crons.
+        Under tests the test transaction is used, so nothing gets committed.
+        """
+        if modules.module.current_test:
+            yield self.env.cr
+            return
+        with self.env.registry.cursor() as cr:
+            # Must be the first statement of the transaction
+            cr.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+            yield cr
+
+    def _rent_seat(self, user, stripe_session_id=False):
+        """
+        Take one seat on this listing for user and create the rental, committed right away by _seat_cursor.
+        When stripe_session_id is given, a session that already produced a rental returns that rental,
+        so a caller that fails afterwards can safely be replayed.
+        The rental is committed by its own transaction, the caller's snapshot may predate it.
+        Returns the rental, or an empty recordset when no seat is left.
+        """
+        self.ensure_one()
+        with self._seat_cursor() as cr:
+            rental_id = self.with_env(self.env(cr=cr))._take_seat(user.id, stripe_session_id)
+        if cr is not self.env.cr:
+            self.invalidate_recordset(['subscribers_count', 'available_users', 'is_active', 'write_date', 'write_uid'])
+        return self.env['toolshub.rented.tools'].browse(rental_id or [])
+
+    def _take_seat(self, user_id, stripe_session_id=False):
+        """
+        Seat allocation of _rent_seat, on a READ COMMITTED cursor: the conditional UPDATE waits for
+        the concurrent renters of the listing, then only succeeds while a seat is left. It neither
+        oversells nor raises serialization failures. Returns the rental id, or None when no seat is left.
+        """
+        self.ensure_one()
+        RentedTools = self.env['toolshub.rented.tools']
+        cr = self.env.cr
+
+        if stripe_session_id:
+            RentedTools.flush_model(['stripe_session_id'])
+            cr.execute("SELECT id FROM toolshub_rented_tools WHERE stripe_session_id = %s", [stripe_session_id])
+            existing = cr.fetchone()
+            if existing:
+                return existing[0]
+
+        self.flush_recordset()
+        cr.execute("""
+            UPDATE toolshub_tool_rent_listings
+            SET subscribers_count = subscribers_count + 1,
+                available_users = CASE WHEN unlimited_users THEN available_users ELSE available_users - 1 END,
+                is_active = unlimited_users OR available_users > 1,
+                write_date = (now() at time zone 'UTC'), write_uid = %s
+            WHERE id = %s AND is_active AND (unlimited_users OR available_users > 0)
+            RETURNING id
+        """, [self.env.uid, self.id])
+        if not cr.fetchone():
+            return None
+        self.invalidate_recordset(['subscribers_count', 'available_users', 'is_active', 'write_date', 'write_uid'])
+        self.env['toolshub.listing.catalog']._refresh_counters([self.id])
+
+        # The seat is already counted by the UPDATE above
+        rental = RentedTools.sudo().with_context(toolshub_seat_taken=True).create({
+            'rent_listing_id': self.id,
+            'lender_id': user_id,
+            'stripe_session_id': stripe_session_id,
+        })
+        return rental.id
+
+
+    # Serialization
+    def _get_listing_payloads(self):
+        """API dicts of the listings in self, in the order of self, read from the marketplace catalog"""
+        return self.env['toolshub.listing.catalog'].browse(self.ids)._get_listing_payloads()
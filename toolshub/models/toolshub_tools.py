@@ -1,11 +1,16 @@
-from odoo import fields, models
+from odoo import fields, models, api
+from odoo.tools import sql
+
+from ..utils.data_version import bump_version
+
 
 class ToolshubTools(models.Model):
     _name = "toolshub.tools"
     _description = "Model for Toolshub Tools"
 
     # Fields
-    name = fields.Char(string="Name", required=True)
+    # Trigram index so "name ilike '%term%'" is an index scan instead of a sequential scan
+    name = fields.Char(string="Name", required=True, index='trigram')
     image_url = fields.Char(string="URL", required=True)
 
     # Inverse Field
@@ -15,4 +20,35 @@ class ToolshubTools(models.Model):
     # SQL Constraints
     _sql_constraints = [
         ("unique_name", "unique(name)", "Name of the tool should be unique.")
-    ]
\ No newline at end of file
+    ]
+
+    def init(self):
+        # Replaced by the ORM's trigram index of name, nothing searches image_url
+        sql.drop_index(self.env.cr, 'toolshub_tools_name_trgm_idx', self._table)
+        sql.drop_index(self.env.cr, 'toolshub_tools_image_url_trgm_idx', self._table)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        tools = super().create(vals_list)
+        bump_version(self.env, 'tools')
+        return tools
+
+    def write(self, vals):
+        res = super().write(vals)
+        bump_version(self.env, 'tools')
+        if {'name', 'image_url'} & vals.keys():
+            self.env['toolshub.listing.catalog']._refresh_where('tool_id', self.ids)
+        return res
+
+    def unlink(self):
+        # Plans and listings of the tools go with them
+        bump_version(self.env, 'tools', 'listings')
+        return super().unlink()
+
+    @api.model
+    def _search_ids_by_name(self, term):
+        """
+        Ids of the tools whose name contains term.
+        Resolved on its own so the trigram index is used, callers then filter with tool_id IN (...)
+        """
+        return self.search([('name', 'ilike', term)]).ids
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Local SMTP sink and signup benchmark for the Toolshub activation emails.
+
+Accepts every message on a local port and throws it away, counting deliveries.
+With --signups it also posts that many signups to /toolshub/api/signup
+concurrently and reports the signup throughput and latency, then waits for the
+activation emails to reach the sink. Only the standard library is needed.
+
+Point Odoo at the sink with an outgoing mail server on localhost:<port>, no
+encryption, then for example:
+    python3 smtp_sink.py --port 2525 --url http://localhost:8069 --signups 500 --concurrency 16
+"""
+import argparse
+import json
+import secrets
+import socketserver
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SinkStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.first_at = None
+        self.last_at = None
+
+    def record(self):
+        with self.lock:
+            now = time.perf_counter()
+            self.messages += 1
+            self.first_at = self.first_at or now
+            self.last_at = now
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: enough for smtplib, several messages per connection"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 toolshub-sink ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply("250-toolshub-sink")
+                self.reply("250 8BITMIME")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                self.server.stats.record()
+                self.reply("250 OK")
+            elif command == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                # MAIL FROM, RCPT TO, RSET, NOOP
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, SMTPSinkHandler)
+        self.stats = SinkStats()
+
+
+def signup(url, index):
+    payload = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': {
+        'username': f"Bench User {index}",
+        'email': f"bench_{secrets.token_hex(6)}@example.com",
+        'password': secrets.token_urlsafe(12),
+    }}).encode()
+    req = urllib.request.Request(url, data=payload, method='POST', headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=60) as response:
+        result = json.loads(response.read()).get('result') or {}
+    return bool(result.get('success')), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--url', default='http://localhost:8069', help="Odoo base URL")
+    parser.add_argument('--signups', type=int, default=0, help="number of signups to post, 0 only runs the sink")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mail-timeout', type=float, default=300, help="seconds to wait for the activation emails")
+    args = parser.parse_args()
+
+    sink = SMTPSink((args.host, args.port))
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    print(f"SMTP sink listening on {args.host}:{args.port}")
+
+    if not args.signups:
+        try:
+            while True:
+                time.sleep(5)
+                print(f"{sink.stats.messages} messages received")
+        except KeyboardInterrupt:
+            return
+
+    url = args.url.rstrip('/') + '/toolshub/api/signup'
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda index: signup(url, index), range(args.signups)))
+    elapsed = time.perf_counter() - started
+
+    # Activation emails are sent asynchronously, wait for them to arrive
+    succeeded = sum(1 for ok, __ in results if ok)
+    deadline = time.perf_counter() + args.mail_timeout
+    while sink.stats.messages < succeeded and time.perf_counter() < deadline:
+        time.sleep(0.5)
+    mail_elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for __, latency in results)
+    print(json.dumps({
+        'signups_sent': len(results),
+        'failures': len(results) - succeeded,
+        'elapsed_s': round(elapsed, 3),
+        'signups_per_s': round(len(results) / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p95_ms': round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 2),
+        'mails_received': sink.stats.messages,
+        'all_mails_delivered_s': round(mail_elapsed, 3),
+    }, indent=2))
+    sink.shutdown()
+
+
+if __name__ == '__main__':
+    main()
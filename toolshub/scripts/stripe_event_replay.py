@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Fake Stripe event generator for the Toolshub webhook.
+
+Builds signed Stripe-like events and posts them to /toolshub/stripe/webhook
+concurrently, then reports the ingest throughput. Only the standard library
+is needed, so it can run outside the Odoo environment.
+
+Example:
+    python3 stripe_event_replay.py --url http://localhost:8069 --secret whsec_test \
+        --count 10000 --concurrency 32 --listing-ids 1,2,3 --user-ids 7,8 --duplicates 0.1
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import secrets
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def sign(payload, secret, timestamp=None):
+    """Stripe-Signature header for payload, same scheme as Stripe: HMAC-SHA256 of "<t>.<payload>" """
+    timestamp = timestamp or int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def checkout_session_completed(listing_id, user_id):
+    session_id = f"cs_test_{secrets.token_hex(12)}"
+    return {
+        'id': f"evt_{secrets.token_hex(12)}",
+        'object': 'event',
+        'type': 'checkout.session.completed',
+        'created': int(time.time()),
+        'data': {
+            'object': {
+                'id': session_id,
+                'object': 'checkout.session',
+                'payment_status': 'paid',
+                'status': 'complete',
+                'metadata': {'listing_id': str(listing_id), 'user_id': str(user_id)},
+            },
+        },
+    }
+
+
+def account_updated(account_id):
+    return {
+        'id': f"evt_{secrets.token_hex(12)}",
+        'object': 'event',
+        'type': 'account.updated',
+        'created': int(time.time()),
+        'data': {
+            'object': {
+                'id': account_id,
+                'object': 'account',
+                'charges_enabled': random.random() < 0.9,
+                'payouts_enabled': random.random() < 0.9,
+            },
+        },
+    }
+
+
+def generate_events(args):
+    listing_ids = [int(i) for i in args.listing_ids.split(',') if i]
+    user_ids = [int(i) for i in args.user_ids.split(',') if i]
+    accounts = [a for a in args.accounts.split(',') if a]
+
+    events = []
+    for __ in range(args.count):
+        if accounts and random.random() < args.account_ratio:
+            events.append(account_updated(random.choice(accounts)))
+        else:
+            events.append(checkout_session_completed(random.choice(listing_ids), random.choice(user_ids)))
+
+    # Stripe retries deliveries, replay a share of the events to exercise the deduplication
+    events += random.sample(events, int(len(events) * args.duplicates))
+    random.shuffle(events)
+    return events
+
+
+def post(url, secret, event):
+    payload = json.dumps(event)
+    req = urllib.request.Request(
+        url, data=payload.encode(), method='POST',
+        headers={'Content-Type': 'application/json', 'Stripe-Signature': sign(payload, secret)},
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8069', help="Odoo base URL")
+    parser.add_argument('--secret', required=True, help="value of the stripe_webhook_secret system parameter")
+    parser.add_argument('--count', type=int, default=10000, help="number of distinct events")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--listing-ids', default='1', help="comma separated listing ids used in checkout sessions")
+    parser.add_argument('--user-ids', default='2', help="comma separated renter user ids")
+    parser.add_argument('--accounts', default='', help="comma separated Connect account ids for account.updated")
+    parser.add_argument('--account-ratio', type=float, default=0.1, help="share of account.updated events")
+    parser.add_argument('--duplicates', type=float, default=0.05, help="share of events delivered twice")
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/') + '/toolshub/stripe/webhook'
+    events = generate_events(args)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda event: post(url, args.secret, event), events))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for __, latency in results)
+    failures = sum(1 for status, __ in results if status != 200)
+    print(json.dumps({
+        'events_sent': len(events),
+        'failures': failures,
+        'elapsed_s': round(elapsed, 3),
+        'events_per_s': round(len(events) / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p95_ms': round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
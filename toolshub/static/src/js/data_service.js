@@ -0,0 +1,127 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { rpc } from "@web/core/network/rpc";
+
+// Number of answers kept, least recently used ones are dropped first
+const MAX_CACHE_ENTRIES = 50;
+
+/**
+ * Shared data access for the Toolshub components:
+ *  - identical concurrent calls share one request,
+ *  - a call on a channel aborts the previous call still pending on that channel (it resolves to null),
+ *  - successful answers are kept in an LRU for `ttl` milliseconds.
+ * Hit/miss counters are logged in debug mode and exposed as `window.toolshubDataStats`.
+ */
+export const dataService = {
+    start(env) {
+        const cache = new Map(); // key -> { expires, result }, in least to most recently used order
+        const inflight = new Map(); // key -> promise
+        const channels = new Map(); // channel -> { key, request, resolve }
+        const stats = { hits: 0, misses: 0, deduped: 0, aborted: 0 };
+
+        if (env.debug) {
+            window.toolshubDataStats = stats;
+        }
+
+        function logStats(event, route) {
+            if (env.debug) {
+                console.debug(`[toolshub data] ${event} ${route}`, { ...stats });
+            }
+        }
+
+        function remember(key, result, ttl) {
+            cache.delete(key);
+            cache.set(key, { expires: Date.now() + ttl, result });
+            while (cache.size > MAX_CACHE_ENTRIES) {
+                cache.delete(cache.keys().next().value);
+            }
+        }
+
+        function supersede(channel, key) {
+            const pending = channels.get(channel);
+            if (pending && pending.key !== key) {
+                pending.request.abort(false);
+                inflight.delete(pending.key);
+                pending.resolve(null);
+                stats.aborted++;
+            }
+        }
+
+        /**
+         * @param {string} route
+         * @param {Object} params
+         * @param {Object} [options]
+         * @param {string} [options.channel] calls on the same channel supersede each other
+         * @param {number} [options.ttl=0] milliseconds a successful answer is served from the cache
+         * @returns {Promise<Object|null>} the answer, or null when superseded by a later call
+         */
+        function fetch(route, params = {}, { channel = null, ttl = 0 } = {}) {
+            const key = `${route}|${JSON.stringify(params)}`;
+
+            const cached = cache.get(key);
+            if (cached && cached.expires > Date.now()) {
+                cache.delete(key);
+                cache.set(key, cached);
+                stats.hits++;
+                logStats("hit", route);
+                if (channel) {
+                    supersede(channel, key);
+                }
+                return Promise.resolve(cached.result);
+            }
+
+            if (inflight.has(key)) {
+                stats.deduped++;
+                logStats("deduped", route);
+                return inflight.get(key);
+            }
+
+            if (channel) {
+                supersede(channel, key);
+            }
+
+            stats.misses++;
+            logStats("miss", route);
+            const request = rpc(route, JSON.parse(JSON.stringify(params)));
+            const promise = new Promise((resolve, reject) => {
+                if (channel) {
+                    channels.set(channel, { key, request, resolve });
+                }
+                request.then(
+                    (result) => {
+                        if (ttl && result?.success) {
+                            remember(key, result, ttl);
+                        }
+                        resolve(result);
+                    },
+                    reject,
+                ).finally(() => {
+                    if (inflight.get(key) === promise) {
+                        inflight.delete(key);
+                    }
+                    if (channel && channels.get(channel)?.request === request) {
+                        channels.delete(channel);
+                    }
+                });
+            });
+            inflight.set(key, promise);
+            return promise;
+        }
+
+        /**
+         * Forget the cached answers of route, to call after a change made by the user.
+         */
+        function invalidate(route) {
+            for (const key of [...cache.keys()]) {
+                if (key.startsWith(`${route}|`)) {
+                    cache.delete(key);
+                }
+            }
+        }
+
+        return { fetch, invalidate, stats };
+    },
+};
+
+registry.category("services").add("toolshub_data", dataService);
@@ -0,0 +1,47 @@
+/** @odoo-module **/
+
+/**
+ * Merge a delta answer of the list endpoints (called with `since`) into records:
+ * updated records replace the ones with the same id or are added, removed ids are dropped.
+ * Returns a new array sorted with compare when given.
+ */
+export function mergeDelta(records, updated, removed, compare = null) {
+    const removedIds = new Set(removed);
+    const updatedById = new Map(updated.map((record) => [record.id, record]));
+
+    const merged = [];
+    for (const record of records) {
+        if (removedIds.has(record.id)) {
+            continue;
+        }
+        if (updatedById.has(record.id)) {
+            merged.push(updatedById.get(record.id));
+            updatedById.delete(record.id);
+        } else {
+            merged.push(record);
+        }
+    }
+    merged.push(...updatedById.values());
+    return compare ? merged.sort(compare) : merged;
+}
+
+/**
+ * Comparator of records ordered by `field` in `direction`, ties broken by id in the same direction,
+ * matching the server side keyset ordering. sortValue gives the value the server sorts a record on,
+ * when the payload shows another one (record[field] by default). Missing values sort like the
+ * server's NULLS FIRST in descending order and NULLS LAST in ascending order.
+ */
+export function keysetCompare(field, direction, sortValue = null) {
+    const sign = direction === "desc" ? -1 : 1;
+    const value = (record) => {
+        const v = sortValue ? sortValue(record) : record[field];
+        // Above every value: last ascending, first descending
+        return v === null || v === undefined ? Infinity : v;
+    };
+    return (a, b) => {
+        if (field !== "id" && value(a) !== value(b)) {
+            return value(a) < value(b) ? -sign : sign;
+        }
+        return a.id < b.id ? -sign : sign;
+    };
+}
@@ -0,0 +1,90 @@
+/** @odoo-module **/
+
+import { Component, useState } from "@odoo/owl";
+import { useService } from "@web/core/utils/hooks";
+import { useDebounced } from "@web/core/utils/timing";
+import { resolveRecords } from "./normalized";
+
+// Milliseconds answers are served from the toolshub_data cache
+const SEARCH_TTL = 10000;
+const SEARCH_LIMIT = 8;
+// Shorter queries are not sent, they would match most of the catalog
+const MIN_QUERY_LENGTH = 2;
+
+/**
+ * Type-ahead search of the rent listings on tool, plan and feature names,
+ * best ranked first with the matched words highlighted.
+ */
+export class ListingSearch extends Component {
+    static template = "toolshub.ListingSearch";
+    static props = {
+        onSelect: { type: Function },
+    };
+
+    setup() {
+        this.notification = useService("notification");
+        this.data = useService("toolshub_data");
+        this.onQueryInput = useDebounced(() => this.search(), 150);
+
+        this.state = useState({
+            query: "",
+            results: [],
+            searching: false,
+            open: false,
+        });
+    }
+
+    async search() {
+        const query = this.state.query.trim();
+        if (query.length < MIN_QUERY_LENGTH) {
+            this.state.results = [];
+            this.state.open = false;
+            return;
+        }
+        this.state.searching = true;
+        try {
+            const searchResult = await this.data.fetch("/toolshub/api/search", {
+                query,
+                limit: SEARCH_LIMIT,
+                normalized: true,
+            }, { channel: "listingSearch", ttl: SEARCH_TTL });
+
+            if (!searchResult) {
+                // A newer keystroke replaced this request
+                return;
+            }
+            if (searchResult.success) {
+                const data = searchResult.data;
+                this.state.results = resolveRecords(data, "listings").map((listing) => ({
+                    listing,
+                    highlights: data.highlights[listing.id],
+                }));
+                this.state.open = true;
+            }
+            else {
+                this.notification.add(searchResult.data.message, {type: 'danger', title: 'Error'});
+            }
+
+        } catch (error) {
+            console.error('Error searching listings:', error);
+        } finally {
+            this.state.searching = false;
+        }
+    }
+
+    select(result) {
+        this.state.open = false;
+        this.props.onSelect(result.listing);
+    }
+
+    onBlur() {
+        // Let a click on a result land before the list closes
+        setTimeout(() => { this.state.open = false; }, 150);
+    }
+
+    clear() {
+        this.state.query = "";
+        this.state.results = [];
+        this.state.open = false;
+    }
+}
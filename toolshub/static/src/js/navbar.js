@@ -18,6 +18,7 @@ export class Navbar extends Component {
             { id: 'rent', label: 'Rent Tools', icon: 'fa-store' },
             { id: 'rented-out', label: 'Rented Out', icon: 'fa-hand-holding-usd' },
             { id: 'rented-by-me', label: 'Rented by Me', icon: 'fa-shopping-bag' },
+            { id: 'owner-stats', label: 'Earnings', icon: 'fa-chart-line' },
             // { id: 'groupbuy', label: 'Group Buy', icon: 'fa-users' },
             // { id: 'addtool', label: 'Add Tool', icon: 'fa-plus-circle' }
         ];
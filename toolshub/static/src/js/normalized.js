@@ -0,0 +1,46 @@
+/** @odoo-module **/
+
+// Listing keys sent once in the tools, plans and owners tables of normalized answers, by table key
+const TOOL_KEYS = { name: "tool_name", image_url: "tool_img_url" };
+const PLAN_KEYS = {
+    name: "plan_name", features: "plan_features", unlimited_access: "unlimited_access",
+    duration_years: "duration_years", duration_months: "duration_months", duration_days: "duration_days",
+};
+const OWNER_KEYS = { name: "owner_name", connect_account_id: "owner_connect_account_id" };
+
+function resolveListing(listing, data) {
+    const resolved = { ...listing };
+    for (const [table, idKey, keys] of [
+        ["tools", "tool_id", TOOL_KEYS],
+        ["plans", "plan_id", PLAN_KEYS],
+        ["owners", "owner_id", OWNER_KEYS],
+    ]) {
+        const entry = data[table][listing[idKey]] || {};
+        for (const [name, key] of Object.entries(keys)) {
+            resolved[key] = entry[name];
+        }
+    }
+    return resolved;
+}
+
+/**
+ * Records of a list answer (full or delta) asked with `normalized: true`, with their listings
+ * rebuilt from the shared tools, plans and owners tables. The answer itself is left untouched
+ * since the data service may serve it again from its cache.
+ * @param {Object} data the `data` part of the answer
+ * @param {string} recordsKey key of the records, e.g. "listings" or "rented_tools"
+ * @param {string} [listingKey] key of the listing inside each record, for the rentals
+ */
+export function resolveRecords(data, recordsKey, listingKey = null) {
+    const records = data[recordsKey] || [];
+    if (!data.normalized) {
+        return records;
+    }
+    if (!listingKey) {
+        return records.map((listing) => resolveListing(listing, data));
+    }
+    return records.map((record) => ({
+        ...record,
+        [listingKey]: record[listingKey] && resolveListing(record[listingKey], data),
+    }));
+}
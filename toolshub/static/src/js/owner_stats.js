@@ -0,0 +1,111 @@
+/** @odoo-module **/
+
+import { Component, useState, onMounted } from "@odoo/owl";
+import { useService } from "@web/core/utils/hooks";
+
+// Milliseconds answers are served from the toolshub_data cache, the rollups only move once an hour
+const STATS_TTL = 60000;
+
+const PERIODS = [
+    { days: 7, label: "7 days" },
+    { days: 30, label: "30 days" },
+    { days: 90, label: "90 days" },
+    { days: 365, label: "12 months" },
+];
+
+function isoDate(date) {
+    return date.toISOString().slice(0, 10);
+}
+
+export class OwnerStats extends Component {
+    static template = "toolshub.OwnerStats";
+
+    setup() {
+        this.notification = useService("notification");
+        this.data = useService("toolshub_data");
+        this.periods = PERIODS;
+
+        this.state = useState({
+            loading: true,
+            periodDays: 30,
+            stats: null,
+            // Amounts are never added across currencies, the totals and the chart show one at a time
+            currencyId: null,
+        });
+
+        onMounted(() => {
+            this.loadStats();
+        });
+    }
+
+    async loadStats() {
+        this.state.loading = true;
+        let superseded = false;
+        try {
+            const dateTo = new Date();
+            const dateFrom = new Date(dateTo.getTime() - (this.state.periodDays - 1) * 86400000);
+            const result = await this.data.fetch("/toolshub/api/getOwnerStats", {
+                date_from: isoDate(dateFrom),
+                date_to: isoDate(dateTo),
+            }, { channel: "ownerStats", ttl: STATS_TTL });
+
+            if (!result) {
+                // A newer period replaced this request
+                superseded = true;
+                return;
+            }
+            if (result.success) {
+                const currencies = result.data.currencies;
+                if (!currencies.some((currency) => currency.currency_id === this.state.currencyId)) {
+                    this.state.currencyId = currencies.length ? currencies[0].currency_id : null;
+                }
+                this.state.stats = result.data;
+            }
+            else {
+                this.notification.add(result.data.message, {type: 'danger', title: 'Error'});
+            }
+
+        } catch (error) {
+            this.notification.add("Unexpected Error Occured while loading your stats", {type: 'danger', title: 'Error'});
+            console.error('Error loading owner stats:', error);
+        } finally {
+            if (!superseded) {
+                this.state.loading = false;
+            }
+        }
+    }
+
+    selectPeriod(days) {
+        this.state.periodDays = days;
+        this.loadStats();
+    }
+
+    selectCurrency(currencyId) {
+        this.state.currencyId = currencyId;
+    }
+
+    get currencyTotals() {
+        return this.state.stats.currencies.find((currency) => currency.currency_id === this.state.currencyId)
+            || { gross_revenue: 0, platform_fee: 0, net_revenue: 0 };
+    }
+
+    /**
+     * Gross revenue of the day in the selected currency
+     */
+    dayRevenue(day) {
+        return day.revenue[this.state.currencyId]?.gross_revenue || 0;
+    }
+
+    /**
+     * Height of the day's bar in percent of the best day of the period, in the selected currency
+     */
+    barHeight(day) {
+        const best = Math.max(...this.state.stats.days.map((d) => this.dayRevenue(d)), 0);
+        return best ? Math.max((this.dayRevenue(day) / best) * 100, 2) : 2;
+    }
+
+    formatAmount(amount, currencyId = this.state.currencyId) {
+        const currency = this.state.stats.currencies.find((c) => c.currency_id === currencyId);
+        return `${currency ? currency.currency_symbol : ''}${(amount || 0).toFixed(2)}`;
+    }
+}
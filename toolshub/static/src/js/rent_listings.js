@@ -1,14 +1,27 @@
 /** @odoo-module **/
 
-import { Component, useState, onMounted } from "@odoo/owl";
+import { Component, useState, useRef, onMounted, onWillUnmount } from "@odoo/owl";
 import { registry } from "@web/core/registry";
 import { rpc } from "@web/core/network/rpc";
 import { ListingCard } from "./listing_card";
+import { VirtualGrid } from "./virtual_grid";
+import { ListingSearch } from "./listing_search";
 import { useService } from "@web/core/utils/hooks";
+import { useDebounced } from "@web/core/utils/timing";
+import { mergeDelta, keysetCompare } from "./delta_sync";
+import { resolveRecords } from "./normalized";
+
+// Milliseconds answers are served from the toolshub_data cache
+const LISTINGS_TTL = 10000;
+const TOOLS_TTL = 60000;
+
+// Last payloads received, kept across mounts and sent back as etag: unchanged data comes back as not_modified
+const toolsCache = { etag: null, tools: [] };
+const listingsCache = new Map(); // JSON of filters and sort -> { etag, data } of the first page
 
 export class RentListings extends Component {
     static template = "toolshub.RentListings";
-    static components = { ListingCard };
+    static components = { ListingCard, VirtualGrid, ListingSearch };
     static props = {
         user: { type: Object, optional: true }
     };
@@ -16,9 +29,22 @@ export class RentListings extends Component {
     setup() {
 
         this.notification = useService("notification");
+        this.busService = useService("bus_service");
+        this.data = useService("toolshub_data");
+        // Filters apply by themselves once the user stops typing
+        this.onFilterInput = useDebounced(() => this.applyFilters(), 400);
+        this.loadMoreSentinel = useRef("loadMoreSentinel");
+        this.onAvailability = this.onAvailability.bind(this);
+        // Bumped by every full load, pages and deltas requested for an older generation are dropped
+        this.listingsGeneration = 0;
 
         this.state = useState({
             listings: [],
+            sort: "newest",
+            nextCursor: null,
+            hasMore: false,
+            syncToken: null,
+            loadingMore: false,
             tools: [],
             plans: [],
             loading: true,
@@ -47,13 +73,60 @@ export class RentListings extends Component {
         onMounted(() => {
             this.loadRentListings();
             this.handleStripeRedirect();
+
+            // Seat counters pushed by the server whenever a rental is created or expires or a listing changes
+            this.busService.subscribe("toolshub/availability", this.onAvailability);
+            this.busService.addChannel("toolshub_marketplace");
+
+            // Infinite scroll: fetch the next page when the sentinel below the grid becomes visible
+            this.observer = new IntersectionObserver((entries) => {
+                if (entries.some((entry) => entry.isIntersecting)) {
+                    this.loadMoreListings();
+                }
+            }, { rootMargin: "400px" });
+            if (this.loadMoreSentinel.el) {
+                this.observer.observe(this.loadMoreSentinel.el);
+            }
+        });
+
+        onWillUnmount(() => {
+            this.observer?.disconnect();
+            this.busService.unsubscribe("toolshub/availability", this.onAvailability);
         });
     }
 
+    get sortOptions() {
+        return [
+            { value: "newest", label: "Newest", field: "id", direction: "desc" },
+            { value: "price_asc", label: "Price: Low to High", field: "price", direction: "asc" },
+            { value: "price_desc", label: "Price: High to Low", field: "price", direction: "desc" },
+            // Unlimited listings show no seat count but are stored, and sorted, with 0 available users
+            { value: "seats", label: "Available Seats", field: "available_users", direction: "desc",
+              sortValue: (listing) => listing.unlimited_users ? 0 : listing.available_users },
+            { value: "popularity", label: "Popularity", field: "subscribers_count", direction: "desc" },
+        ];
+    }
+
+    /**
+     * Patch the cards of the listings in an availability push, listings not loaded here are ignored.
+     */
+    onAvailability(payload) {
+        const changes = new Map(payload.listings.map((change) => [change.id, change]));
+        const patch = (listing) => {
+            const change = listing && changes.get(listing.id);
+            if (change) {
+                listing.available_users = change.available_users;
+                listing.is_active = change.is_active;
+                listing.subscribers_count = change.subscribers_count;
+            }
+        };
+        this.state.listings.forEach(patch);
+        patch(this.state.selectedListing);
+    }
+
     async handleStripeRedirect() {
         const urlParams = new URLSearchParams(window.location.search);
         const paymentStatus = urlParams.get("paymentStatus");
-        const listing_id = urlParams.get("listingId");
         const connectAccountStatus = urlParams.get("connectAccountStatus");
 
         if (paymentStatus === "success") {
@@ -62,15 +135,14 @@ export class RentListings extends Component {
                 title: "Payment Success",
             });
 
-            await rpc("/toolshub/api/createRentRecord", {listing_id});
-
-            await this.loadRentListings();
-
-            this.notification.add("Successfully Rented!", {
-                type: "success",
-                title: "Rent Success",
+            // The rental itself is created server side from the Stripe checkout.session.completed webhook
+            this.notification.add("Your rental is being confirmed and will appear in Rented by Me shortly.", {
+                type: "info",
+                title: "Rent Processing",
             });
 
+            await this.syncListings();
+
         } else if (paymentStatus === "cancelled") {
             this.notification.add("Payment was cancelled.", {
                 type: "warning",
@@ -90,13 +162,45 @@ export class RentListings extends Component {
         }
 }
 
-    async loadRentListings() {
+    async fetchListingsPage(cursor) {
+        return this.data.fetch("/toolshub/api/getRentListings", {
+            filters: this.state.filters,
+            sort: this.state.sort,
+            cursor,
+            normalized: true,
+        }, { channel: "rentListingsMore", ttl: LISTINGS_TTL });
+    }
+
+    async loadRentListings(force = false) {
+        this.listingsGeneration++;
         this.state.loading = true;
+        let superseded = false;
         try {
-            const listingResult = await rpc("/toolshub/api/getRentListings", {filters: this.state.filters});
-
+            const cacheKey = JSON.stringify([this.state.filters, this.state.sort]);
+            const cached = force ? null : listingsCache.get(cacheKey);
+            const listingResult = await this.data.fetch("/toolshub/api/getRentListings", {
+                filters: this.state.filters,
+                sort: this.state.sort,
+                etag: cached?.etag,
+                normalized: true,
+            }, { channel: "rentListings", ttl: force ? 0 : LISTINGS_TTL });
+
+            if (!listingResult) {
+                // A newer filter or sort replaced this request
+                superseded = true;
+                return;
+            }
             if(listingResult.success) {
-                this.state.listings = listingResult.data.listings
+                let data = listingResult.data;
+                if (data.not_modified) {
+                    data = cached.data;
+                } else {
+                    listingsCache.set(cacheKey, { etag: data.etag, data });
+                }
+                this.state.listings = resolveRecords(data, "listings");
+                this.state.nextCursor = data.next_cursor;
+                this.state.hasMore = data.has_more;
+                this.state.syncToken = data.sync_token;
             }
             else {
                 this.notification.add(listingResult.data.message, {type: 'danger', title: 'Error'});
@@ -106,17 +210,108 @@ export class RentListings extends Component {
             this.notification.add("Unexpected Error Occured while loading Rent Listings", {type: 'danger', title: 'Error'});
             console.error('Error loading listings data:', error);
         } finally {
-            this.state.loading = false;
+            if (!superseded) {
+                this.state.loading = false;
+            }
         }
     }
 
+    /**
+     * Bring the loaded listings up to date with only what changed since the last answer,
+     * falls back to a full reload when there is no token yet or the server asks for it.
+     */
+    async syncListings() {
+        if (!this.state.syncToken) {
+            return this.loadRentListings(true);
+        }
+        const generation = this.listingsGeneration;
+        try {
+            const deltaResult = await this.data.fetch("/toolshub/api/getRentListings", {
+                filters: this.state.filters,
+                sort: this.state.sort,
+                since: this.state.syncToken,
+                normalized: true,
+            }, { channel: "rentListingsSync" });
+
+            if (!deltaResult || generation !== this.listingsGeneration) {
+                // Superseded, or the filters changed while the delta was on its way
+                return;
+            }
+            if (!deltaResult.success) {
+                this.notification.add(deltaResult.data.message, {type: 'danger', title: 'Error'});
+                return;
+            }
+            if (deltaResult.data.reset) {
+                return this.loadRentListings(true);
+            }
+
+            const sortOption = this.sortOptions.find((option) => option.value === this.state.sort);
+            this.state.listings = mergeDelta(
+                this.state.listings,
+                resolveRecords(deltaResult.data, "listings"),
+                deltaResult.data.removed,
+                keysetCompare(sortOption.field, sortOption.direction, sortOption.sortValue),
+            );
+            this.state.syncToken = deltaResult.data.sync_token;
+            // The cached first page no longer matches what is displayed
+            listingsCache.delete(JSON.stringify([this.state.filters, this.state.sort]));
+
+        } catch (error) {
+            console.error('Error syncing listings:', error);
+            if (generation === this.listingsGeneration) {
+                await this.loadRentListings(true);
+            }
+        }
+    }
+
+    async loadMoreListings() {
+        if (this.state.loading || this.state.loadingMore || !this.state.hasMore) {
+            return;
+        }
+        this.state.loadingMore = true;
+        const generation = this.listingsGeneration;
+        try {
+            const listingResult = await this.fetchListingsPage(this.state.nextCursor);
+
+            if (!listingResult || generation !== this.listingsGeneration) {
+                // This page belongs to filters or a sort that are no longer displayed
+                return;
+            }
+            if(listingResult.success) {
+                // A delta may already have brought some of these listings in
+                const loadedIds = new Set(this.state.listings.map((listing) => listing.id));
+                this.state.listings.push(...resolveRecords(listingResult.data, "listings").filter((listing) => !loadedIds.has(listing.id)));
+                this.state.nextCursor = listingResult.data.next_cursor;
+                this.state.hasMore = listingResult.data.has_more;
+            }
+            else {
+                this.notification.add(listingResult.data.message, {type: 'danger', title: 'Error'});
+            }
+
+        } catch (error) {
+            this.notification.add("Unexpected Error Occured while loading Rent Listings", {type: 'danger', title: 'Error'});
+            console.error('Error loading more listings:', error);
+        } finally {
+            this.state.loadingMore = false;
+        }
+    }
+
+    async onSortChange(ev) {
+        this.state.sort = ev.target.value;
+        await this.loadRentListings();
+    }
+
     async loadTools() {
         try {
 
-            const toolsResult = await rpc("/toolshub/api/getTools")
+            const toolsResult = await this.data.fetch("/toolshub/api/getTools", {etag: toolsCache.etag}, { ttl: TOOLS_TTL });
 
             if(toolsResult.success) {
-                this.state.tools = toolsResult.data.tools
+                if (!toolsResult.data.not_modified) {
+                    toolsCache.etag = toolsResult.data.etag;
+                    toolsCache.tools = toolsResult.data.tools;
+                }
+                this.state.tools = toolsCache.tools
             }
             else {
                 this.notification.add(toolsResult.data.message, {type: 'danger', title:'Error'});
@@ -137,8 +332,15 @@ export class RentListings extends Component {
         return this.selectedTool?.plan_ids || [];
     }
 
+    get visibleListings() {
+        // Listings of other users only show while they can be rented
+        return this.state.listings.filter(
+            (listing) => (listing.is_active && !this.isFull(listing)) || listing.owner_id === this.props.user.id
+        );
+    }
+
     isFull(listing) {
-        return listing.available_users <= 0;
+        return !listing.unlimited_users && listing.available_users <= 0;
     }
 
     openCreateModal() {
@@ -264,7 +466,8 @@ export class RentListings extends Component {
     
             if(result.success) {
                 this.notification.add(result.data.message, {type: "success", title: "Listing Created"});
-                this.loadRentListings();
+                this.data.invalidate("/toolshub/api/getRentListings");
+                this.syncListings();
                 this.closeCreateModal();
             }
             else {
@@ -2,9 +2,17 @@
 
 import { Component, useState, onMounted} from "@odoo/owl";
 import { useService } from "@web/core/utils/hooks";
-import { rpc } from "@web/core/network/rpc";
+import { useDebounced } from "@web/core/utils/timing";
 import { ListingCard } from "./listing_card";
 import { registry } from "@web/core/registry";
+import { mergeDelta } from "./delta_sync";
+import { resolveRecords } from "./normalized";
+
+// Milliseconds answers are served from the toolshub_data cache
+const RENTALS_TTL = 10000;
+
+// Rentals of the last visit, merged with deltas on the next mount instead of reloading the whole list
+const rentedToolsCache = { filtersKey: null, syncToken: null, records: [] };
 
 export class RentedByMe extends Component {
     static template = "toolshub.RentedByMe";
@@ -12,6 +20,9 @@ export class RentedByMe extends Component {
 
     setup() {
         this.notification = useService("notification");
+        this.data = useService("toolshub_data");
+        // Filters apply by themselves once the user stops typing
+        this.onFilterInput = useDebounced(() => this.applyFilters(), 400);
 
         this.state = useState({
             loading: true,
@@ -28,28 +39,73 @@ export class RentedByMe extends Component {
         });
 
         onMounted(() => {
-            this.loadRentedTools();
+            this.syncRentedTools();
         });
     }
 
     async loadRentedTools() {
         this.state.loading = true;
+        let superseded = false;
         try {
 
-            const rentedToolsResult = await rpc("/toolshub/api/getRentedTools", {filters: this.state.filters});
+            const result = await this.data.fetch("/toolshub/api/getRentedTools", {filters: this.state.filters, normalized: true}, { channel: "rentedTools", ttl: RENTALS_TTL });
 
-            if(rentedToolsResult.success) {
-                this.state.rentedTools = rentedToolsResult.data.rented_tools;
+            if (!result) {
+                // Newer filters replaced this request
+                superseded = true;
+                return;
+            }
+            if(result.success) {
+                this.state.rentedTools = resolveRecords(result.data, "rented_tools", "listing");
+                rentedToolsCache.filtersKey = JSON.stringify(this.state.filters);
+                rentedToolsCache.syncToken = result.data.sync_token;
+                rentedToolsCache.records = this.state.rentedTools;
             }
             else {
-                this.notification.add(rentedToolsResult.data.message, {type: 'danger', title: 'Error'});
+                this.notification.add(result.data.message, {type: 'danger', title: 'Error'});
             }
             
         } catch (error) {
             this.notification.add("Unexpected Error Occured while loading Rented Tools", {type: 'danger', title: 'Error'});
             console.error('Error loading rented tools data:', error);
         } finally {
-            this.state.loading = false;
+            if (!superseded) {
+                this.state.loading = false;
+            }
+        }
+    }
+
+    /**
+     * Show the rentals kept from the last visit right away and only fetch what changed since,
+     * falls back to a full load when nothing is cached for these filters or the server asks for it.
+     */
+    async syncRentedTools() {
+        if (!rentedToolsCache.syncToken || rentedToolsCache.filtersKey !== JSON.stringify(this.state.filters)) {
+            return this.loadRentedTools();
+        }
+        this.state.rentedTools = rentedToolsCache.records;
+        this.state.loading = false;
+        try {
+            const result = await this.data.fetch("/toolshub/api/getRentedTools", {filters: this.state.filters, since: rentedToolsCache.syncToken, normalized: true}, { channel: "rentedTools" });
+
+            if (!result) {
+                return;
+            }
+            if (!result.success) {
+                this.notification.add(result.data.message, {type: 'danger', title: 'Error'});
+                return;
+            }
+            if (result.data.reset) {
+                return this.loadRentedTools();
+            }
+
+            rentedToolsCache.records = mergeDelta(rentedToolsCache.records, resolveRecords(result.data, "rented_tools", "listing"), result.data.removed, (a, b) => b.id - a.id);
+            rentedToolsCache.syncToken = result.data.sync_token;
+            this.state.rentedTools = rentedToolsCache.records;
+
+        } catch (error) {
+            console.error('Error syncing rented tools:', error);
+            await this.loadRentedTools();
         }
     }
 
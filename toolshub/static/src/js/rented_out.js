@@ -2,9 +2,18 @@
 
 import { Component, useState, onMounted} from "@odoo/owl";
 import { useService } from "@web/core/utils/hooks";
+import { useDebounced } from "@web/core/utils/timing";
 import { rpc } from "@web/core/network/rpc";
 import { ListingCard } from "./listing_card";
 import { registry } from "@web/core/registry";
+import { mergeDelta } from "./delta_sync";
+import { resolveRecords } from "./normalized";
+
+// Milliseconds answers are served from the toolshub_data cache
+const RENTALS_TTL = 10000;
+
+// Rentals of the last visit, merged with deltas on the next mount instead of reloading the whole list
+const rentedOutToolsCache = { filtersKey: null, syncToken: null, records: [] };
 
 export class RentedOut extends Component {
     static template = "toolshub.RentedOut";
@@ -12,6 +21,9 @@ export class RentedOut extends Component {
 
     setup() {
         this.notification = useService("notification");
+        this.data = useService("toolshub_data");
+        // Filters apply by themselves once the user stops typing
+        this.onFilterInput = useDebounced(() => this.applyFilters(), 400);
 
         this.state = useState({
             loading: true,
@@ -30,28 +42,73 @@ export class RentedOut extends Component {
         });
 
         onMounted(() => {
-            this.loadRentedOutTools();
+            this.syncRentedOutTools();
         });
     }
 
     async loadRentedOutTools() {
         this.state.loading = true;
+        let superseded = false;
         try {
 
-            const rentedOutToolsResult = await rpc("/toolshub/api/getRentedOutTools", {filters: this.state.filters});
+            const result = await this.data.fetch("/toolshub/api/getRentedOutTools", {filters: this.state.filters, normalized: true}, { channel: "rentedOutTools", ttl: RENTALS_TTL });
 
-            if(rentedOutToolsResult.success) {
-                this.state.rentedOutTools = rentedOutToolsResult.data.rented_out_tools;
+            if (!result) {
+                // Newer filters replaced this request
+                superseded = true;
+                return;
+            }
+            if(result.success) {
+                this.state.rentedOutTools = resolveRecords(result.data, "rented_out_tools", "listing");
+                rentedOutToolsCache.filtersKey = JSON.stringify(this.state.filters);
+                rentedOutToolsCache.syncToken = result.data.sync_token;
+                rentedOutToolsCache.records = this.state.rentedOutTools;
             }
             else {
-                this.notification.add(rentedOutToolsResult.data.message, {type: 'danger', title: 'Error'});
+                this.notification.add(result.data.message, {type: 'danger', title: 'Error'});
             }
             
         } catch (error) {
             this.notification.add("Unexpected Error Occured while loading Rented Out Tools", {type: 'danger', title: 'Error'});
             console.error('Error loading rented out tools data:', error);
         } finally {
-            this.state.loading = false;
+            if (!superseded) {
+                this.state.loading = false;
+            }
+        }
+    }
+
+    /**
+     * Show the rentals kept from the last visit right away and only fetch what changed since,
+     * falls back to a full load when nothing is cached for these filters or the server asks for it.
+     */
+    async syncRentedOutTools() {
+        if (!rentedOutToolsCache.syncToken || rentedOutToolsCache.filtersKey !== JSON.stringify(this.state.filters)) {
+            return this.loadRentedOutTools();
+        }
+        this.state.rentedOutTools = rentedOutToolsCache.records;
+        this.state.loading = false;
+        try {
+            const result = await this.data.fetch("/toolshub/api/getRentedOutTools", {filters: this.state.filters, since: rentedOutToolsCache.syncToken, normalized: true}, { channel: "rentedOutTools" });
+
+            if (!result) {
+                return;
+            }
+            if (!result.success) {
+                this.notification.add(result.data.message, {type: 'danger', title: 'Error'});
+                return;
+            }
+            if (result.data.reset) {
+                return this.loadRentedOutTools();
+            }
+
+            rentedOutToolsCache.records = mergeDelta(rentedOutToolsCache.records, resolveRecords(result.data, "rented_out_tools", "listing"), result.data.removed, (a, b) => b.id - a.id);
+            rentedOutToolsCache.syncToken = result.data.sync_token;
+            this.state.rentedOutTools = rentedOutToolsCache.records;
+
+        } catch (error) {
+            console.error('Error syncing rented out tools:', error);
+            await this.loadRentedOutTools();
         }
     }
 
@@ -92,6 +149,7 @@ export class RentedOut extends Component {
                     type: "success",
                     title: "Credentials Updated"
                 });
+                this.data.invalidate("/toolshub/api/getRentedOutTools");
 
                 // Update the listing in state
                 const rentedOutToolIndex = this.state.rentedOutTools.findIndex(tool => tool.id === this.state.selectedTool.id);
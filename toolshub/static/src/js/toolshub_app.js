@@ -9,6 +9,7 @@ import { RentListings } from "./rent_listings";
 import { useService } from "@web/core/utils/hooks";
 import { RentedByMe } from "./rented_by_me";
 import { RentedOut } from "./rented_out";
+import { OwnerStats } from "./owner_stats";
 
 export class ToolshubApp extends Component {
     static template = "toolshub.ToolshubApp";
@@ -18,6 +19,7 @@ export class ToolshubApp extends Component {
         RentListings,
         RentedByMe,
         RentedOut,
+        OwnerStats,
     };
 
     setup() {
@@ -67,6 +69,12 @@ export class ToolshubApp extends Component {
                 title: "Account Activation Failed",
             });
         }
+        else if(tokenError === 'expired') {
+            this.notification.add("Activation Link has Expired", {
+                type: "error",
+                title: "Account Activation Failed",
+            });
+        }
         else if(tokenError === 'user_not_found') {
             this.notification.add("Account Not Found", {
                 type: "error",
@@ -0,0 +1,217 @@
+/** @odoo-module **/
+
+import { Component, useState, useRef, onMounted, onPatched, onWillUnmount } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+
+/**
+ * Windowed grid: only the rows in or near the viewport are mounted, the rest of the list is
+ * represented by the height of the container. Rows are keyed by their slot in the window
+ * (row index modulo window size), so scrolling hands the rows that left the window to the rows
+ * that entered it and OWL updates their props instead of mounting new components.
+ * Rows take the height of their tallest item: every rendered row is measured, a ResizeObserver
+ * follows later changes (images, fonts), and rows never rendered count as estimatedItemHeight.
+ * The offset of each row is the sum of the heights above it. The page (window) is the scroll container.
+ */
+export class VirtualGrid extends Component {
+    static template = "toolshub.VirtualGrid";
+    static props = {
+        items: { type: Array },
+        estimatedItemHeight: { type: Number, optional: true },
+        minColumnWidth: { type: Number, optional: true },
+        gap: { type: Number, optional: true },
+        overscanRows: { type: Number, optional: true },
+        slots: { type: Object },
+    };
+    static defaultProps = {
+        estimatedItemHeight: 420,
+        minColumnWidth: 320,
+        gap: 24,
+        overscanRows: 2,
+    };
+
+    setup() {
+        this.root = useRef("root");
+        // layoutVersion moves whenever a row height changed, so the offsets are rendered again
+        this.state = useState({ columns: 1, firstRow: 0, lastRow: 0, layoutVersion: 0 });
+        // Row index -> measured height, for the current number of columns
+        this.rowHeights = new Map();
+        this.offsets = null;
+        this.onScroll = this.onScroll.bind(this);
+        this.resizeObserver = new ResizeObserver((entries) => this.onRowsResized(entries));
+
+        onMounted(() => {
+            window.addEventListener("scroll", this.onScroll, { passive: true });
+            window.addEventListener("resize", this.onScroll, { passive: true });
+            this.measureRows();
+            this.measure();
+        });
+        // The items may have changed (next page, filters): the window only moves when the measure differs
+        onPatched(() => {
+            this.measureRows();
+            this.measure();
+        });
+        onWillUnmount(() => {
+            window.removeEventListener("scroll", this.onScroll);
+            window.removeEventListener("resize", this.onScroll);
+            cancelAnimationFrame(this.frame);
+            this.resizeObserver.disconnect();
+        });
+    }
+
+    get rowCount() {
+        return Math.ceil(this.props.items.length / this.state.columns);
+    }
+
+    /**
+     * Top of each row relative to the grid, one more entry for the end of the last row (gap included)
+     */
+    get rowOffsets() {
+        const rowCount = this.rowCount;
+        if (!this.offsets || this.offsets.length !== rowCount + 1) {
+            const { estimatedItemHeight, gap } = this.props;
+            const offsets = new Float64Array(rowCount + 1);
+            for (let row = 0; row < rowCount; row++) {
+                offsets[row + 1] = offsets[row] + (this.rowHeights.get(row) ?? estimatedItemHeight) + gap;
+            }
+            this.offsets = offsets;
+        }
+        return this.offsets;
+    }
+
+    get totalHeight() {
+        // Read so that a row height change renders the grid again
+        void this.state.layoutVersion;
+        return Math.max(this.rowOffsets[this.rowCount] - this.props.gap, 0);
+    }
+
+    get visibleRows() {
+        const { columns, firstRow, lastRow } = this.state;
+        const size = lastRow - firstRow + 1;
+        const lastIndex = Math.min(lastRow, this.rowCount - 1);
+        const rows = [];
+        for (let row = firstRow; row <= lastIndex; row++) {
+            const items = this.props.items.slice(row * columns, (row + 1) * columns);
+            rows.push({
+                slot: row % size,
+                index: row,
+                cells: items.map((item, column) => ({ column, item })),
+            });
+        }
+        return rows;
+    }
+
+    get windowStyle() {
+        return [
+            `gap: ${this.props.gap}px`,
+            `transform: translateY(${this.rowOffsets[this.state.firstRow] || 0}px)`,
+        ].join("; ");
+    }
+
+    get rowStyle() {
+        return [
+            `grid-template-columns: repeat(${this.state.columns}, minmax(0, 1fr))`,
+            `gap: ${this.props.gap}px`,
+        ].join("; ");
+    }
+
+    /**
+     * Index of the row at y pixels from the top of the grid
+     */
+    rowAt(y) {
+        const offsets = this.rowOffsets;
+        let low = 0;
+        let high = this.rowCount - 1;
+        while (low < high) {
+            const middle = (low + high + 1) >> 1;
+            if (offsets[middle] <= y) {
+                low = middle;
+            } else {
+                high = middle - 1;
+            }
+        }
+        return Math.max(low, 0);
+    }
+
+    /**
+     * Record the height of the rendered rows, a reused row element now shows another row index
+     */
+    measureRows() {
+        const el = this.root.el;
+        if (!el) {
+            return;
+        }
+        this.resizeObserver.disconnect();
+        let changed = false;
+        for (const rowEl of el.querySelectorAll(":scope > .virtual-grid-window > .virtual-grid-row")) {
+            this.resizeObserver.observe(rowEl);
+            changed = this.setRowHeight(Number(rowEl.dataset.row), rowEl.offsetHeight) || changed;
+        }
+        if (changed) {
+            this.layoutChanged();
+        }
+    }
+
+    onRowsResized(entries) {
+        let changed = false;
+        for (const entry of entries) {
+            if (entry.target.isConnected) {
+                changed = this.setRowHeight(Number(entry.target.dataset.row), entry.target.offsetHeight) || changed;
+            }
+        }
+        if (changed) {
+            this.layoutChanged();
+            this.onScroll();
+        }
+    }
+
+    setRowHeight(row, height) {
+        if (!height || this.rowHeights.get(row) === height) {
+            return false;
+        }
+        this.rowHeights.set(row, height);
+        return true;
+    }
+
+    layoutChanged() {
+        this.offsets = null;
+        this.state.layoutVersion++;
+    }
+
+    onScroll() {
+        // One measurement per frame whatever the number of scroll events
+        if (!this.frame) {
+            this.frame = requestAnimationFrame(() => {
+                this.frame = null;
+                this.measure();
+            });
+        }
+    }
+
+    measure() {
+        const el = this.root.el;
+        if (!el) {
+            return;
+        }
+        const rect = el.getBoundingClientRect();
+        const { gap, minColumnWidth, overscanRows } = this.props;
+        const columns = Math.max(1, Math.floor((rect.width + gap) / (minColumnWidth + gap)));
+        if (columns !== this.state.columns) {
+            // Items move to other rows, the measured heights no longer apply
+            this.rowHeights.clear();
+            this.offsets = null;
+            this.state.columns = columns;
+        }
+        const rowCount = this.rowCount;
+
+        const firstVisible = this.rowAt(Math.max(-rect.top, 0));
+        const lastVisible = this.rowAt(Math.max(window.innerHeight - rect.top, 0));
+        const firstRow = Math.max(0, Math.min(firstVisible - overscanRows, rowCount - 1));
+        const lastRow = Math.max(firstRow, Math.min(lastVisible + overscanRows, rowCount - 1));
+
+        if (firstRow !== this.state.firstRow || lastRow !== this.state.lastRow) {
+            Object.assign(this.state, { firstRow, lastRow });
+        }
+    }
+}
+
+registry.category("public_components").add("toolshub.VirtualGrid", VirtualGrid);
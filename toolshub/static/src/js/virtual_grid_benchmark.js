@@ -0,0 +1,141 @@
+/** @odoo-module **/
+
+import { Component, useState } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { ListingCard } from "./listing_card";
+import { VirtualGrid } from "./virtual_grid";
+
+// Frames longer than this miss a 60Hz refresh
+const FRAME_BUDGET_MS = 1000 / 60;
+
+function nextFrame() {
+    return new Promise((resolve) => requestAnimationFrame(resolve));
+}
+
+function percentile(sorted, ratio) {
+    return sorted.length ? sorted[Math.max(Math.ceil(sorted.length * ratio) - 1, 0)] : 0;
+}
+
+const FEATURE_NAMES = ["SSO", "Priority support", "Unlimited projects", "API access", "Audit log", "Custom domains"];
+
+/**
+ * Synthetic listings shaped like the getRentListings payload. Names and feature lists vary in
+ * length, so the cards wrap to different heights like real ones.
+ */
+export function syntheticListings(count) {
+    const listings = [];
+    for (let id = 1; id <= count; id++) {
+        const unlimited = id % 7 === 0;
+        const featureCount = (id * 7) % 13;
+        listings.push({
+            id,
+            tool_id: id % 50,
+            tool_name: `Tool ${id % 50}` + " with a longer name".repeat(id % 4),
+            tool_img_url: false,
+            plan_id: id % 200,
+            plan_name: `Plan ${id % 200}` + " Enterprise".repeat(id % 3),
+            plan_features: Array.from({ length: featureCount }, (_, index) => ({
+                id: index + 1,
+                name: FEATURE_NAMES[(id + index) % FEATURE_NAMES.length],
+            })),
+            unlimited_access: id % 3 === 0,
+            duration_years: 0,
+            duration_months: id % 12,
+            duration_days: id % 30,
+            is_active: true,
+            price: (id % 100) + 0.99,
+            currency_symbol: "$",
+            subscribers_count: id % 5,
+            unlimited_users: unlimited,
+            available_users: unlimited ? null : 1 + (id % 9),
+            owner_id: 0,
+            owner_name: `Owner ${id % 300}` + " of a team".repeat(id % 5),
+            owner_connect_account_id: false,
+        });
+    }
+    return listings;
+}
+
+/**
+ * Renders N synthetic listings with the windowed grid or with every card mounted,
+ * scrolls the page programmatically and reports the frame times.
+ * Open /toolshub/benchmark/grid?count=10000, results are also left in window.toolshubGridBenchmark.
+ */
+export class VirtualGridBenchmark extends Component {
+    static template = "toolshub.VirtualGridBenchmark";
+    static components = { ListingCard, VirtualGrid };
+    static props = {};
+
+    setup() {
+        const params = new URLSearchParams(window.location.search);
+        this.state = useState({
+            count: parseInt(params.get("count")) || 10000,
+            frames: parseInt(params.get("frames")) || 600,
+            mode: null,
+            items: [],
+            running: false,
+            results: [],
+        });
+    }
+
+    get resultsJson() {
+        return JSON.stringify(this.state.results, null, 2);
+    }
+
+    noop() {}
+
+    async run(mode) {
+        this.state.running = true;
+        this.state.mode = null;
+        this.state.items = [];
+        window.scrollTo(0, 0);
+        await nextFrame();
+
+        const listings = syntheticListings(this.state.count);
+        const renderStart = performance.now();
+        this.state.mode = mode;
+        this.state.items = listings;
+        // Rendered once the frame after the patch is about to be painted
+        await nextFrame();
+        await nextFrame();
+        const firstPaint = performance.now() - renderStart;
+
+        const step = Math.max(
+            (document.documentElement.scrollHeight - window.innerHeight) / this.state.frames, 1
+        );
+        const frameTimes = [];
+        let last = performance.now();
+        for (let frame = 0; frame < this.state.frames; frame++) {
+            window.scrollBy(0, step);
+            await nextFrame();
+            const now = performance.now();
+            frameTimes.push(now - last);
+            last = now;
+        }
+
+        const sorted = [...frameTimes].sort((a, b) => a - b);
+        const round = (value) => Math.round(value * 100) / 100;
+        const result = {
+            mode,
+            listings: this.state.count,
+            dom_nodes: document.getElementsByTagName("*").length,
+            first_paint_ms: round(firstPaint),
+            frames: frameTimes.length,
+            frame_p50_ms: round(percentile(sorted, 0.5)),
+            frame_p95_ms: round(percentile(sorted, 0.95)),
+            frame_p99_ms: round(percentile(sorted, 0.99)),
+            frame_max_ms: round(sorted[sorted.length - 1] || 0),
+            dropped_frames: frameTimes.filter((time) => time > FRAME_BUDGET_MS * 1.5).length,
+        };
+        this.state.results.push(result);
+        window.toolshubGridBenchmark = this.state.results;
+        console.log("[toolshub grid benchmark]", result);
+
+        this.state.mode = null;
+        this.state.items = [];
+        window.scrollTo(0, 0);
+        this.state.running = false;
+    }
+}
+
+registry.category("public_components").add("toolshub.VirtualGridBenchmark", VirtualGridBenchmark);
@@ -0,0 +1,7 @@
+from . import test_catalog
+from . import test_expiry_recompute
+from . import test_indexes
+from . import test_owner_stats
+from . import test_payloads
+from . import test_plan_constraints
+from . import test_rent_seat
@@ -0,0 +1,38 @@
+from odoo.tests.common import TransactionCase
+
+
+class ToolshubCase(TransactionCase):
+    """Marketplace fixtures: a tool with a limited plan, and helpers to list and rent it"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.owner = cls.env.ref('base.user_admin')
+        cls.lender = cls.env['res.users'].with_context(no_reset_password=True).create({
+            'name': "Toolshub Lender",
+            'login': 'toolshub_test_lender@example.com',
+            'groups_id': [(6, 0, [cls.env.ref('base.group_portal').id])],
+        })
+        cls.tool = cls.env['toolshub.tools'].create({
+            'name': "Toolshub Test Tool",
+            'image_url': 'https://example.com/tool.png',
+        })
+        cls.plan = cls.env['toolshub.tool.plans'].create({
+            'name': "Team",
+            'tool_id': cls.tool.id,
+            'total_users': 10,
+            'price': 30,
+            'is_unlimited': False,
+            'duration_months': 1,
+        })
+
+    @classmethod
+    def _create_listing(cls, total_users=3, **vals):
+        return cls.env['toolshub.tool.rent.listings'].create({
+            'tool_id': cls.tool.id,
+            'plan_id': cls.plan.id,
+            'total_users': total_users,
+            'price': 5,
+            'owner_id': cls.owner.id,
+            **vals,
+        })
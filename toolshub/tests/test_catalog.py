@@ -0,0 +1,20 @@
+from odoo.tests import tagged
+
+from .common import ToolshubCase
+
+
+@tagged('post_install', '-at_install')
+class TestCatalog(ToolshubCase):
+
+    def _catalog_row(self, listing):
+        return listing._get_listing_payloads()[0]
+
+    def test_owner_name_follows_partner(self):
+        listing = self._create_listing()
+        self.owner.partner_id.name = "Renamed Owner"
+        self.assertEqual(self._catalog_row(listing)['owner_name'], "Renamed Owner")
+
+    def test_currency_symbol_follows_currency(self):
+        listing = self._create_listing()
+        listing.currency_id.symbol = "¤"
+        self.assertEqual(self._catalog_row(listing)['currency_symbol'], "¤")
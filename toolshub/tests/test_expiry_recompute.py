@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from odoo.tests import tagged
+
+from .common import ToolshubCase
+
+
+@tagged('post_install', '-at_install')
+class TestExpiryRecompute(ToolshubCase):
+
+    def _job(self):
+        return self.env['toolshub.expiry.recompute'].search([('plan_id', '=', self.plan.id), ('state', '=', 'pending')])
+
+    def _expire(self, rental, days_ago):
+        """Make rental one the expiry cron deactivated days_ago, rented a month before"""
+        rental.write({'is_active': False})
+        self.env.flush_all()
+        expiry = self.env.cr.now() - timedelta(days=days_ago)
+        self.env.cr.execute("UPDATE toolshub_rented_tools SET rented_date = %s, expiry_date = %s WHERE id = %s",
+                            [expiry - timedelta(days=30), expiry, rental.id])
+        rental.invalidate_recordset()
+
+    def test_batches_and_resume(self):
+        listing = self._create_listing(total_users=5)
+        rentals = self.env['toolshub.rented.tools'].concat(*(listing._rent_seat(self.lender) for __ in range(5)))
+
+        self.plan.write({'duration_months': 2})
+        job = self._job()
+        self.assertEqual(job.rentals_total, 5)
+
+        self.assertEqual(job._process_batch(2), 2)
+        self.assertEqual(job.last_rental_id, rentals[1].id)
+
+        # A batch interrupted before its commit leaves the cursor and the rentals as they were
+        with self.assertRaises(RuntimeError), self.env.cr.savepoint():
+            job._process_batch(2)
+            raise RuntimeError("Worker restarted")
+        self.env.invalidate_all()
+        self.assertEqual(job.last_rental_id, rentals[1].id)
+        self.assertEqual(rentals[2].expiry_date, rentals[2].rented_date + timedelta(days=30))
+
+        self.assertEqual(job._process_batch(2), 2)
+        self.assertEqual(job._process_batch(2), 1)
+        self.assertEqual(job._process_batch(2), 0)
+        self.assertEqual((job.state, job.rentals_done), ('done', 5))
+        for rental in rentals:
+            self.assertEqual(rental.expiry_date, rental.rented_date + timedelta(days=60))
+
+    def test_plan_change_restarts_pending_job(self):
+        listing = self._create_listing(total_users=3)
+        listing._rent_seat(self.lender)
+        listing._rent_seat(self.lender)
+
+        self.plan.write({'duration_months': 2})
+        job = self._job()
+        job._process_batch(1)
+        self.plan.write({'duration_months': 3})
+
+        self.assertEqual(self._job(), job)
+        self.assertEqual((job.last_rental_id, job.rentals_done), (0, 0))
+
+    def test_extended_rentals_take_their_seat_back(self):
+        listing = self._create_listing(total_users=2)
+        rental = listing._rent_seat(self.lender)
+        self._expire(rental, days_ago=10)
+        self.assertEqual(listing.subscribers_count, 0)
+
+        self.plan.write({'duration_months': 3})
+        self._job()._process_batch(10)
+
+        self.assertTrue(rental.is_active)
+        self.assertEqual(listing.subscribers_count, 1)
+        self.assertEqual(listing.available_users, 1)
+
+    def test_extended_rentals_never_oversell(self):
+        listing = self._create_listing(total_users=1)
+        rental = listing._rent_seat(self.lender)
+        self._expire(rental, days_ago=10)
+        self.env['toolshub.rented.tools'].create({'rent_listing_id': listing.id, 'lender_id': self.lender.id})
+
+        self.plan.write({'duration_months': 3})
+        self._job()._process_batch(10)
+
+        # The seat went to the newer rental, the extended one stays inactive
+        self.assertFalse(rental.is_active)
+        self.assertEqual(listing.subscribers_count, 1)
+        self.assertEqual(listing.available_users, 0)
+
+    def test_rentals_deactivated_before_expiry_stay_inactive(self):
+        listing = self._create_listing(total_users=2)
+        rental = listing._rent_seat(self.lender)
+        rental.write({'is_active': False})
+
+        self.plan.write({'duration_months': 3})
+        self._job()._process_batch(10)
+
+        self.assertFalse(rental.is_active)
+        self.assertEqual(listing.subscribers_count, 0)
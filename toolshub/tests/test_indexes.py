@@ -0,0 +1,95 @@
+from odoo.tests import tagged
+from odoo.tools import SQL
+
+from ..controllers.toolshub_api import _listing_visibility_domain
+from .common import ToolshubCase
+
+
+@tagged('post_install', '-at_install')
+class TestIndexes(ToolshubCase):
+    """The main query of each list endpoint reads its table through an index on a sizeable, analyzed dataset"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        users = cls.env['res.users'].with_context(no_reset_password=True).create([{
+            'name': f"Toolshub Index User {index}",
+            'login': f'toolshub_index_{index}@example.com',
+            'groups_id': [(6, 0, [cls.env.ref('base.group_portal').id])],
+        } for index in range(50)])
+        cls.user_id = users[0].id
+        cr = cls.env.cr
+        cr.execute("""
+            INSERT INTO toolshub_tools (name, image_url)
+            SELECT 'Index Tool ' || g, 'https://example.com/' || g FROM generate_series(1, 2000) g
+            RETURNING id
+        """)
+        tool_ids = [tool_id for (tool_id,) in cr.fetchall()]
+        cls.tool_id = tool_ids[0]
+        cr.execute("""
+            INSERT INTO toolshub_tool_plans (name, tool_id, total_users, unlimited_users, price, currency_id,
+                                             duration_years, duration_months, duration_days, is_unlimited,
+                                             total_duration_days)
+            SELECT 'Plan ' || k, t.id, 50, FALSE, k * 10, %s, 0, 1, 0, FALSE, 30
+            FROM unnest(%s::int[]) t(id), generate_series(1, 3) k
+            RETURNING id, tool_id
+        """, [cls.env.company.currency_id.id, tool_ids])
+        plans = cr.fetchall()
+        cr.execute("""
+            INSERT INTO toolshub_tool_rent_listings (tool_id, plan_id, subscribers_count, total_users, unlimited_users,
+                                                     available_users, is_active, currency_id, price, owner_id)
+            SELECT (%(plans)s::int[][])[1 + g %% %(plan_count)s][2], (%(plans)s::int[][])[1 + g %% %(plan_count)s][1],
+                   0, 20, FALSE, 20, g %% 10 <> 0, %(currency)s, 1 + g %% 97, (%(users)s::int[])[1 + g %% 50]
+            FROM generate_series(1, 20000) g
+            RETURNING id
+        """, {'plans': [list(plan) for plan in plans], 'plan_count': len(plans),
+              'currency': cls.env.company.currency_id.id, 'users': users.ids})
+        listing_ids = [listing_id for (listing_id,) in cr.fetchall()]
+        cr.execute("""
+            INSERT INTO toolshub_rented_tools (rent_listing_id, lender_id, is_active, rented_date)
+            SELECT (%(listings)s::int[])[1 + g %% %(listing_count)s], (%(users)s::int[])[1 + (g / 7) %% 50],
+                   g %% 3 <> 0, (now() at time zone 'UTC') - g * interval '1 minute'
+            FROM generate_series(1, 50000) g
+        """, {'listings': listing_ids, 'listing_count': len(listing_ids), 'users': users.ids})
+        cls.env['toolshub.listing.catalog']._refresh()
+        for table in ('toolshub_tools', 'toolshub_tool_plans', 'toolshub_tool_rent_listings',
+                      'toolshub_rented_tools', 'toolshub_listing_catalog'):
+            cr.execute(SQL("ANALYZE %s", SQL.identifier(table)))
+
+    def _plan_nodes(self, query):
+        self.env.cr.execute(SQL("EXPLAIN (FORMAT JSON) %s", query))
+        nodes, stack = [], [self.env.cr.fetchone()[0][0]['Plan']]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(node.get('Plans', []))
+        return nodes
+
+    def assertIndexed(self, model, domain, order, limit=None, tables=None):
+        query = self.env[model]._search(domain, order=order, limit=limit).select()
+        nodes = self._plan_nodes(query)
+        for table in tables or [self.env[model]._table]:
+            scans = [node for node in nodes if node.get('Relation Name') == table]
+            self.assertTrue(scans, f"{table} is not read by the query of {model}")
+            self.assertNotIn('Seq Scan', [node['Node Type'] for node in scans],
+                             f"{table} is read sequentially by {query.code}")
+
+    def test_rented_tools(self):
+        self.assertIndexed('toolshub.rented.tools', [('lender_id', '=', self.user_id)], 'id desc')
+
+    def test_rented_out_tools(self):
+        self.assertIndexed('toolshub.rented.tools', [('rent_listing_id.owner_id', '=', self.user_id)], 'id desc',
+                           tables=['toolshub_rented_tools', 'toolshub_tool_rent_listings'])
+
+    def test_rent_listings(self):
+        domain = _listing_visibility_domain(self.user_id, False)
+        for order in ('id desc', 'price asc nulls last, id asc', 'subscribers_count desc nulls first, id desc'):
+            self.assertIndexed('toolshub.listing.catalog', domain, order, limit=25)
+        self.assertIndexed('toolshub.listing.catalog', domain + [('price', '>=', 40), ('price', '<=', 45)],
+                           'price asc nulls last, id asc', limit=25)
+
+    def test_my_listings(self):
+        self.assertIndexed('toolshub.listing.catalog', [('owner_id', '=', self.user_id)], 'id desc', limit=25)
+
+    def test_plans(self):
+        self.assertIndexed('toolshub.tool.plans', [('tool_id', '=', self.tool_id)], 'tool_id asc, price asc')
@@ -0,0 +1,68 @@
+from datetime import datetime, time, timedelta
+
+from odoo.tests import tagged
+
+from .common import ToolshubCase
+
+
+@tagged('post_install', '-at_install')
+class TestOwnerStatsRollup(ToolshubCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Stats = cls.env['toolshub.owner.stats.daily']
+        cls.usd = cls.env.ref('base.USD')
+        cls.eur = cls.env.ref('base.EUR')
+        cls.today = cls.env.cr.now().date()
+        cls.yesterday = cls.today - timedelta(days=1)
+
+    def _rent(self, listing, price, currency, rented_date=None):
+        vals = {'rent_listing_id': listing.id, 'lender_id': self.lender.id, 'price': price, 'currency_id': currency.id}
+        if rented_date:
+            vals['rented_date'] = rented_date
+        return self.env['toolshub.rented.tools'].create(vals)
+
+    def _rollups(self, listing):
+        return sorted(
+            (row.date, row.currency_id.name, row.new_rentals, row.active_seats, row.expired_seats, row.gross_revenue)
+            for row in self.Stats.search([('listing_id', '=', listing.id)])
+        )
+
+    def test_rollup_per_currency_carried_forward(self):
+        listing = self._create_listing(total_users=5)
+        noon = datetime.combine(self.yesterday, time(12))
+        self._rent(listing, 10, self.usd, noon)
+        self._rent(listing, 20, self.eur, noon)
+        self._rent(listing, 7, self.usd)
+
+        self.Stats._rollup_day(self.yesterday)
+        self.Stats._rollup_day(self.today)
+
+        self.assertEqual(self._rollups(listing), sorted([
+            (self.yesterday, 'EUR', 1, 1, 0, 20),
+            (self.yesterday, 'USD', 1, 1, 0, 10),
+            (self.today, 'EUR', 0, 1, 0, 0),
+            (self.today, 'USD', 1, 2, 0, 7),
+        ]))
+
+    def test_rollup_today_counts_expiries_until_now(self):
+        listing = self._create_listing(total_users=5)
+        noon = datetime.combine(self.yesterday, time(12))
+        expired, expiring = [self._rent(listing, 10, self.usd, noon) for __ in range(2)]
+        day_start = datetime.combine(self.today, time.min)
+        now = self.env.cr.now()
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE toolshub_rented_tools SET expiry_date = %s WHERE id = %s",
+                            [day_start + (now - day_start) / 2, expired.id])
+        self.env.cr.execute("UPDATE toolshub_rented_tools SET expiry_date = %s WHERE id = %s",
+                            [day_start + timedelta(days=1) - timedelta(seconds=1), expiring.id])
+
+        self.Stats._rollup_day(self.yesterday)
+        self.Stats._rollup_day(self.today)
+
+        # The rental expiring later today is still active
+        self.assertEqual(self._rollups(listing), [
+            (self.yesterday, 'USD', 2, 2, 0, 20),
+            (self.today, 'USD', 0, 1, 1, 0),
+        ])
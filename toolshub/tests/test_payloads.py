@@ -0,0 +1,43 @@
+from odoo.tests import tagged
+
+from .common import ToolshubCase
+
+
+@tagged('post_install', '-at_install')
+class TestPayloads(ToolshubCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        plans = cls.plan | cls.env['toolshub.tool.plans'].create([{
+            'name': f"Plan {index}",
+            'tool_id': cls.tool.id,
+            'total_users': 10,
+            'price': 10 * index,
+        } for index in range(2, 4)])
+        cls.env['toolshub.tool.plan.features'].create([
+            {'name': f"Feature {index}", 'plan_id': plan.id} for plan in plans for index in range(4)
+        ])
+        cls.listings = cls.env['toolshub.tool.rent.listings']
+        for index in range(30):
+            cls.listings |= cls._create_listing(total_users=5, plan_id=plans[index % 3].id)
+        cls.rentals = cls.env['toolshub.rented.tools']
+        for listing in cls.listings:
+            cls.rentals |= listing._rent_seat(cls.lender)
+
+    def test_listing_payloads_query_count(self):
+        """One query for a page, whatever its size"""
+        for size in (1, 30):
+            self.env.invalidate_all()
+            with self.assertQueryCount(1):
+                payloads = self.listings[:size]._get_listing_payloads()
+            self.assertEqual([payload['id'] for payload in payloads], self.listings[:size].ids)
+        self.assertEqual(len(payloads[0]['plan_features']), 4)
+
+    def test_rented_tool_payloads_query_count(self):
+        """The rentals, then their listings from the catalog"""
+        for size in (1, 30):
+            self.env.invalidate_all()
+            with self.assertQueryCount(2):
+                payloads = self.rentals[:size]._get_rented_tool_payloads()
+            self.assertEqual([payload['id'] for payload in payloads], self.rentals[:size].ids)
@@ -0,0 +1,45 @@
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import ToolshubCase
+
+
+@tagged('post_install', '-at_install')
+class TestPlanConstraints(ToolshubCase):
+
+    def test_reduce_below_active_subscribers(self):
+        listing = self._create_listing(total_users=3)
+        listing._rent_seat(self.lender)
+        listing._rent_seat(self.lender)
+
+        with self.assertRaises(ValidationError):
+            self.plan.write({'total_users': 1})
+        self.plan.write({'total_users': 2})
+
+    def test_expired_rentals_free_their_seat(self):
+        listing = self._create_listing(total_users=3)
+        rentals = listing._rent_seat(self.lender) | listing._rent_seat(self.lender)
+        rentals.write({'is_active': False})
+
+        self.plan.write({'total_users': 1})
+        self.assertEqual(self.plan.total_users, 1)
+
+    def test_bulk_write_query_count(self):
+        """Checking 5000 plans costs one grouped query, not one per plan"""
+        self.env.cr.execute("""
+            INSERT INTO toolshub_tool_plans (name, tool_id, total_users, unlimited_users, price, currency_id,
+                                             duration_years, duration_months, duration_days, is_unlimited,
+                                             total_duration_days)
+            SELECT 'Bulk ' || g, %s, 10, FALSE, 1, %s, 0, 0, 0, TRUE, 0
+            FROM generate_series(1, 5000) g
+            RETURNING id
+        """, [self.tool.id, self.env.company.currency_id.id])
+        plans = self.env['toolshub.tool.plans'].browse([plan_id for (plan_id,) in self.env.cr.fetchall()])
+        self._create_listing(total_users=3, plan_id=plans[0].id)._rent_seat(self.lender)
+        self.env.flush_all()
+        self.env.invalidate_all()
+
+        # UPDATEs and reads in chunks of 1000, one grouped subscribers count, the catalog refresh
+        with self.assertQueryCount(40):
+            plans.write({'total_users': 20})
+            self.env.flush_all()
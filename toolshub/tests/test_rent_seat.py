@@ -0,0 +1,119 @@
+import threading
+
+from odoo import SUPERUSER_ID, api
+from odoo.exceptions import ValidationError
+from odoo.sql_db import db_connect
+from odoo.tests import tagged
+
+from .common import ToolshubCase
+
+
+@tagged('post_install', '-at_install')
+class TestRentSeat(ToolshubCase):
+
+    def test_rent_seat_until_full(self):
+        listing = self._create_listing(total_users=2)
+
+        self.assertTrue(listing._rent_seat(self.lender))
+        self.assertTrue(listing._rent_seat(self.lender))
+        self.assertFalse(listing._rent_seat(self.lender))
+
+        self.assertEqual(listing.subscribers_count, 2)
+        self.assertEqual(listing.available_users, 0)
+        self.assertFalse(listing.is_active)
+        self.assertEqual(len(listing.rented_tools_ids), 2)
+
+    def test_rent_seat_same_session(self):
+        listing = self._create_listing(total_users=2)
+
+        rental = listing._rent_seat(self.lender, stripe_session_id='cs_test_same')
+        self.assertEqual(listing._rent_seat(self.lender, stripe_session_id='cs_test_same'), rental)
+        self.assertEqual(listing.subscribers_count, 1)
+
+    def test_orm_rentals_cannot_oversell(self):
+        listing = self._create_listing(total_users=1)
+        RentedTools = self.env['toolshub.rented.tools']
+        RentedTools.create({'rent_listing_id': listing.id, 'lender_id': self.lender.id})
+
+        with self.assertRaises(ValidationError):
+            RentedTools.create({'rent_listing_id': listing.id, 'lender_id': self.lender.id})
+
+
+@tagged('post_install', '-at_install')
+class TestRentSeatConcurrency(ToolshubCase):
+    """Hundreds of renters racing for the seats of one listing, each rent in its own committed transaction"""
+
+    RENTERS = 300
+    SEATS = 50
+    # Connections used at once, well under the cursor pool of the test server
+    WORKERS = 24
+
+    def test_parallel_rent(self):
+        # The test transaction is invisible to the renters' connections: commit the fixtures separately
+        db = db_connect(self.env.cr.dbname)
+        with db.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            tool = env['toolshub.tools'].create({'name': "Toolshub Race Tool", 'image_url': 'https://example.com/race.png'})
+            plan = env['toolshub.tool.plans'].create({
+                'name': "Race", 'tool_id': tool.id, 'total_users': self.SEATS, 'price': 10,
+            })
+            listing = env['toolshub.tool.rent.listings'].create({
+                'tool_id': tool.id, 'plan_id': plan.id, 'total_users': self.SEATS, 'price': 5,
+                'owner_id': env.ref('base.user_admin').id,
+            })
+            listing_id, tool_id, lender_id = listing.id, tool.id, env.ref('base.user_admin').id
+            cr.commit()
+        self.addCleanup(self._cleanup_race, db, listing_id, tool_id)
+
+        rents = iter(range(self.RENTERS))
+        rents_lock = threading.Lock()
+        results = []
+        errors = []
+        barrier = threading.Barrier(self.WORKERS)
+
+        def worker():
+            barrier.wait()
+            while True:
+                with rents_lock:
+                    if next(rents, None) is None:
+                        return
+                # Same cursor as _rent_seat outside of tests, and no retry: any failure is counted
+                with db.cursor() as cr:
+                    cr.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+                    env = api.Environment(cr, SUPERUSER_ID, {})
+                    try:
+                        rental_id = env['toolshub.tool.rent.listings'].browse(listing_id)._take_seat(lender_id)
+                        cr.commit()
+                        results.append(bool(rental_id))
+                    except Exception as e:
+                        cr.rollback()
+                        errors.append(e)
+
+        threads = [threading.Thread(target=worker) for __ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [], "Renting a seat must never need a retry")
+        self.assertEqual(results.count(True), self.SEATS)
+        self.assertEqual(results.count(False), self.RENTERS - self.SEATS)
+        with db.cursor() as cr:
+            cr.execute("""
+                SELECT l.subscribers_count, l.available_users, l.is_active,
+                       (SELECT COUNT(*) FROM toolshub_rented_tools rt WHERE rt.rent_listing_id = l.id),
+                       c.subscribers_count, c.available_users
+                FROM toolshub_tool_rent_listings l
+                JOIN toolshub_listing_catalog c ON c.id = l.id
+                WHERE l.id = %s
+            """, [listing_id])
+            self.assertEqual(cr.fetchone(), (self.SEATS, 0, False, self.SEATS, self.SEATS, 0))
+
+    def _cleanup_race(self, db, listing_id, tool_id):
+        with db.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            listing = env['toolshub.tool.rent.listings'].browse(listing_id)
+            listing.rented_tools_ids.unlink()
+            listing.unlink()
+            env['toolshub.tools'].browse(tool_id).unlink()
+            cr.commit()
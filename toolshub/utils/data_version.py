@@ -0,0 +1,42 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Scope -> sequence counting the committed changes of the data behind the scope's payloads.
+# 'listings': listings and everything the catalog copies, 'tools': tools and plans of getTools
+SEQUENCES = {
+    'listings': 'toolshub_listings_version_seq',
+    'tools': 'toolshub_tools_version_seq',
+}
+
+
+def create_sequences(cr):
+    for sequence in SEQUENCES.values():
+        cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence}")
+
+
+def bump_version(env, *scopes):
+    """
+    Move the version of scopes forward once the current transaction commits.
+    Sequences are neither transactional nor locked, so concurrent writers never wait on each other,
+    and bumping after the commit means no reader pairs the new version with the old data.
+    """
+    pending = env.cr.postcommit.data.setdefault('toolshub.data_version', set())
+    if not pending:
+        registry = env.registry
+        env.cr.postcommit.add(lambda: _bump_committed(registry, pending))
+    pending.update(scopes)
+
+
+def _bump_committed(registry, scopes):
+    try:
+        with registry.cursor() as cr:
+            cr.execute("SELECT " + ", ".join(f"nextval('{SEQUENCES[scope]}')" for scope in sorted(scopes)))
+    except Exception:
+        _logger.exception("Could not bump the Toolshub data versions %s", sorted(scopes))
+
+
+def read_version(cr, scope):
+    """Current version of scope, one read of a sequence whatever the size of the tables"""
+    cr.execute(f"SELECT last_value FROM {SEQUENCES[scope]}")
+    return cr.fetchone()[0]
@@ -0,0 +1,43 @@
+import logging
+import random
+
+from odoo.http import request
+
+# Share of the requests of a route whose debug events are logged, the general rate and its per route override
+SAMPLE_RATE_PARAM = 'toolshub_debug_log_sample_rate'
+
+
+def _sample_rate(route):
+    ICP = request.env['ir.config_parameter'].sudo()
+    rate = ICP.get_param(f'{SAMPLE_RATE_PARAM}.{route}') or ICP.get_param(SAMPLE_RATE_PARAM, '1')
+    try:
+        return float(rate)
+    except ValueError:
+        return 1.0
+
+
+def _debug_sampled():
+    """Whether the debug events of the current request are logged, decided once per request"""
+    if not request or not request.db:
+        return True
+    sampled = getattr(request, 'toolshub_debug_sampled', None)
+    if sampled is None:
+        sampled = request.toolshub_debug_sampled = random.random() < _sample_rate(request.httprequest.path)
+    return sampled
+
+
+class ToolshubLogger(logging.LoggerAdapter):
+    """
+    Logger of the Toolshub controllers. The level comes from the Odoo logging configuration
+    (e.g. --log-handler=odoo.addons.toolshub:DEBUG) and messages use %-style arguments, so nothing
+    is formatted unless the event is emitted. Debug events are sampled per request and route,
+    see toolshub_debug_log_sample_rate.
+    """
+
+    def debug(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.DEBUG) and _debug_sampled():
+            self.logger.debug(msg, *args, stacklevel=2, **kwargs)
+
+
+def get_logger(name):
+    return ToolshubLogger(logging.getLogger(name), {})
@@ -0,0 +1,143 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from odoo.http import request
+
+from .profiling import profile_call, profiling_requested
+
+# Bucket upper bounds of each histogram, Prometheus style (an implicit +Inf bucket follows)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+ROW_BUCKETS = (0, 1, 10, 25, 50, 100, 250, 500, 1000, 5000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# metric name -> (help, buckets)
+METRICS = {
+    'toolshub_request_duration_seconds': ("Wall time of the request, serialization included", DURATION_BUCKETS),
+    'toolshub_handler_duration_seconds': ("Wall time spent in the controller method", DURATION_BUCKETS),
+    'toolshub_sql_queries': ("SQL queries run by the request", QUERY_BUCKETS),
+    'toolshub_sql_duration_seconds': ("Time spent in SQL queries by the request", DURATION_BUCKETS),
+    'toolshub_rows_serialized': ("Records returned in the answer's lists", ROW_BUCKETS),
+    'toolshub_response_bytes': ("Size of the response body", SIZE_BUCKETS),
+}
+
+
+class Histogram:
+    """Cumulative histogram of one metric for one route"""
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+# Per worker: (metric name, route, status) -> Histogram. Each worker exposes its own, labelled with its pid.
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def observe(route, values, status='ok'):
+    """
+    Record the values (metric name -> value) of one request to route.
+    status: 'ok', 'failed' for {'success': False} answers, 'error' when the handler raised
+    """
+    with _histograms_lock:
+        for name, value in values.items():
+            histogram = _histograms.get((name, route, status))
+            if histogram is None:
+                histogram = _histograms[(name, route, status)] = Histogram(METRICS[name][1])
+            histogram.observe(value)
+
+
+def render_prometheus():
+    """The histograms of this worker in the Prometheus text exposition format"""
+    pid = os.getpid()
+    with _histograms_lock:
+        snapshot = {key: (list(h.counts), h.count, h.sum) for key, h in _histograms.items()}
+
+    lines = []
+    for name, (description, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, route, status), (counts, count, total) in sorted(snapshot.items()):
+            if metric != name:
+                continue
+            labels = f'route="{route}",status="{status}",pid="{pid}"'
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {total}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _count_rows(result):
+    """Records in the lists of a {'success', 'data'} answer"""
+    data = result.get('data') if isinstance(result, dict) else None
+    if not isinstance(data, dict):
+        return 0
+    return sum(len(value) for value in data.values() if isinstance(value, list))
+
+
+def _status(result):
+    """Status label of an answer: 'failed' for {'success': False} answers, 'ok' otherwise"""
+    if isinstance(result, dict) and result.get('success') is False:
+        return 'failed'
+    return 'ok'
+
+
+def instrumented(endpoint):
+    """
+    Measure a controller method: the SQL counters of the request thread and the wall time
+    are sampled around it, the totals are completed and recorded by ir.http._post_dispatch.
+    Odoo skips _post_dispatch when the method raises, that sample is recorded here with the 'error' status.
+    Requests of users flagged for profiling are also profiled, see utils/profiling.py.
+    Put it under @http.route.
+    """
+    @functools.wraps(endpoint)
+    def wrapper(self, *args, **kwargs):
+        thread = threading.current_thread()
+        queries_before = getattr(thread, 'query_count', 0)
+        sql_time_before = getattr(thread, 'query_time', 0.0)
+        started = time.perf_counter()
+        result = None
+        status = 'error'
+        try:
+            if profiling_requested():
+                result = profile_call(endpoint, self, *args, **kwargs)
+            else:
+                result = endpoint(self, *args, **kwargs)
+            status = _status(result)
+            return result
+        finally:
+            handler = time.perf_counter() - started
+            if status == 'error':
+                observe(request.httprequest.path, {
+                    'toolshub_request_duration_seconds': handler,
+                    'toolshub_handler_duration_seconds': handler,
+                    'toolshub_sql_queries': getattr(thread, 'query_count', 0) - queries_before,
+                    'toolshub_sql_duration_seconds': getattr(thread, 'query_time', 0.0) - sql_time_before,
+                }, status)
+            else:
+                request.toolshub_metrics = {
+                    'route': request.httprequest.path,
+                    'status': status,
+                    'started': started,
+                    'handler': handler,
+                    'queries_before': queries_before,
+                    'sql_time_before': sql_time_before,
+                    'rows': _count_rows(result),
+                }
+    return wrapper
@@ -0,0 +1,91 @@
+import base64
+import cProfile
+import logging
+import marshal
+import time
+from collections import Counter
+
+from odoo.http import request
+from odoo.tools.profiler import Profiler
+
+_logger = logging.getLogger(__name__)
+
+# Header a system administrator sends to profile one of their own requests
+PROFILE_HEADER = 'X-Toolshub-Profile'
+
+
+def profiling_requested():
+    """
+    Profile this request when the user has the "Profile Toolshub Requests" flag,
+    or when a system administrator asks for it with the X-Toolshub-Profile header.
+    """
+    if not request or not request.db or not request.env.uid:
+        return False
+    user = request.env.user.sudo()
+    if user.toolshub_profile_requests:
+        return True
+    return bool(request.httprequest.headers.get(PROFILE_HEADER)) and user.has_group('base.group_system')
+
+
+def _collapsed_stacks(samples):
+    """Periodic stack samples in the collapsed format of flamegraph.pl and speedscope: "frame;frame;frame count" lines"""
+    stacks = Counter()
+    for sample in samples:
+        frames = [f"{name} ({filename.rsplit('/', 1)[-1]}:{lineno})" for filename, lineno, name, __ in sample['stack']]
+        if frames:
+            stacks[";".join(frames)] += 1
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+
+
+def _sql_log(queries):
+    return "\n\n".join(
+        f"-- {entry['time'] * 1000:.2f} ms\n{entry['full_query']}" for entry in queries
+    )
+
+
+def profile_call(endpoint, *args, **kwargs):
+    """
+    Run endpoint under cProfile, Odoo's periodic stack sampler and SQL collector, and save the
+    results as a toolshub.request.profile. The profile is saved with its own cursor, so it is
+    kept even when the request fails and rolls back.
+    """
+    profiler = cProfile.Profile()
+    odoo_profiler = Profiler(collectors=['sql', 'traces_async'], db=None, description=request.httprequest.path)
+    started = time.perf_counter()
+    try:
+        with odoo_profiler:
+            profiler.enable()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+    finally:
+        duration = time.perf_counter() - started
+        try:
+            _save_profile(profiler, odoo_profiler, duration)
+        except Exception:
+            _logger.exception("Could not save the profile of %s", request.httprequest.path)
+
+
+def _save_profile(profiler, odoo_profiler, duration):
+    profiler.create_stats()
+    collectors = {collector.name: collector for collector in odoo_profiler.collectors}
+    queries = collectors['sql'].entries
+    route = request.httprequest.path
+    stamp = time.strftime('%Y%m%d_%H%M%S')
+    name = route.strip('/').replace('/', '_')
+
+    with request.env.registry.cursor() as cr:
+        request.env(cr=cr)['toolshub.request.profile'].sudo().create({
+            'route': route,
+            'user_id': request.env.uid,
+            'duration': duration * 1000,
+            'query_count': len(queries),
+            'sql_duration': sum(entry['time'] for entry in queries) * 1000,
+            'pstats': base64.b64encode(marshal.dumps(profiler.stats)),
+            'pstats_filename': f"{name}_{stamp}.pstats",
+            'flamegraph': base64.b64encode(_collapsed_stacks(collectors['traces_async'].entries).encode()),
+            'flamegraph_filename': f"{name}_{stamp}.collapsed.txt",
+            'sql_log': _sql_log(queries),
+        })
+    _logger.info("Profiled %s for uid %s: %.1f ms, %s queries", route, request.env.uid, duration * 1000, len(queries))
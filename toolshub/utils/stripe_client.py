@@ -0,0 +1,29 @@
+import threading
+
+import stripe
+
+# Per worker cache: database name -> (api key, StripeClient)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_stripe_client(env):
+    """
+    StripeClient for the database of env, shared by all requests of this worker.
+    The client keeps its HTTP session, so connections to Stripe are reused between requests.
+    The key is read with get_param, which is ormcached, so noticing a changed
+    stripe_api_key costs no query: the client is simply rebuilt with the new key.
+    """
+    api_key = env['ir.config_parameter'].sudo().get_param('stripe_api_key', '')
+    dbname = env.cr.dbname
+
+    cached = _clients.get(dbname)
+    if cached and cached[0] == api_key:
+        return cached[1]
+
+    with _clients_lock:
+        cached = _clients.get(dbname)
+        if not cached or cached[0] != api_key:
+            cached = (api_key, stripe.StripeClient(api_key, http_client=stripe.RequestsClient()))
+            _clients[dbname] = cached
+    return cached[1]